@@ -0,0 +1,59 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from src.core.clock import parse_time_of_day
+from src.core.echonet import EchonetController, wifi_echonet_ctrl, wisun_echonet_ctrl
+from src.core.engine import engine
+from src.services.fleet_service import fleet_nodes
+from src.services.simulation_service import schedulers
+
+router = APIRouter(prefix="/api")
+
+class ClockUpdate(BaseModel):
+    speed: Optional[float] = None
+    paused: Optional[bool] = None
+    time_of_day: Optional[str] = None  # "HH:MM[:SS]" on the current simulated day
+
+@router.get("/clock")
+def get_clock():
+    return engine.clock.state()
+
+@router.post("/clock")
+def update_clock(req: ClockUpdate):
+    clock = engine.clock
+    try:
+        if req.time_of_day is not None:
+            clock.seek_time_of_day(parse_time_of_day(req.time_of_day))
+        if req.speed is not None:
+            clock.set_speed(req.speed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if req.paused is True:
+        clock.pause()
+    elif req.paused is False:
+        clock.resume()
+    return clock.state()
+
+@router.get("/ticks")
+def get_ticks():
+    """Tick scheduler stats per loop: tick / skip counts and lateness / duration histograms."""
+    return {name: sched.stats() for name, sched in schedulers.items()}
+
+def _controller_stats(ctrls: list[EchonetController]) -> dict:
+    cache: dict[str, int] = {}
+    rejects: dict[str, int] = {}
+    for ctrl in ctrls:
+        for name, stats in ((cache, ctrl.cache_stats()), (rejects, ctrl.reject_stats())):
+            for key, value in stats.items():
+                name[key] = name.get(key, 0) + value
+    return {"cache": cache, "rejects": rejects}
+
+@router.get("/echonet")
+def get_echonet():
+    """ECHONET Lite request stats per interface: GET response cache hits / misses / entries
+    and dropped frames per reason (fleet: totals over all nodes)."""
+    return {
+        "wifi": _controller_stats([wifi_echonet_ctrl]),
+        "wisun": _controller_stats([wisun_echonet_ctrl]),
+        "fleet": _controller_stats([node.ctrl for node in fleet_nodes]),
+    }
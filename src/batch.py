@@ -0,0 +1,155 @@
+"""Headless batch replay: run SimulationEngine against a scenario file as fast as possible.
+
+Usage (project root):
+    PYTHONPATH=. python src/batch.py --scenario data/scenarios/default_scenario.csv \
+        --days 365 --adaptive --resolution 3600 --battery-capacity-wh 14000 -o year.csv
+
+No NiceGUI app, UDP server or real-time sleeping: the engine is stepped directly
+with a clock that is advanced by hand, and one CSV row is written every
+--resolution simulated seconds. --adaptive uses event-driven steps (engine.advance)
+instead of fixed --step ticks. --scenario also takes a multi-day rule set (.yaml) or
+compiled timeline (.bin); --date picks the simulated start date. --seed adds the
+seeded stochastic layer (noise, appliance events, clouds).
+"""
+import argparse
+import csv
+import logging
+import sys
+import time
+from datetime import date
+from src.config.settings import settings
+from src.core.clock import SimulationClock, parse_time_of_day, format_time_of_day
+from src.core.engine import SimulationEngine
+from src.core.device_models import DEVICE_MODELS
+from src.core.timeline import load_scenario
+from src.core.stochastic import apply_stochastic
+
+# echonet.wifi_devices keys that are not device models: the grid meter is always simulated
+NON_MODEL_DEVICES = {"smart_meter"}
+
+COLUMNS = [
+    "elapsed_sec", "time_of_day",
+    "load_w", "solar_w", "grid_w",
+    "battery_soc", "battery_w",
+    "v2h_remaining_wh", "v2h_w",
+    "hot_water_l", "water_heater_w", "aircon_w",
+    "buy_kwh", "sell_kwh", "solar_kwh",
+    "battery_charge_wh", "battery_discharge_wh",
+    "v2h_charge_wh", "v2h_discharge_wh",
+]
+
+def sample(engine: SimulationEngine, elapsed: float) -> list:
+    """One output row (all instances of a class are summed)."""
+    bats, v2hs, whs = engine.batteries, engine.v2hs, engine.water_heaters
+    return [
+        round(elapsed, 3), format_time_of_day(engine.clock.time_of_day()),
+        engine.current_load_w,
+        sum(sol.instant_generation_power for sol in engine.solars),
+        engine.smart_meter.instant_current_power,
+        sum(b.soc for b in bats) / len(bats),
+        sum((b.instant_charge_power if b.is_charging else 0.0)
+            - (b.instant_discharge_power if b.is_discharging else 0.0) for b in bats),
+        sum(v.remaining_capacity_wh for v in v2hs),
+        sum(v.current_charge_w - v.current_discharge_w for v in v2hs),
+        sum(wh.remaining_hot_water for wh in whs),
+        sum(wh.heating_power_w for wh in whs if wh.is_heating),
+        sum(ac.instant_power_w for ac in engine.air_conditioners),
+        engine.smart_meter.cumulative_power_buy_kwh,
+        engine.smart_meter.cumulative_power_sell_kwh,
+        sum(sol.cumulative_generation_kwh for sol in engine.solars),
+        sum(b.cumulative_charge_wh for b in bats),
+        sum(b.cumulative_discharge_wh for b in bats),
+        sum(v.cumulative_charge_wh for v in v2hs),
+        sum(v.cumulative_discharge_wh for v in v2hs),
+    ]
+
+def run(engine: SimulationEngine, duration_sec: float, step_sec: float, resolution_sec: float,
+        writer, adaptive: bool = False, max_step_sec: float = 900.0) -> tuple[int, int]:
+    """Simulate duration_sec seconds; returns (rows written, engine steps)."""
+    clock = engine.clock
+    writer.writerow(sample(engine, 0.0))
+    rows, steps = 1, 0
+    if adaptive:
+        # One engine.advance() per output row; sub-steps follow scenario points / device events
+        for i in range(1, int(round(duration_sec / resolution_sec)) + 1):
+            clock.advance(resolution_sec)
+            steps += engine.advance(resolution_sec, max_step_sec)
+            writer.writerow(sample(engine, i * resolution_sec))
+            rows += 1
+        return rows, steps
+    every = max(1, int(round(resolution_sec / step_sec)))
+    for steps in range(1, int(round(duration_sec / step_sec)) + 1):
+        clock.advance(step_sec)
+        engine.step(step_sec)
+        if steps % every == 0:
+            writer.writerow(sample(engine, steps * step_sec))
+            rows += 1
+    return rows, steps
+
+def build_engine(scenario_file: str, start_time_of_day: float, devices: list[str] = None,
+                 start_date: date = None) -> SimulationEngine:
+    # Constant real-time source: simulated time only moves through clock.advance()
+    clock = SimulationClock(start_time_of_day=start_time_of_day, real_time=lambda: 0.0)
+    if start_date is not None:
+        midnight = time.mktime((start_date.year, start_date.month, start_date.day, 0, 0, 0, 0, 0, -1))
+        clock.seek(midnight + start_time_of_day)
+    return SimulationEngine(apply_stochastic(load_scenario(scenario_file)), clock, devices)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Headless batch replay of a scenario (CSV time series output)")
+    parser.add_argument("--scenario", default=settings.simulation.scenario_file,
+                        help="scenario CSV, multi-day rule set (.yaml) or compiled timeline (.bin)")
+    parser.add_argument("--days", type=float, default=1.0, help="simulated duration in days")
+    parser.add_argument("--start", default="00:00", help="simulated start time of day (HH:MM)")
+    parser.add_argument("--date", help="simulated start date (YYYY-MM-DD, default: today)")
+    parser.add_argument("--step", type=float, default=1.0, help="integration step in simulated seconds")
+    parser.add_argument("--adaptive", action="store_true", help="event-driven steps instead of fixed --step ticks")
+    parser.add_argument("--max-step", type=float, default=settings.simulation.max_step_sec,
+                        help="longest adaptive step in simulated seconds")
+    parser.add_argument("--resolution", type=float, default=60.0, help="output interval in simulated seconds")
+    parser.add_argument("--devices", default=",".join(settings.echonet.wifi_devices),
+                        help="comma-separated device models to simulate (default: echonet.wifi_devices)")
+    parser.add_argument("--seed", type=int, help="add the seeded stochastic layer (default: stochastic.seed)")
+    parser.add_argument("--battery-capacity-wh", type=float, help="override battery rated capacity")
+    parser.add_argument("--v2h-capacity-wh", type=float, help="override V2H vehicle battery capacity")
+    parser.add_argument("-o", "--output", default="-", help="output CSV path ('-' = stdout)")
+    args = parser.parse_args(argv)
+
+    if args.step <= 0 or args.resolution <= 0 or args.days <= 0 or args.max_step <= 0:
+        parser.error("--days, --step, --max-step and --resolution must be positive")
+    try:
+        start = parse_time_of_day(args.start)
+        start_date = date.fromisoformat(args.date) if args.date else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.seed is not None:
+        settings.stochastic.seed = args.seed
+    if args.battery_capacity_wh is not None:
+        settings.echonet.battery_rated_capacity_wh = args.battery_capacity_wh
+    if args.v2h_capacity_wh is not None:
+        settings.echonet.v2h_battery_capacity_wh = args.v2h_capacity_wh
+
+    devices = [d.strip() for d in args.devices.split(",") if d.strip()]
+    unknown = set(devices) - set(DEVICE_MODELS) - NON_MODEL_DEVICES
+    if unknown:
+        parser.error(f"unknown device model(s): {', '.join(sorted(unknown))}")
+    devices = [d for d in devices if d in DEVICE_MODELS]
+    engine = build_engine(args.scenario, start, devices, start_date)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    try:
+        writer = csv.writer(out)
+        writer.writerow(COLUMNS)
+        started = time.perf_counter()
+        rows, steps = run(engine, args.days * 86400.0, args.step, args.resolution, writer,
+                          args.adaptive, args.max_step)
+        elapsed = time.perf_counter() - started
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Simulated {args.days:g} day(s) in {elapsed:.1f} s ({steps} steps, {rows} rows)", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
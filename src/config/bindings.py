@@ -0,0 +1,83 @@
+import struct
+from src.config.settings import Settings, settings, add_change_listener
+
+# EchonetSettings fields holding Identification Numbers (0x83)
+ID_FIELDS = (
+    "node_profile_id",
+    "smart_meter_id",
+    "solar_id",
+    "battery_id",
+    "water_heater_id",
+    "v2h_id",
+    "ac_id",
+)
+
+def encode_maker_code(maker_code: str) -> bytes:
+    # 3 bytes
+    try:
+        return struct.pack(">I", int(maker_code, 16))[1:]
+    except Exception:
+        return b'\x00\x00\x00'
+
+def encode_identification(config_id: str) -> bytes:
+    try:
+        if config_id:
+            return bytes.fromhex(config_id)
+    except Exception:
+        pass
+    return b'\xFE' + b'\x00'*16
+
+# Derived IDs carry (node index, instance) in their own field of the unique part,
+# after the 0xFE type byte and the 3-byte maker code: the configured bytes that tell
+# device classes apart are kept, so classes and nodes never overlap
+_DERIVED_FIELD = struct.Struct(">IB")
+_DERIVED_OFFSET = 4
+
+def derive_identification(base: bytes, instance: int = 1, node_index: int = 0) -> bytes:
+    """Identification Number of an instance on a (fleet) node, derived from base.
+
+    Instance 1 of node 0 keeps base as configured. Every other (node, instance)
+    writes node_index (4 bytes) and instance (1 byte) into bytes 4-8, so two
+    derived IDs are equal only for the same class, node and instance.
+    """
+    if node_index == 0 and instance == 1:
+        return base
+    end = _DERIVED_OFFSET + _DERIVED_FIELD.size
+    out = bytearray(base.ljust(end, b"\x00"))
+    _DERIVED_FIELD.pack_into(out, _DERIVED_OFFSET, node_index, instance)
+    return bytes(out)
+
+class SettingsBinding:
+    """Settings から導出した値を事前にエンコードして保持する。
+
+    ECHONET パケット処理やシミュレーションのティックで毎回文字列を解析したり
+    pydantic の属性チェーンを辿ったりしないよう、設定変更 (UI / save_to_yaml)
+    の通知を受けた時だけ再計算する。
+    """
+
+    def __init__(self, source: Settings):
+        self._settings = source
+        self.refresh()
+        add_change_listener(self.refresh)
+
+    def refresh(self):
+        echonet = self._settings.echonet
+        self.maker_code: bytes = encode_maker_code(echonet.maker_code)
+        self.identification: dict[str, bytes] = {
+            field: encode_identification(getattr(echonet, field)) for field in ID_FIELDS
+        }
+        self.ac_power_w: float = float(echonet.ac_power_w)
+        # (field, instance, node index) -> derived ID for additional instances / nodes
+        self._derived: dict[tuple[str, int, int], bytes] = {}
+
+    def identification_for(self, field: str, instance: int = 1, node_index: int = 0) -> bytes:
+        """Identification Number of field for an instance on a node (see derive_identification)."""
+        key = (field, instance, node_index)
+        value = self._derived.get(key)
+        if value is None:
+            base = self.identification.get(field) or encode_identification(None)
+            value = self._derived[key] = derive_identification(base, instance, node_index)
+        return value
+
+# Global binding for the global settings instance
+settings_binding = SettingsBinding(settings)
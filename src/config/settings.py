@@ -1,11 +1,43 @@
 import yaml
 import os
+from contextlib import contextmanager
 from pydantic_settings import BaseSettings
 from pydantic import BaseModel
-from typing import Optional
+from typing import Callable, Optional
 
 _USER_CONFIG_PATH = "config/user_settings.yaml"
 
+# Callbacks invoked whenever a setting is assigned or saved
+_change_listeners: list[Callable[[], None]] = []
+
+def add_change_listener(callback: Callable[[], None]):
+    _change_listeners.append(callback)
+
+# Open batch() blocks, and whether a change was notified inside them
+_batch_depth = 0
+_batch_changed = False
+
+def notify_settings_changed():
+    global _batch_changed
+    if _batch_depth:
+        _batch_changed = True
+        return
+    for callback in list(_change_listeners):
+        callback()
+
+@contextmanager
+def batch():
+    """Assignments inside notify the listeners once, on exit (e.g. a whole Settings-tab save)."""
+    global _batch_depth, _batch_changed
+    _batch_depth += 1
+    try:
+        yield
+    finally:
+        _batch_depth -= 1
+        if _batch_depth == 0 and _batch_changed:
+            _batch_changed = False
+            notify_settings_changed()
+
 def _deep_update(d: dict, u: dict) -> dict:
     for k, v in u.items():
         if isinstance(v, dict):
@@ -14,24 +46,35 @@ def _deep_update(d: dict, u: dict) -> dict:
             d[k] = v
     return d
 
-class SystemSettings(BaseModel):
+class _NotifyingModel(BaseModel):
+    """Settings section that notifies listeners on assignment (e.g. from the UI)."""
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        notify_settings_changed()
+
+class SystemSettings(_NotifyingModel):
     log_level: str = "INFO"
 
-class CommunicationSettings(BaseModel):
+class CommunicationSettings(_NotifyingModel):
     wi_sun_device: str = "/dev/ttyUSB0"
     echonet_port: int = 3610
     # Wi-SUN B-Route Settings
     b_route_id: str = "00112233445566778899AABBCCDDEEFF"
     b_route_password: str = "0123456789AB"
     wi_sun_channel: Optional[str] = None # Auto or specific channel
+    # Max random delay (sec) before answering discovery requests (0 = immediate)
+    multicast_response_jitter_sec: float = 0.2
 
-class EchonetSettings(BaseModel):
+class EchonetSettings(_NotifyingModel):
     # Common
     maker_code: str = "000106" # 3 bytes hex
     
     # Identification Numbers
     node_profile_id: str = "FE00000000000000000000000000000000" 
     wifi_devices: list[str] = ["solar", "battery"] # Default enabled devices
+    # Instances per class, keyed like wifi_devices (missing = 1, max 127).
+    # The smart meter is the grid connection point and always has one instance.
+    instance_counts: dict[str, int] = {}
     solar_id: str        = "FE00000000000000000000000000000200"
     battery_id: str      = "FE00000000000000000000000000000300"
     water_heater_id: str = "FE00000000000000000000000000000400"
@@ -52,15 +95,71 @@ class EchonetSettings(BaseModel):
     ac_id: str = "FE00000000000000000000000000000600"
     ac_power_w: float = 500.0  # 自動/冷房/暖房/除湿 共通消費電力 (W)
 
-class SimulationSettings(BaseModel):
+class SimulationSettings(_NotifyingModel):
+    # Tick period (sub-second values such as 0.1 are fine)
     update_interval_sec: float = 1.0
+    # Missed ticks: "skip" (run one late tick, drop the rest) or "catch_up"
+    # (run up to max_catch_up_ticks back-to-back)
+    tick_policy: str = "skip"
+    max_catch_up_ticks: int = 5
+    # Simulated seconds per real second (1 = real time, 60 / 3600 = time-warp)
+    clock_speed: float = 1.0
+    # Event-driven stepping: advance straight to the next scenario point / device event
+    adaptive_step: bool = False
+    # Upper bound of one adaptive step (simulated seconds)
+    max_step_sec: float = 900.0
+    # Simulated time of day at startup ("HH:MM"); None = current local time
+    start_time_of_day: Optional[str] = None
+    # Where ticks run: "inline" (on the asyncio event loop) or "thread" (dedicated
+    # simulation thread; UDP / Wi-SUN / UI never wait on a tick)
+    executor: str = "inline"
     scenario_file: str = "data/scenarios/default_scenario.csv"
+    # Device state (SOC, hot water, cumulative counters) survives restarts through this
+    # file: restored at startup, written every checkpoint_interval_sec and on shutdown
+    # ("" = off, 0 = only on shutdown)
+    checkpoint_file: str = "data/checkpoint.bin"
+    checkpoint_interval_sec: float = 60.0
+
+class FleetSettings(_NotifyingModel):
+    # Virtual fleet: independent ECHONET nodes hosted in this process (0 = off)
+    node_count: int = 0
+    # Node k binds base_address + k (127.0.0.x works as a local stand-in)
+    base_address: str = "127.0.0.2"
+    # GET response cache entries per node
+    cache_size: int = 32
+
+class StochasticSettings(_NotifyingModel):
+    # Seeded randomness layered on the scenario (None = off; applied when a scenario is loaded).
+    # The same seed reproduces the same days whatever the start time.
+    seed: Optional[int] = None
+    # Load noise: relative standard deviation, correlated over noise_interval_sec
+    load_noise: float = 0.05
+    noise_interval_sec: float = 10.0
+    # Appliance switch-ons (kettle, microwave, dryer, ...): rate and [min, max] ranges
+    appliance_events_per_day: float = 12.0
+    appliance_power_w: list[float] = [600.0, 2000.0]
+    appliance_duration_sec: list[float] = [60.0, 1200.0]
+    # Passing clouds: solar drops by depth (fraction) over a ramp, holds, then recovers
+    cloud_events_per_day: float = 6.0
+    cloud_depth: list[float] = [0.3, 0.9]
+    cloud_ramp_sec: list[float] = [30.0, 300.0]
+    cloud_hold_sec: list[float] = [60.0, 1800.0]
 
 class Settings(BaseSettings):
     system: SystemSettings = SystemSettings()
     communication: CommunicationSettings = CommunicationSettings()
     echonet: EchonetSettings = EchonetSettings()
     simulation: SimulationSettings = SimulationSettings()
+    fleet: FleetSettings = FleetSettings()
+    stochastic: StochasticSettings = StochasticSettings()
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        notify_settings_changed()
+
+    def batch(self):
+        """Context manager: notify the change listeners once for all assignments inside."""
+        return batch()
 
     @classmethod
     def load_from_yaml(cls, default_path: str = "config/default_config.yaml") -> "Settings":
@@ -106,6 +205,7 @@ class Settings(BaseSettings):
                 yaml.dump(self.model_dump(), f, default_flow_style=False)
         except Exception as e:
             print(f"Failed to save settings: {e}")
+        notify_settings_changed()
 
 # Global settings instance
 settings = Settings.load_from_yaml()
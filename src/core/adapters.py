@@ -1,6 +1,9 @@
+import itertools
 import struct
-from typing import Optional
-from src.config.settings import settings
+import logging
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, NamedTuple, Optional
+from src.config.bindings import settings_binding
 from .echonet import EchonetObjectInterface
 from .models import Solar, Battery, SmartMeter, ElectricWaterHeater, V2H, AirConditioner
 from src.core.smart_meter_consts import SMART_METER_STATIC_PROPS
@@ -10,15 +13,94 @@ from src.core.water_heater_consts import WATER_HEATER_STATIC_PROPS
 from src.core.v2h_consts import V2H_STATIC_PROPS
 from src.core.aircon_consts import AIRCON_STATIC_PROPS
 
+logger = logging.getLogger(__name__)
+
+class Prop(NamedTuple):
+    """EPC table entry: getter (encoder), setter (decoder) and access rule.
+
+    A property is readable if get is set, writable if set is set, and listed
+    in the Status Change Announcement Property Map (0x9D) if anno is True.
+    """
+    get: Optional[Callable[[Any], Optional[bytes]]] = None
+    set: Optional[Callable[[Any, bytes], bool]] = None
+    anno: bool = False
+
+def _const(value: bytes) -> Callable[[Any], bytes]:
+    return lambda _self: value
+
+def _u32(val: float) -> bytes:
+    return struct.pack(">L", max(0, min(int(val), 0xFFFFFFFF)))
+
+def _status(is_on: bool) -> bytes:
+    return b'\x30' if is_on else b'\x31'
+
 class BaseAdapter(EchonetObjectInterface):
-    def __init__(self, config_id: str = None):
-        self._config_id = config_id
+    """Table-driven ECHONET Lite object.
+
+    Each subclass declares its EPCs; the tables are merged once per class
+    (lowest to highest priority):
+
+        COMMON_PROPERTIES -> DEFAULT_PROPERTIES -> STATIC_PROPS
+            -> IDENTITY_PROPERTIES -> PROPERTIES
+
+    get_property / set_property are a single dict lookup into the merged
+    table, which also drives the 0x9D/0x9E/0x9F property maps.
+
+    Once registered with the engine, GETs of dynamic EPCs are served from
+    a per-tick snapshot of pre-encoded EDTs (see publish_snapshot).
+    """
+    # Fallback values, overridden by user provided static data
+    DEFAULT_PROPERTIES: dict[int, Prop] = {}
+    # User provided EDTs (*_STATIC_PROPS)
+    STATIC_PROPS: dict[int, bytes] = {}
+    # Dynamic values (simulation model)
+    PROPERTIES: dict[int, Prop] = {}
+
+    _table: dict[int, Prop] = {}
+    # (EPC, getter) pairs whose value depends on the simulation state
+    _dynamic_getters: tuple = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._table = cls._build_table()
+        # Identity values follow Settings, so they are snapshotted as well
+        dynamic = {**cls.DEFAULT_PROPERTIES, **BaseAdapter.IDENTITY_PROPERTIES, **cls.PROPERTIES}
+        cls._dynamic_getters = tuple(
+            (epc, prop.get) for epc, prop in sorted(cls._table.items())
+            if prop.get is not None and dynamic.get(epc) is prop
+        )
+
+    @classmethod
+    def _build_table(cls) -> dict[int, Prop]:
+        table = dict(BaseAdapter.COMMON_PROPERTIES)
+        table.update(cls.DEFAULT_PROPERTIES)
+        for epc, edt in cls.STATIC_PROPS.items():
+            table[epc] = Prop(get=_const(edt))
+        # FIX: Force use of settings for Maker Code (0x8A) and ID (0x83) even if present in static props
+        table.update(BaseAdapter.IDENTITY_PROPERTIES)
+        table.update(cls.PROPERTIES)
+        return table
+
+    def __init__(self, id_field: str = None, instance: int = 1, node_index: int = 0):
+        # EchonetSettings field holding this object's Identification Number; instance
+        # and (fleet) node index derive it for further objects (1, 0 = as configured)
+        self._id_field = id_field
+        self._id_instance = instance
+        self._id_node = node_index
+        # (generation, read-only EPC -> EDT table), swapped as one reference so readers
+        # on another thread never pair a generation with another tick's table
+        self.published: Optional[tuple[int, Mapping[int, bytes]]] = None
+        # Generation numbers are drawn atomically (next() on a C iterator), so
+        # publishers on two threads never reuse one for different snapshots
+        self._generations = itertools.count(1)
+        self._property_maps: dict[int, bytes] = {}
+        self.refresh_property_maps()
 
     def _build_property_map(self, epcs: list[int]) -> bytes:
         # ECHONET Lite Property Map Format
         # If count < 16: Byte 1 = count, Bytes 2..n = EPCs
         # If count >= 16: Byte 1 = count, Bytes 2..17 = Bitmap (EPC 0x80-0x87, ... 0xF8-0xFF)
-        
+
         count = len(epcs)
         if count < 16:
             return bytes([count] + epcs)
@@ -34,593 +116,556 @@ class BaseAdapter(EchonetObjectInterface):
             return bytes([count]) + bitmap
 
     def _get_supported_epcs(self) -> list[int]:
-        # Subclasses should override this
-        return [0x80, 0x82, 0x88, 0x8A, 0x9D, 0x9E, 0x9F]
-
-    def get_property(self, epc: int) -> Optional[bytes]:
-        # Common Properties
-        if epc == 0x88: # Fault Status (0x41: Fault, 0x42: No Fault)
-            return b'\x42'
-        elif epc == 0x8A: # Manufacturer Code
-            # 3 bytes
-            try:
-                code_int = int(settings.echonet.maker_code, 16)
-                return struct.pack(">I", code_int)[1:] 
-            except:
-                return b'\x00\x00\x00'
-        elif epc == 0x83: # Identification Number
-            try:
-                if self._config_id:
-                    return bytes.fromhex(self._config_id)
-            except:
-                pass
-            return b'\xFE' + b'\x00'*16
-            
-        elif epc == 0x9D: # Status Change Announcement Property Map
-            return self._build_property_map([0x80, 0x88])
-        elif epc == 0x9E: # Set Property Map
-            return self._build_property_map([0x80]) 
-        elif epc == 0x9F: # Get Property Map
-            return self._build_property_map(self._get_supported_epcs())
-        
-        return None
+        return sorted(epc for epc, prop in self._table.items() if prop.get is not None)
+
+    def _get_settable_epcs(self) -> list[int]:
+        return sorted(epc for epc, prop in self._table.items() if prop.set is not None)
+
+    def _get_announce_epcs(self) -> list[int]:
+        return sorted(epc for epc, prop in self._table.items() if prop.anno)
+
+    def refresh_property_maps(self):
+        """Rebuild the 0x9D/0x9E/0x9F maps. Call when the supported EPCs change."""
+        self._property_maps = {
+            0x9D: self._build_property_map(self._get_announce_epcs()),
+            0x9E: self._build_property_map(self._get_settable_epcs()),
+            0x9F: self._build_property_map(self._get_supported_epcs()),
+        }
+
+    def publish_snapshot(self):
+        """Encode every dynamic EPC once and swap in the new read-only table.
+
+        Called by the engine once per tick, so all EPCs of a multi-property
+        response come from the same simulation state.
+        """
+        encoded: dict[Callable, bytes] = {}
+        snapshot = {}
+        for epc, getter in self._dynamic_getters:
+            # EPCs sharing a getter (e.g. Battery 0xA3/0xA5/0xE2) are encoded once
+            edt = encoded.get(getter)
+            if edt is None:
+                edt = encoded[getter] = getter(self)
+            snapshot[epc] = edt
+        published = self.published
+        if published is not None and published[1] == snapshot:
+            return
+        self.published = (next(self._generations), MappingProxyType(snapshot))
+
+    @property
+    def snapshot_generation(self) -> Optional[int]:
+        """Generation of the published snapshot; bumped whenever it changes, None while unpublished."""
+        published = self.published
+        return published[0] if published is not None else None
+
+    def get_property(self, epc: int, snapshot: Mapping[int, bytes] = None) -> Optional[bytes]:
+        """EDT of epc. snapshot is the published table to read (default: the current one);
+        multi-EPC requests pass the same one for every EPC."""
+        if snapshot is None:
+            published = self.published
+            if published is not None:
+                snapshot = published[1]
+        if snapshot is not None:
+            edt = snapshot.get(epc)
+            if edt is not None:
+                return edt
+        prop = self._table.get(epc)
+        if prop is None or prop.get is None:
+            return None
+        return prop.get(self)
 
     def set_property(self, epc: int, data: bytes) -> bool:
-        return False
+        prop = self._table.get(epc)
+        if prop is None or prop.set is None:
+            return False
+        ok = prop.set(self, data)
+        if ok and self.published is not None:
+            # Reflect the new value immediately (SET -> GET read-back)
+            self.publish_snapshot()
+        return ok
+
+    # --- Common Properties ---
+
+    # Pre-encoded by settings_binding; re-encoded only when Settings change
+
+    def _get_maker_code(self) -> bytes:
+        return settings_binding.maker_code
+
+    def _get_identification(self) -> bytes:
+        return settings_binding.identification_for(self._id_field, self._id_instance, self._id_node)
+
+    COMMON_PROPERTIES = {
+        0x88: Prop(get=_const(b'\x42'), anno=True), # Fault Status (0x41: Fault, 0x42: No Fault)
+        0x9D: Prop(get=lambda self: self._property_maps[0x9D]), # Status Change Announcement Property Map
+        0x9E: Prop(get=lambda self: self._property_maps[0x9E]), # Set Property Map
+        0x9F: Prop(get=lambda self: self._property_maps[0x9F]), # Get Property Map
+    }
+
+    IDENTITY_PROPERTIES = {
+        0x83: Prop(get=_get_identification), # Identification Number
+        0x8A: Prop(get=_get_maker_code),     # Manufacturer Code
+    }
+
+BaseAdapter._table = BaseAdapter._build_table()
 
 class NodeProfileAdapter(BaseAdapter):
-    def __init__(self, instances: list[tuple[int, int, int]] = None):
-        super().__init__(settings.echonet.node_profile_id)
+    def __init__(self, instances: list[tuple[int, int, int]] = None, node_index: int = 0):
+        super().__init__("node_profile_id", 1, node_index)
         if instances is None:
             # Default: Solar and Battery (for backward compatibility or default wifi)
             # Solar (02, 79, 01), Battery (02, 7D, 01)
-            self._instances = [
+            instances = [
                 (0x02, 0x79, 0x01),
                 (0x02, 0x7D, 0x01)
             ]
-        else:
-            self._instances = instances
+        self.set_instances(instances)
 
-    def _get_supported_epcs(self) -> list[int]:
-        base = super()._get_supported_epcs()
-        return sorted(list(set(base + [0x83, 0xD5, 0xD6])))
+    # 0xD5/0xD6 carry at most 84 EOJs; 0xD3 gives the full count
+    MAX_LISTED_INSTANCES = 84
 
-    def get_property(self, epc: int) -> Optional[bytes]:
-        if epc == 0x80: return b'\x30'
-        elif epc == 0x82: return b'\x01\x0A\x01\x00'
-        elif epc == 0xD5 or epc == 0xD6:
-            return self._get_instance_list()
-        
-        return super().get_property(epc)
-
-    def _get_instance_list(self) -> bytes:
+    def set_instances(self, instances: list[tuple[int, int, int]]):
+        """Replace the self-node instance list and rebuild the encoded 0xD3/0xD5/0xD6 values."""
+        self._instances = list(instances)
+        listed = self._instances[:self.MAX_LISTED_INSTANCES]
         # Format: Count(1B), [ClassGroup(1B), ClassCode(1B), InstanceCode(1B)] * N
-        count = len(self._instances)
-        data = bytearray([count])
-        for group, code, inst in self._instances:
+        data = bytearray([len(listed)])
+        for group, code, inst in listed:
             data.extend([group, code, inst])
-        return bytes(data)
+        self._instance_list = bytes(data)
+        self._instance_count = len(self._instances).to_bytes(3, "big")
+        if self.published is not None:
+            self.publish_snapshot()
+
+    def _get_instance_list(self) -> bytes:
+        return self._instance_list
+
+    def _get_instance_count(self) -> bytes:
+        return self._instance_count
+
+    PROPERTIES = {
+        0x80: Prop(get=_const(b'\x30'), anno=True),
+        0x82: Prop(get=_const(b'\x01\x0A\x01\x00')),
+        0xD3: Prop(get=_get_instance_count), # Number of Self-node Instances
+        0xD5: Prop(get=_get_instance_list), # Instance List Notification
+        0xD6: Prop(get=_get_instance_list), # Self-node Instance List S
+    }
 
 class SmartMeterAdapter(BaseAdapter):
-    def __init__(self, device: SmartMeter):
-        super().__init__(settings.echonet.smart_meter_id)
+    # Static Properties from User Data: ID(83), Unit(E1), Digits(D7), etc.
+    STATIC_PROPS = SMART_METER_STATIC_PROPS
+
+    def __init__(self, device: SmartMeter, instance: int = 1, node_index: int = 0):
+        super().__init__("smart_meter_id", instance, node_index)
         self.device = device
-        
-    def _get_supported_epcs(self) -> list[int]:
-        base = super()._get_supported_epcs()
-        # Merge static props keys with dynamic props
-        # Dynamic overrides: E0, E3, E7
-        dynamic_epcs = [0xE0, 0xE3, 0xE7]
-        static_epcs = list(SMART_METER_STATIC_PROPS.keys())
-        return sorted(list(set(base + dynamic_epcs + static_epcs)))
-
-    def get_property(self, epc: int) -> Optional[bytes]:
-        d = self.device
-        
-        # 1. Dynamic Measurement Values (Priority: Simulation Model)
-        # These must reflect the current simulation state, overriding static data if any
-        if epc == 0xE7: # Instantaneous Electric Power (W)
-            val = int(d.instant_current_power)
-            return struct.pack(">i", val)
-            
-        elif epc == 0xE0: # Cumulative Amount (Buy)
-            val = int(d.cumulative_power_buy_kwh)
-            return struct.pack(">L", min(val, 0xFFFFFFFF))
-            
-        elif epc == 0xE3: # Cumulative Amount (Sell)
-            val = int(d.cumulative_power_sell_kwh)
-            return struct.pack(">L", min(val, 0xFFFFFFFF))
-
-        # 2. Static Properties from User Data (Priority: User JSON)
-        # Includes ID(83), Unit(E1), Digits(D7), etc.
-        # FIX: Force use of settings for Maker Code (0x8A) and ID (0x83) even if present in static props
-        if epc == 0x8A or epc == 0x83:
-            return super().get_property(epc)
-            
-        if epc in SMART_METER_STATIC_PROPS:
-            return SMART_METER_STATIC_PROPS[epc]
 
-        # 3. Fallback to Settings/Defaults (e.g. Status 80 if not in static)
-        if epc == 0x80: 
-            return b'\x30'
+    # Dynamic Measurement Values (Priority: Simulation Model)
+    # These must reflect the current simulation state, overriding static data if any
+
+    def _get_instant_power(self) -> bytes:
+        # Instantaneous Electric Power (W)
+        return struct.pack(">i", int(self.device.instant_current_power))
+
+    def _get_cumulative_buy(self) -> bytes:
+        return _u32(self.device.cumulative_power_buy_kwh)
+
+    def _get_cumulative_sell(self) -> bytes:
+        return _u32(self.device.cumulative_power_sell_kwh)
 
+    # Fallback to Settings/Defaults (e.g. Status 80 if not in static)
+    DEFAULT_PROPERTIES = {
+        0x80: Prop(get=_const(b'\x30'), anno=True),
+    }
 
-        return super().get_property(epc)
+    PROPERTIES = {
+        0xE7: Prop(get=_get_instant_power),   # Instantaneous Electric Power (W)
+        0xE0: Prop(get=_get_cumulative_buy),  # Cumulative Amount (Buy)
+        0xE3: Prop(get=_get_cumulative_sell), # Cumulative Amount (Sell)
+    }
 
 class SolarAdapter(BaseAdapter):
-    def __init__(self, device: Solar):
-        super().__init__(settings.echonet.solar_id)
+    STATIC_PROPS = SOLAR_STATIC_PROPS
+
+    def __init__(self, device: Solar, instance: int = 1, node_index: int = 0):
+        super().__init__("solar_id", instance, node_index)
         self.device = device
-        
-    def _get_supported_epcs(self) -> list[int]:
-        base = super()._get_supported_epcs()
-        # Merge static props keys with dynamic props
-        # Dynamic overrides: E0, E1
-        dynamic_epcs = [0xE0, 0xE1]
-        static_epcs = list(SOLAR_STATIC_PROPS.keys())
-        return sorted(list(set(base + dynamic_epcs + static_epcs)))
-
-    def get_property(self, epc: int) -> Optional[bytes]:
-        d = self.device
-        
-        # 1. Dynamic Measurement Values
-        if epc == 0xE0: # Instantaneous Power Generation (W)
-            # User JSON has 2 bytes [0,0]. We override with dynamic value.
-            val = int(d.instant_generation_power)
-            return struct.pack(">H", min(val, 65535))
-            
-        elif epc == 0xE1: # Cumulative Generation
-            # User JSON has 4 bytes. 
-            val = int(d.cumulative_generation_kwh * 1000) # Assuming 0.001kWh unit? Or 1?
-            # User JSON 225 data: [0,2,39,247] => 147447. If unit 0.001 -> 147kWh. Plausible.
-            return struct.pack(">L", min(val, 0xFFFFFFFF))
-            
-        # 2. Static Properties
-        # FIX: Force use of settings for Maker Code (0x8A) and ID (0x83)
-        if epc == 0x8A or epc == 0x83:
-            return super().get_property(epc)
-
-        if epc in SOLAR_STATIC_PROPS:
-            return SOLAR_STATIC_PROPS[epc]
-
-        # 3. Fallback
-        if epc == 0x80: 
-            return b'\x30' if d.is_running else b'\x31'
-
-            
-        return super().get_property(epc)
+
+    def _get_instant_generation(self) -> bytes:
+        # User JSON has 2 bytes [0,0]. We override with dynamic value.
+        val = int(self.device.instant_generation_power)
+        return struct.pack(">H", max(0, min(val, 65535)))
+
+    def _get_cumulative_generation(self) -> bytes:
+        # User JSON 225 data: [0,2,39,247] => 147447. If unit 0.001 -> 147kWh. Plausible.
+        return _u32(self.device.cumulative_generation_kwh * 1000)
+
+    def _get_status(self) -> bytes:
+        return _status(self.device.is_running)
+
+    DEFAULT_PROPERTIES = {
+        0x80: Prop(get=_get_status, anno=True),
+    }
+
+    PROPERTIES = {
+        0xE0: Prop(get=_get_instant_generation),    # Instantaneous Power Generation (W)
+        0xE1: Prop(get=_get_cumulative_generation), # Cumulative Generation
+    }
 
 class BatteryAdapter(BaseAdapter):
-    def __init__(self, device: Battery):
-        super().__init__(settings.echonet.battery_id)
+    STATIC_PROPS = BATTERY_STATIC_PROPS
+
+    def __init__(self, device: Battery, instance: int = 1, node_index: int = 0):
+        super().__init__("battery_id", instance, node_index)
         self.device = device
-        
-    def _get_supported_epcs(self) -> list[int]:
-        base = super()._get_supported_epcs()
-        # Merge static props keys with dynamic props
-        # Dynamic overrides: CF (Working Operation Status), DA (Operation Mode Setting), D3 (Follow-up for issue), E2 (Wh), E4 (SOC)
-        # Added: A0, A1, A2, A3, A4, A5, A8, A9, D0
-        dynamic_epcs = [0xCF, 0xD0, 0xDA, 0xD3, 0xE2, 0xE4, 0xA0, 0xA1, 0xA2, 0xA3, 0xA4, 0xA5, 0xA8, 0xA9]
-        static_epcs = list(BATTERY_STATIC_PROPS.keys())
-        return sorted(list(set(base + dynamic_epcs + static_epcs)))
-
-    def get_property(self, epc: int) -> Optional[bytes]:
+
+    def _current_wh(self) -> float:
         d = self.device
-        
-        # 1. Dynamic Measurement Values
-        if epc == 0xE4: # Remaining stored electricity 3 (SOC %) 
-            # 0-100%, 1 byte
-            val = int(d.soc)
-            return struct.pack("B", val)
-
-        elif epc == 0xA0: # AC Effective Capacity (Charging) [Wh]
-            # 最大の充電可能容量。ここでは定格容量と同じとする
-            val = int(d.rated_capacity_wh)
-            return struct.pack(">L", max(0, min(val, 0xFFFFFFFF)))
-
-        elif epc == 0xA1: # AC Effective Capacity (Discharging) [Wh]
-            # 最大の放電可能容量。ここでは定格容量と同じとする
-            val = int(d.rated_capacity_wh)
-            return struct.pack(">L", max(0, min(val, 0xFFFFFFFF)))
-
-        elif epc == 0xA2: # AC Chargeable Capacity [Wh]
-            # 現在の充電可能容量 (定格 - 現在の残量)
-            current_wh = d.rated_capacity_wh * d.soc / 100.0
-            val = int(d.rated_capacity_wh - current_wh)
-            return struct.pack(">L", max(0, min(val, 0xFFFFFFFF)))
-
-        elif epc == 0xA3: # AC Dischargeable Capacity [Wh]
-            # 現在の放電可能容量 (現在の残量)
-            current_wh = int(d.rated_capacity_wh * d.soc / 100.0)
-            return struct.pack(">L", max(0, min(current_wh, 0xFFFFFFFF)))
-
-        elif epc == 0xA4: # AC Chargeable Electric Energy (Wh)
-            # 現在の充電可能電力量
-            current_wh = d.rated_capacity_wh * d.soc / 100.0
-            val = int(d.rated_capacity_wh - current_wh)
-            return struct.pack(">L", max(0, min(val, 0xFFFFFFFF)))
-
-        elif epc == 0xA5: # AC Dischargeable Electric Energy (Wh)
-            # 現在の放電可能電力量
-            val = int(d.rated_capacity_wh * d.soc / 100.0)
-            return struct.pack(">L", min(val, 0xFFFFFFFF))
-            
-        elif epc == 0xA8: # AC cumulative charging electric energy (Wh)
-            val = int(d.cumulative_charge_wh)
-            return struct.pack(">L", min(val, 0xFFFFFFFF))
-
-        elif epc == 0xA9: # AC cumulative discharging electric energy (Wh)
-            val = int(d.cumulative_discharge_wh)
-            return struct.pack(">L", min(val, 0xFFFFFFFF))
-
-        elif epc == 0xE2: # Remaining stored electricity 1 (Wh)
-            # 4 bytes unsigned long (Wh)
-            # Calculate from rated_capacity_wh * soc / 100
-            wh_val = int(d.rated_capacity_wh * d.soc / 100.0)
-            return struct.pack(">L", wh_val)
-
-        elif epc == 0xD0: # Rated Electric Energy (Wh)
-            val = int(d.rated_capacity_wh)
-            return struct.pack(">L", max(0, min(val, 0xFFFFFFFF)))
-
-        elif epc == 0xDA or epc == 0xCF: # Operation Mode Setting or Working Operation Status
-            # 0x41: Rapid Charge, 0x42: Charge, 0x43: Discharge, 0x44: Standby
-            if d.is_charging:
-                return b'\x42'
-            elif d.is_discharging:
-                return b'\x43'
-            else:
-                return b'\x44' # Standby
-        
-        elif epc == 0xD3: # Instantaneous Charge/Discharge Power
-            # 4 bytes Signed Int (W). Positive: Charge, Negative: Discharge
-            val = 0
-            if d.is_charging: val = int(d.instant_charge_power)
-            elif d.is_discharging: val = -int(d.instant_discharge_power)
-            return struct.pack(">i", val)
+        return d.rated_capacity_wh * d.soc / 100.0
 
-        # 2. Static Properties
-        if epc == 0x8A or epc == 0x83: # FIX: Force use of settings for Maker Code and ID
-            return super().get_property(epc)
+    def _get_status(self) -> bytes:
+        # Status: ON (0x30) if running/charging/discharging, OFF (0x31) otherwise.
+        d = self.device
+        return _status(d.is_running or d.is_charging or d.is_discharging)
 
-        if epc == 0x80: 
-            # Status: ON (0x30) if running/charging/discharging, OFF (0x31) otherwise.
-            status = b'\x30' if (d.is_running or d.is_charging or d.is_discharging) else b'\x31'
-            return status
+    def _get_soc(self) -> bytes:
+        # 0-100%, 1 byte
+        return struct.pack("B", int(self.device.soc))
 
-        if epc in BATTERY_STATIC_PROPS:
-            # If D3 is in static, we override it above.
-            return BATTERY_STATIC_PROPS[epc]
-        
-        # 3. Fallback
+    def _get_rated_capacity(self) -> bytes:
+        # 最大の充電/放電可能容量。ここでは定格容量と同じとする
+        return _u32(self.device.rated_capacity_wh)
 
+    def _get_chargeable(self) -> bytes:
+        # 現在の充電可能容量 (定格 - 現在の残量)
+        return _u32(self.device.rated_capacity_wh - self._current_wh())
 
+    def _get_remaining(self) -> bytes:
+        # 現在の放電可能容量 (現在の残量)
+        return _u32(self._current_wh())
 
+    def _get_cumulative_charge(self) -> bytes:
+        return _u32(self.device.cumulative_charge_wh)
 
-        return super().get_property(epc)
-        
-    def set_property(self, epc: int, data: bytes) -> bool:
-        if epc == 0x80:
-            if data == b'\x30': self.device.is_running = True
-            elif data == b'\x31': self.device.is_running = False
-            return True
-        elif epc == 0xDA: # Operation Mode Setting
-            if data == b'\x42' or data == b'\x41': # Charge or Rapid Charge
-                self.device.is_charging = True
-                self.device.is_discharging = False
-                self.device.instant_charge_power = self.device.max_charge_power_w
-                self.device.instant_discharge_power = 0.0
-            elif data == b'\x43': # Discharge
-                self.device.is_charging = False
-                self.device.is_discharging = True
-                self.device.instant_charge_power = 0.0
-                self.device.instant_discharge_power = self.device.max_discharge_power_w
-            elif data == b'\x44': # Standby (Explicit)
-                self.device.is_charging = False
-                self.device.is_discharging = False
-                self.device.instant_charge_power = 0.0
-                self.device.instant_discharge_power = 0.0
-            return True
-        return super().set_property(epc, data)
+    def _get_cumulative_discharge(self) -> bytes:
+        return _u32(self.device.cumulative_discharge_wh)
 
-class ElectricWaterHeaterAdapter(BaseAdapter):
-    def __init__(self, device: ElectricWaterHeater):
-        super().__init__(settings.echonet.water_heater_id)
-        self.device = device
+    def _get_operation_mode(self) -> bytes:
+        # 0x41: Rapid Charge, 0x42: Charge, 0x43: Discharge, 0x44: Standby
+        d = self.device
+        if d.is_charging:
+            return b'\x42'
+        elif d.is_discharging:
+            return b'\x43'
+        return b'\x44' # Standby
 
-    def _get_supported_epcs(self) -> list[int]:
-        base = super()._get_supported_epcs()
-        # Merge static props keys with dynamic props
-        # Dynamic overrides: 0x80, 0xB0, 0xB2, 0xE1, 0xE2
-        dynamic_epcs = [0x80, 0xB0, 0xB2, 0xE1, 0xE2, 0xE3, 0xC0]
-        static_epcs = list(WATER_HEATER_STATIC_PROPS.keys())
-        return sorted(list(set(base + dynamic_epcs + static_epcs)))
-
-    def get_property(self, epc: int) -> Optional[bytes]:
+    def _get_instant_power(self) -> bytes:
+        # 4 bytes Signed Int (W). Positive: Charge, Negative: Discharge
         d = self.device
-        
-        # 1. Dynamic Values
-        if epc == 0x80: # Status
-            return b'\x30' if d.is_running else b'\x31'
-            
-        elif epc == 0xB0: # Auto Setting
-            # 0x41: Auto, 0x42: Manual Start, 0x43: Manual Stop
-            return bytes([d.auto_setting])
-            
-        elif epc == 0xB2: # Heating Status
-            # 0x41: Heating, 0x42: Not Heating (as per request)
-            return b'\x41' if d.is_heating else b'\x42'
-            
-        elif epc == 0xE1: # Remaining Hot Water
-            # User request: "raw value"
-            # It seems user treats 0xE1 as a number corresponding to digits. 10digits/hour.
-            # ECHONET spec says 0xE1 is "Measured remaining hot water amount".
-            # User provided prop default: 0xE1: [0, 185].
-            # We return as 2 bytes? Or 1?
-            # User provided props has 0xE1: [0, 185] -> 2 bytes.
-            val = int(d.remaining_hot_water)
-            return struct.pack(">H", val)
-
-        elif epc == 0xE2: # Tank Capacity
-            # User provided prop default: 0xE2: [1, 114] -> 370. 2 bytes.
-            val = int(d.tank_capacity)
-            return struct.pack(">H", val)
-
-        elif epc == 0xE3: # Bath Operation Status
-            # 0x41: ON, 0x42: OFF (or similar based on app usage)
-            return bytes([d.e3_bath_operation_status])
-
-        elif epc == 0xC0: # Operation Status / Initial Setting
-            return bytes([d.c0_operation_status])
-
-        # 2. Static Properties
-        if epc == 0x8A or epc == 0x83: # FIX: Force use of settings for Maker Code and ID
-            return super().get_property(epc)
-
-        if epc in WATER_HEATER_STATIC_PROPS:
-            return WATER_HEATER_STATIC_PROPS[epc]
-
-        return super().get_property(epc)
+        val = 0
+        if d.is_charging: val = int(d.instant_charge_power)
+        elif d.is_discharging: val = -int(d.instant_discharge_power)
+        return struct.pack(">i", val)
 
-    def set_property(self, epc: int, data: bytes) -> bool:
-        if epc == 0x80:
-            if data == b'\x30': self.device.is_running = True
-            elif data == b'\x31': self.device.is_running = False
-            return True
-        elif epc == 0xB0: # Auto Setting
-            val = data[0]
-            if val in [0x41, 0x42, 0x43]:
-                # User request logic:
-                # If set to 0x43 (Stop) or 0x41 (Auto), B2 -> 0x42 (Not Heating)
-                # If set to 0x42 (Start), B2 -> 0x41 (Heating)
-                # We update the model, engine loop will handle progressive changes (E1).
-                # But immediate state change is requested?
-                # "When 0xB0 is ... 0x43, ... 0xE1 decreases..." -> Engines job.
-                # "When 0xB0 is ... 0x42, ... 0xE1 increases..."
-                
-                # Immediate reaction to Set:
-                self.device.auto_setting = val
-                if val == 0x42: # Manual Start
-                     self.device.is_heating = True
-                elif val == 0x43 or val == 0x41: # Manual Stop
-                     self.device.is_heating = False
-                     
-                return True
-                
-        elif epc == 0xE3: # Bath Operation Status
-            self.device.e3_bath_operation_status = data[0]
-            return True
+    def _set_status(self, data: bytes) -> bool:
+        if data == b'\x30': self.device.is_running = True
+        elif data == b'\x31': self.device.is_running = False
+        return True
 
-        elif epc == 0xC0: # Operation Status
-             self.device.c0_operation_status = data[0]
-             return True
-        return super().set_property(epc, data)
+    def _set_operation_mode(self, data: bytes) -> bool:
+        d = self.device
+        if data == b'\x42' or data == b'\x41': # Charge or Rapid Charge
+            d.is_charging = True
+            d.is_discharging = False
+            d.instant_charge_power = d.max_charge_power_w
+            d.instant_discharge_power = 0.0
+        elif data == b'\x43': # Discharge
+            d.is_charging = False
+            d.is_discharging = True
+            d.instant_charge_power = 0.0
+            d.instant_discharge_power = d.max_discharge_power_w
+        elif data == b'\x44': # Standby (Explicit)
+            d.is_charging = False
+            d.is_discharging = False
+            d.instant_charge_power = 0.0
+            d.instant_discharge_power = 0.0
+        return True
+
+    PROPERTIES = {
+        0x80: Prop(get=_get_status, set=_set_status, anno=True),
+        0xE4: Prop(get=_get_soc),                   # Remaining stored electricity 3 (SOC %)
+        0xA0: Prop(get=_get_rated_capacity),        # AC Effective Capacity (Charging) [Wh]
+        0xA1: Prop(get=_get_rated_capacity),        # AC Effective Capacity (Discharging) [Wh]
+        0xA2: Prop(get=_get_chargeable),            # AC Chargeable Capacity [Wh]
+        0xA3: Prop(get=_get_remaining),             # AC Dischargeable Capacity [Wh]
+        0xA4: Prop(get=_get_chargeable),            # AC Chargeable Electric Energy (Wh)
+        0xA5: Prop(get=_get_remaining),             # AC Dischargeable Electric Energy (Wh)
+        0xA8: Prop(get=_get_cumulative_charge),     # AC cumulative charging electric energy (Wh)
+        0xA9: Prop(get=_get_cumulative_discharge),  # AC cumulative discharging electric energy (Wh)
+        0xE2: Prop(get=_get_remaining),             # Remaining stored electricity 1 (Wh)
+        0xD0: Prop(get=_get_rated_capacity),        # Rated Electric Energy (Wh)
+        0xDA: Prop(get=_get_operation_mode, set=_set_operation_mode), # Operation Mode Setting
+        0xCF: Prop(get=_get_operation_mode),        # Working Operation Status
+        0xD3: Prop(get=_get_instant_power),         # Instantaneous Charge/Discharge Power
+    }
+
+class ElectricWaterHeaterAdapter(BaseAdapter):
+    STATIC_PROPS = WATER_HEATER_STATIC_PROPS
+
+    def __init__(self, device: ElectricWaterHeater, instance: int = 1, node_index: int = 0):
+        super().__init__("water_heater_id", instance, node_index)
+        self.device = device
+
+    def _get_status(self) -> bytes:
+        return _status(self.device.is_running)
+
+    def _get_auto_setting(self) -> bytes:
+        # 0x41: Auto, 0x42: Manual Start, 0x43: Manual Stop
+        return bytes([self.device.auto_setting])
+
+    def _get_heating_status(self) -> bytes:
+        # 0x41: Heating, 0x42: Not Heating (as per request)
+        return b'\x41' if self.device.is_heating else b'\x42'
+
+    def _get_remaining_hot_water(self) -> bytes:
+        # User provided props has 0xE1: [0, 185] -> 2 bytes, raw value.
+        return struct.pack(">H", int(self.device.remaining_hot_water))
+
+    def _get_tank_capacity(self) -> bytes:
+        # User provided prop default: 0xE2: [1, 114] -> 370. 2 bytes.
+        return struct.pack(">H", int(self.device.tank_capacity))
+
+    def _get_bath_status(self) -> bytes:
+        # 0x41: ON, 0x42: OFF (or similar based on app usage)
+        return bytes([self.device.e3_bath_operation_status])
+
+    def _get_c0_status(self) -> bytes:
+        return bytes([self.device.c0_operation_status])
+
+    def _set_status(self, data: bytes) -> bool:
+        if data == b'\x30': self.device.is_running = True
+        elif data == b'\x31': self.device.is_running = False
+        return True
+
+    def _set_auto_setting(self, data: bytes) -> bool:
+        val = data[0]
+        if val not in [0x41, 0x42, 0x43]:
+            return False
+        # Immediate reaction to Set (the engine loop handles progressive changes of E1):
+        # If set to 0x43 (Stop) or 0x41 (Auto), B2 -> 0x42 (Not Heating)
+        # If set to 0x42 (Start), B2 -> 0x41 (Heating)
+        self.device.auto_setting = val
+        if val == 0x42: # Manual Start
+             self.device.is_heating = True
+        elif val == 0x43 or val == 0x41: # Manual Stop
+             self.device.is_heating = False
+        return True
+
+    def _set_bath_status(self, data: bytes) -> bool:
+        self.device.e3_bath_operation_status = data[0]
+        return True
+
+    def _set_c0_status(self, data: bytes) -> bool:
+        self.device.c0_operation_status = data[0]
+        return True
+
+    PROPERTIES = {
+        0x80: Prop(get=_get_status, set=_set_status, anno=True),           # Status
+        0xB0: Prop(get=_get_auto_setting, set=_set_auto_setting),          # Auto Setting
+        0xB2: Prop(get=_get_heating_status),                               # Heating Status
+        0xE1: Prop(get=_get_remaining_hot_water),                          # Remaining Hot Water
+        0xE2: Prop(get=_get_tank_capacity),                                # Tank Capacity
+        0xE3: Prop(get=_get_bath_status, set=_set_bath_status),            # Bath Operation Status
+        0xC0: Prop(get=_get_c0_status, set=_set_c0_status),                # Operation Status / Initial Setting
+    }
 
 
 class V2HAdapter(BaseAdapter):
-    """電気自動車充放電器 (V2H) クラ스コード 0x027E のアダプター"""
+    """電気自動車充放電器 (V2H) クラスコード 0x027E のアダプター"""
+    STATIC_PROPS = V2H_STATIC_PROPS
 
-    def __init__(self, device: V2H):
-        super().__init__(settings.echonet.v2h_id)
+    def __init__(self, device: V2H, instance: int = 1, node_index: int = 0):
+        super().__init__("v2h_id", instance, node_index)
         self.device = device
 
-    def _get_supported_epcs(self) -> list[int]:
-        base = super()._get_supported_epcs()
-        dynamic_epcs = [
-            0x80, 0x83, 0x8A,
-            0xC0, 0xC2, 0xC7,
-            0xD0, 0xD3, 0xD6, 0xD8, 0xDA,
-            0xE1, 0xE2, 0xE4, 0xEB, 0xEC,
-        ]
-        static_epcs = list(V2H_STATIC_PROPS.keys())
-        return sorted(list(set(base + dynamic_epcs + static_epcs)))
-
-    def get_property(self, epc: int) -> Optional[bytes]:
+    def _get_status(self) -> bytes:
+        return _status(self.device.is_running)
+
+    def _get_capacity(self) -> bytes:
+        return _u32(self.device.battery_capacity_wh)
+
+    def _get_remaining(self) -> bytes:
+        return _u32(self.device.remaining_capacity_wh)
+
+    def _get_soc(self) -> bytes:
         d = self.device
-        import logging
-        logger = logging.getLogger(__name__)
-
-        # --- 動的プロパティ ---
-        if epc == 0x80:  # 動作状態
-            return b'\x30' if d.is_running else b'\x31'
-
-        elif epc == 0xC0 or epc == 0xD0:  # 車載電池放電可能容量1 (Wh) or 車載電池の使用容量値 1
-            val = int(d.battery_capacity_wh)
-            return struct.pack('>L', max(0, min(val, 0xFFFFFFFF)))
-
-        elif epc == 0xC2 or epc == 0xE2:  # 車載電池放電可能残容量1 (Wh) or 車載電池の電池残容量 1
-            val = int(d.remaining_capacity_wh)
-            return struct.pack('>L', max(0, min(val, 0xFFFFFFFF)))
-
-        elif epc == 0xE4:  # 車載電池の電池残容量 2 (%) 1バイト
-            if d.battery_capacity_wh > 0:
-                val = int((d.remaining_capacity_wh / d.battery_capacity_wh) * 100)
-            else:
-                val = 0
-            return struct.pack('B', max(0, min(val, 100)))
-
-        elif epc == 0xC7:  # 車両接続・充放電可否状態
-            if not d.vehicle_connected:
-                return b'\x30'  # 未接続
-            return b'\x43'  # 接続、充放電可
-
-        elif epc == 0xD3:  # 瞬時充放電電力計測値 (W) 符号付き4バイト
-            # 設定値ではなく、エンジンが計算した現在の「実測値」を返すように修正
-            if d.operation_mode == 0x42:  # 充電
-                val = int(d.current_charge_w)
-            elif d.operation_mode == 0x43:  # 放電
-                val = -int(d.current_discharge_w)
-            else:
-                val = 0
-            return struct.pack('>i', val)
-
-        elif epc == 0xD8:  # 積算充電電力量1 (Wh) 4バイト
-            val = int(d.cumulative_charge_wh)
-            return struct.pack('>L', max(0, min(val, 0xFFFFFFFF)))
-
-        elif epc == 0xD6:  # 積算放電電力量1 (Wh) 4バイト
-            val = int(d.cumulative_discharge_wh)
-            return struct.pack('>L', max(0, min(val, 0xFFFFFFFF)))
-
-        elif epc == 0xDA:  # 運転モード設定
-            if not d.vehicle_connected:
-                return b'\x47'  # 未接続時は常に停止
-            return bytes([d.operation_mode])
-
-        elif epc == 0xE1:  # 運転動作状態（運転モード設定に連動）
-            return bytes([d.operation_mode])
-
-        elif epc == 0xEB:  # 充電電力設定値 (W)
-            val = int(d.charge_power_w)
-            return struct.pack('>L', max(0, min(val, 0xFFFFFFFF)))
-
-        elif epc == 0xEC:  # 放電電力設定値 (W)
-            val = int(d.discharge_power_w)
-            return struct.pack('>L', max(0, min(val, 0xFFFFFFFF)))
-
-        # --- Settings 経由プロパティ ---
-        if epc == 0x8A or epc == 0x83:
-            return super().get_property(epc)
-
-        # --- 静的プロパティ ---
-        if epc in V2H_STATIC_PROPS:
-            return V2H_STATIC_PROPS[epc]
-
-        return super().get_property(epc)
+        if d.battery_capacity_wh > 0:
+            val = int((d.remaining_capacity_wh / d.battery_capacity_wh) * 100)
+        else:
+            val = 0
+        return struct.pack('B', max(0, min(val, 100)))
 
-    def set_property(self, epc: int, data: bytes) -> bool:
+    def _get_connection(self) -> bytes:
+        if not self.device.vehicle_connected:
+            return b'\x30'  # 未接続
+        return b'\x43'  # 接続、充放電可
+
+    def _get_instant_power(self) -> bytes:
+        # 設定値ではなく、エンジンが計算した現在の「実測値」を返す
         d = self.device
-        import logging
-        logger = logging.getLogger(__name__)
-
-        if epc == 0x80:  # 動作状態
-            if data == b'\x30':
-                d.is_running = True
-            elif data == b'\x31':
-                d.is_running = False
-            return True
+        if d.operation_mode == 0x42:  # 充電
+            val = int(d.current_charge_w)
+        elif d.operation_mode == 0x43:  # 放電
+            val = -int(d.current_discharge_w)
+        else:
+            val = 0
+        return struct.pack('>i', val)
 
-        elif epc == 0xCD:  # 車両接続確認（トグル）
-            if not d.vehicle_connected:
-                # 未接続 -> 接続
-                d.vehicle_connected = True
-                d.operation_mode = 0x44  # 待機
-                logger.info("V2H: Vehicle connected. Mode -> Standby (0x44)")
-            return True
+    def _get_cumulative_charge(self) -> bytes:
+        return _u32(self.device.cumulative_charge_wh)
 
-        elif epc == 0xDA:  # 運転モード設定
-            if not d.vehicle_connected:
-                logger.warning("V2H: SET 0xDA rejected (vehicle not connected)")
-                return False  # 未接続時は失敗
-            val = data[0] if data else 0
-            if val not in (0x42, 0x43, 0x44, 0x47):  # 充電/放電/待機/停止のみ許可
-                logger.warning(f"V2H: SET 0xDA rejected (invalid value: 0x{val:02X})")
-                return False
-            d.operation_mode = val
-            logger.info(f"V2H: Operation mode set to 0x{val:02X}")
-            if val == 0x47:  # 停止
-                d.vehicle_connected = False # 未接続
-            return True
+    def _get_cumulative_discharge(self) -> bytes:
+        return _u32(self.device.cumulative_discharge_wh)
 
-        elif epc == 0xEB:  # 充電電力設定値 (W)
-            if len(data) >= 4:
-                val = struct.unpack('>L', data[:4])[0]
-                d.charge_power_w = float(val)
-            return True
+    def _get_operation_mode(self) -> bytes:
+        if not self.device.vehicle_connected:
+            return b'\x47'  # 未接続時は常に停止
+        return bytes([self.device.operation_mode])
 
-        elif epc == 0xEC:  # 放電電力設定値 (W)
-            if len(data) >= 4:
-                val = struct.unpack('>L', data[:4])[0]
-                d.discharge_power_w = float(val)
-            return True
+    def _get_working_status(self) -> bytes:
+        return bytes([self.device.operation_mode])
 
-        return super().set_property(epc, data)
+    def _get_charge_power(self) -> bytes:
+        return _u32(self.device.charge_power_w)
+
+    def _get_discharge_power(self) -> bytes:
+        return _u32(self.device.discharge_power_w)
+
+    def _set_status(self, data: bytes) -> bool:
+        if data == b'\x30':
+            self.device.is_running = True
+        elif data == b'\x31':
+            self.device.is_running = False
+        return True
+
+    def _set_connection(self, data: bytes) -> bool:
+        d = self.device
+        if not d.vehicle_connected:
+            # 未接続 -> 接続
+            d.vehicle_connected = True
+            d.operation_mode = 0x44  # 待機
+            logger.info("V2H: Vehicle connected. Mode -> Standby (0x44)")
+        return True
+
+    def _set_operation_mode(self, data: bytes) -> bool:
+        d = self.device
+        if not d.vehicle_connected:
+            logger.warning("V2H: SET 0xDA rejected (vehicle not connected)")
+            return False  # 未接続時は失敗
+        val = data[0] if data else 0
+        if val not in (0x42, 0x43, 0x44, 0x47):  # 充電/放電/待機/停止のみ許可
+            logger.warning(f"V2H: SET 0xDA rejected (invalid value: 0x{val:02X})")
+            return False
+        d.operation_mode = val
+        logger.info(f"V2H: Operation mode set to 0x{val:02X}")
+        if val == 0x47:  # 停止
+            d.vehicle_connected = False # 未接続
+        return True
+
+    def _set_charge_power(self, data: bytes) -> bool:
+        if len(data) >= 4:
+            self.device.charge_power_w = float(struct.unpack('>L', data[:4])[0])
+        return True
+
+    def _set_discharge_power(self, data: bytes) -> bool:
+        if len(data) >= 4:
+            self.device.discharge_power_w = float(struct.unpack('>L', data[:4])[0])
+        return True
+
+    PROPERTIES = {
+        0x80: Prop(get=_get_status, set=_set_status, anno=True),  # 動作状態
+        0xC0: Prop(get=_get_capacity),               # 車載電池放電可能容量1 (Wh)
+        0xD0: Prop(get=_get_capacity),               # 車載電池の使用容量値 1
+        0xC2: Prop(get=_get_remaining),              # 車載電池放電可能残容量1 (Wh)
+        0xE2: Prop(get=_get_remaining),              # 車載電池の電池残容量 1
+        0xE4: Prop(get=_get_soc),                    # 車載電池の電池残容量 2 (%) 1バイト
+        0xC7: Prop(get=_get_connection),             # 車両接続・充放電可否状態
+        0xCD: Prop(set=_set_connection),             # 車両接続確認（トグル）
+        0xD3: Prop(get=_get_instant_power),          # 瞬時充放電電力計測値 (W) 符号付き4バイト
+        0xD8: Prop(get=_get_cumulative_charge),      # 積算充電電力量1 (Wh) 4バイト
+        0xD6: Prop(get=_get_cumulative_discharge),   # 積算放電電力量1 (Wh) 4バイト
+        0xDA: Prop(get=_get_operation_mode, set=_set_operation_mode),  # 運転モード設定
+        0xE1: Prop(get=_get_working_status),         # 運転動作状態（運転モード設定に連動）
+        0xEB: Prop(get=_get_charge_power, set=_set_charge_power),        # 充電電力設定値 (W)
+        0xEC: Prop(get=_get_discharge_power, set=_set_discharge_power),  # 放電電力設定値 (W)
+    }
 
 
 class AirConditionerAdapter(BaseAdapter):
     """家庭用エアコン (0x0130) アダプター"""
+    STATIC_PROPS = AIRCON_STATIC_PROPS
 
-    def __init__(self, device: AirConditioner):
-        super().__init__(settings.echonet.ac_id)
+    def __init__(self, device: AirConditioner, instance: int = 1, node_index: int = 0):
+        super().__init__("ac_id", instance, node_index)
         self.device = device
 
-    def _get_supported_epcs(self) -> list[int]:
-        base = super()._get_supported_epcs()
-        dynamic_epcs = [0x80, 0x84, 0x85, 0x8F, 0xA0, 0xB0, 0xB3]
-        static_epcs = list(AIRCON_STATIC_PROPS.keys())
-        return sorted(list(set(base + dynamic_epcs + static_epcs)))
+    def _get_status(self) -> bytes:
+        return _status(self.device.is_running)
 
-    def get_property(self, epc: int) -> Optional[bytes]:
-        d = self.device
+    def _get_instant_power(self) -> bytes:
+        # 2 bytes unsigned, W
+        return struct.pack(">H", max(0, min(int(self.device.instant_power_w), 65533)))
 
-        # Settings 優先プロパティ (0x8A: Maker Code, 0x83: Identification Number)
-        if epc in (0x8A, 0x83):
-            return super().get_property(epc)
-
-        # 動的プロパティ
-        if epc == 0x80:  # 動作状態
-            return b'\x30' if d.is_running else b'\x31'
-        elif epc == 0x84:  # 瞬時消費電力計測値 (2 bytes unsigned, W)
-            return struct.pack(">H", min(int(d.instant_power_w), 65533))
-        elif epc == 0x85:  # 積算消費電力量計測値 (4 bytes unsigned, 0.001 kWh単位 = Wh)
-            return struct.pack(">L", min(int(d.cumulative_power_wh), 0xFFFFFFFE))
-        elif epc == 0x8F:  # 節電動作設定
-            return bytes([d.power_saving_mode])
-        elif epc == 0xA0:  # 風量設定
-            return bytes([d.air_flow_volume])
-        elif epc == 0xB0:  # 運転モード設定
-            return bytes([d.operation_mode])
-        elif epc == 0xB3:  # 温度設定値
-            return bytes([d.temperature_setting])
-
-        # 静的プロパティ
-        if epc in AIRCON_STATIC_PROPS:
-            return AIRCON_STATIC_PROPS[epc]
-
-        return super().get_property(epc)
+    def _get_cumulative_power(self) -> bytes:
+        # 4 bytes unsigned, 0.001 kWh単位 = Wh
+        return struct.pack(">L", max(0, min(int(self.device.cumulative_power_wh), 0xFFFFFFFE)))
 
-    def set_property(self, epc: int, data: bytes) -> bool:
-        d = self.device
-        if epc == 0x80:  # 動作状態
-            if data == b'\x30':
-                d.is_running = True
-            elif data == b'\x31':
-                d.is_running = False
+    def _get_power_saving(self) -> bytes:
+        return bytes([self.device.power_saving_mode])
+
+    def _get_air_flow(self) -> bytes:
+        return bytes([self.device.air_flow_volume])
+
+    def _get_operation_mode(self) -> bytes:
+        return bytes([self.device.operation_mode])
+
+    def _get_temperature(self) -> bytes:
+        return bytes([self.device.temperature_setting])
+
+    def _set_status(self, data: bytes) -> bool:
+        if data == b'\x30':
+            self.device.is_running = True
+        elif data == b'\x31':
+            self.device.is_running = False
+        return True
+
+    def _set_power_saving(self, data: bytes) -> bool:
+        if data and data[0] in (0x41, 0x42):
+            self.device.power_saving_mode = data[0]
+            return True
+        return False
+
+    def _set_operation_mode(self, data: bytes) -> bool:
+        if data and data[0] in (0x40, 0x41, 0x42, 0x43, 0x44, 0x45):
+            self.device.operation_mode = data[0]
+            return True
+        return False
+
+    def _set_temperature(self, data: bytes) -> bool:
+        if data:
+            self.device.temperature_setting = data[0]
+            return True
+        return False
+
+    def _set_air_flow(self, data: bytes) -> bool:
+        if data:
+            self.device.air_flow_volume = data[0]
             return True
-        elif epc == 0x8F:  # 節電動作設定
-            if data and data[0] in (0x41, 0x42):
-                d.power_saving_mode = data[0]
-                return True
-        elif epc == 0xB0:  # 運転モード設定
-            if data and data[0] in (0x40, 0x41, 0x42, 0x43, 0x44, 0x45):
-                d.operation_mode = data[0]
-                return True
-        elif epc == 0xB3:  # 温度設定値
-            if data:
-                d.temperature_setting = data[0]
-                return True
-        elif epc == 0xA0:  # 風量設定
-            if data:
-                d.air_flow_volume = data[0]
-                return True
-        return super().set_property(epc, data)
+        return False
+
+    PROPERTIES = {
+        0x80: Prop(get=_get_status, set=_set_status, anno=True),          # 動作状態
+        0x84: Prop(get=_get_instant_power),                               # 瞬時消費電力計測値
+        0x85: Prop(get=_get_cumulative_power),                            # 積算消費電力量計測値
+        0x8F: Prop(get=_get_power_saving, set=_set_power_saving),         # 節電動作設定
+        0xA0: Prop(get=_get_air_flow, set=_set_air_flow),                 # 風量設定
+        0xB0: Prop(get=_get_operation_mode, set=_set_operation_mode),     # 運転モード設定
+        0xB3: Prop(get=_get_temperature, set=_set_temperature),           # 温度設定値
+    }
@@ -0,0 +1,150 @@
+"""Binary checkpoint of SimulationEngine device state (SOC, hot water, counters, SET values).
+
+Layout of one engine (little endian):
+    header   <4sHIdH   magic b"HEEC", version, layout CRC32, saved_at (epoch s), section count
+    section  <16sH     class key (ASCII, NUL padded), instance count
+             count x record packed from DeviceModel.state_fields
+    trailer  <I        CRC32 of the engine's header and sections
+
+A file holds the main engine followed by one engine per fleet node, in node
+order; nodes are matched by position like instances are (see below).
+
+The layout CRC covers every class's field list, so a checkpoint written with a
+different state layout is rejected instead of misread. Instances are matched
+by index, so instance and node counts may change between runs: saved ones
+beyond the configured count are dropped and new ones keep their startup values.
+Capacities and other configured values are not saved; they follow Settings.
+"""
+import os
+import struct
+import time
+import zlib
+from .device_models import DEVICE_MODELS
+
+MAGIC = b"HEEC"
+VERSION = 1
+_HEADER = struct.Struct("<4sHIdH")
+_SECTION = struct.Struct("<16sH")
+_TRAILER = struct.Struct("<I")
+
+# The grid meter is not a registry model but carries the 0xE0/0xE3 counters
+SMART_METER_FIELDS = (("cumulative_power_buy_kwh", "d"), ("cumulative_power_sell_kwh", "d"))
+
+def _sections(engine) -> list:
+    """(key, state fields, instances) of every class in a checkpoint."""
+    sections = [("smart_meter", SMART_METER_FIELDS, [engine.smart_meter])]
+    for key, model in DEVICE_MODELS.items():
+        if model.state_fields:
+            sections.append((key, model.state_fields, getattr(engine, model.attr)))
+    return sections
+
+def _record(fields: tuple) -> struct.Struct:
+    return struct.Struct("<" + "".join(code for _, code in fields))
+
+def layout_crc(engine) -> int:
+    return zlib.crc32(repr([(key, fields) for key, fields, _ in _sections(engine)]).encode())
+
+def encode(engine) -> bytes:
+    """Pack the device state. Call where the ticks run (simulation_service.run_on_simulation) so no tick runs in between."""
+    sections = _sections(engine)
+    buf = bytearray(_HEADER.pack(MAGIC, VERSION, layout_crc(engine), time.time(), len(sections)))
+    for key, fields, devices in sections:
+        rec = _record(fields)
+        names = [name for name, _ in fields]
+        buf += _SECTION.pack(key.encode("ascii"), len(devices))
+        for dev in devices:
+            buf += rec.pack(*(getattr(dev, name) for name in names))
+    buf += _TRAILER.pack(zlib.crc32(buf))
+    return bytes(buf)
+
+def encode_nodes(engines: list) -> bytes:
+    """encode() of every engine, main engine first, concatenated."""
+    return b"".join(encode(engine) for engine in engines)
+
+def _decode(engine, data: bytes, offset: int) -> tuple[float, list, int]:
+    """Validate the engine checkpoint at offset; returns (saved_at, updates, end offset)."""
+    if len(data) - offset < _HEADER.size + _TRAILER.size:
+        raise ValueError("checkpoint truncated")
+    magic, version, layout, saved_at, count = _HEADER.unpack_from(data, offset)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} checkpoint")
+    if layout != layout_crc(engine):
+        raise ValueError("checkpoint state layout differs from this build")
+
+    known = {key: (fields, devices) for key, fields, devices in _sections(engine)}
+    updates = []
+    start = offset
+    offset += _HEADER.size
+    for _ in range(count):
+        if len(data) - offset < _SECTION.size:
+            raise ValueError("checkpoint truncated")
+        raw_key, n = _SECTION.unpack_from(data, offset)
+        offset += _SECTION.size
+        key = raw_key.rstrip(b"\0").decode("ascii", "replace")
+        if key not in known:
+            raise ValueError(f"unknown checkpoint section: {key}")
+        fields, devices = known[key]
+        rec = _record(fields)
+        if len(data) - offset < n * rec.size:
+            raise ValueError("checkpoint truncated")
+        names = [name for name, _ in fields]
+        for i in range(n):
+            if i < len(devices):
+                updates.append((devices[i], zip(names, rec.unpack_from(data, offset))))
+            offset += rec.size
+    if len(data) - offset < _TRAILER.size:
+        raise ValueError("checkpoint truncated")
+    (crc,) = _TRAILER.unpack_from(data, offset)
+    if zlib.crc32(memoryview(data)[start:offset]) != crc:
+        raise ValueError("checkpoint CRC mismatch")
+    return saved_at, updates, offset + _TRAILER.size
+
+def restore_nodes(engines: list, data: bytes) -> float:
+    """Apply a checkpoint to engines (main engine first); returns its saved_at.
+    Raises ValueError if it is unusable.
+
+    The whole file is validated and decoded before any device is touched.
+    """
+    saved_at = None
+    updates = []
+    offset = 0
+    node = 0
+    while offset < len(data) or node == 0:
+        # Saved nodes beyond the configured ones are still validated, then dropped
+        target = engines[min(node, len(engines) - 1)]
+        at, node_updates, offset = _decode(target, data, offset)
+        if node < len(engines):
+            updates.extend(node_updates)
+        if saved_at is None:
+            saved_at = at
+        node += 1
+
+    for dev, values in updates:
+        for name, value in values:
+            setattr(dev, name, value)
+    return saved_at
+
+def restore(engine, data: bytes) -> float:
+    """restore_nodes for a single engine."""
+    return restore_nodes([engine], data)
+
+def write_atomic(path: str, data: bytes):
+    """Write data to path so that readers see either the old or the new file, never a torn one."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def load(engines: list, path: str):
+    """Restore engines (main engine first) from path; returns saved_at, or None when there is no checkpoint."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    return restore_nodes(engines, data)
@@ -0,0 +1,134 @@
+import threading
+import time
+from typing import Callable, Optional
+from src.config.settings import settings
+
+def parse_time_of_day(value: str) -> float:
+    """'HH:MM' or 'HH:MM:SS' -> seconds from midnight."""
+    parts = [int(p) for p in value.split(':')]
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Invalid time of day: {value}")
+    hh, mm = parts[0], parts[1]
+    ss = parts[2] if len(parts) == 3 else 0
+    if not (0 <= hh < 24 and 0 <= mm < 60 and 0 <= ss < 60):
+        raise ValueError(f"Invalid time of day: {value}")
+    return float(hh * 3600 + mm * 60 + ss)
+
+def format_time_of_day(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+class SimulationClock:
+    """シミュレーション時刻 (エポック秒)。実時間の speed 倍で進む。
+
+    エンジンの dt・シナリオ補間・積算値はすべてこの時計を基準にするため、
+    speed を 60 / 3600 にすれば1日分の挙動を数分で確認できる。
+    pause / resume / seek で一時停止や時刻移動も行える。
+    UI / API (イベントループ) とシミュレーションスレッドから同時に操作できる。
+    """
+
+    def __init__(self, speed: float = 1.0, start_time_of_day: Optional[float] = None,
+                 real_time: Callable[[], float] = time.monotonic):
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        self._real_time = real_time
+        # Anchors, speed and seek_count change together
+        self._lock = threading.RLock()
+        self._speed = float(speed)
+        self._paused = False
+        # Simulation time = _sim_anchor + (real time since _real_anchor) * speed
+        self._real_anchor = real_time()
+        self._sim_anchor = time.time()
+        # Local day containing the last time_of_day() call: [_midnight, _next_midnight)
+        self._midnight = self._next_midnight = 0.0
+        if start_time_of_day is not None:
+            self._sim_anchor = self._local_midnight(self._sim_anchor) + start_time_of_day
+        # Bumped on every seek so integrators can skip the jump
+        self.seek_count = 0
+
+    @classmethod
+    def from_settings(cls) -> "SimulationClock":
+        sim = settings.simulation
+        start = parse_time_of_day(sim.start_time_of_day) if sim.start_time_of_day else None
+        return cls(speed=sim.clock_speed, start_time_of_day=start)
+
+    def now(self) -> float:
+        with self._lock:
+            if self._paused:
+                return self._sim_anchor
+            return self._sim_anchor + (self._real_time() - self._real_anchor) * self._speed
+
+    def sample(self) -> tuple[float, int]:
+        """(now(), seek_count) read together, so a concurrent seek is never half-seen."""
+        with self._lock:
+            return self.now(), self.seek_count
+
+    def _rebase(self):
+        self._sim_anchor = self.now()
+        self._real_anchor = self._real_time()
+
+    @property
+    def speed(self) -> float:
+        return self._speed
+
+    def set_speed(self, speed: float):
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        with self._lock:
+            self._rebase()
+            self._speed = float(speed)
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    def pause(self):
+        with self._lock:
+            if not self._paused:
+                self._rebase()
+                self._paused = True
+
+    def resume(self):
+        with self._lock:
+            if self._paused:
+                self._real_anchor = self._real_time()
+                self._paused = False
+
+    def seek(self, sim_time: float):
+        """Jump to sim_time (epoch seconds)."""
+        with self._lock:
+            self._sim_anchor = float(sim_time)
+            self._real_anchor = self._real_time()
+            self.seek_count += 1
+
+    def advance(self, seconds: float):
+        """Move simulated time forward by seconds (batch use; not counted as a seek)."""
+        with self._lock:
+            self._sim_anchor += seconds
+
+    def seek_time_of_day(self, seconds: float):
+        """Jump to seconds from midnight on the current simulated day."""
+        with self._lock:
+            self.seek(self._local_midnight(self.now()) + seconds)
+
+    @staticmethod
+    def _local_midnight(t: float, days: int = 0) -> float:
+        lt = time.localtime(t)
+        return time.mktime((lt.tm_year, lt.tm_mon, lt.tm_mday + days, 0, 0, 0, 0, 0, -1))
+
+    def time_of_day(self) -> float:
+        """Seconds from local midnight of the simulated time."""
+        with self._lock:
+            t = self.now()
+            if not (self._midnight <= t < self._next_midnight):
+                self._midnight = self._local_midnight(t)
+                self._next_midnight = self._local_midnight(t, 1)
+            return t - self._midnight
+
+    def state(self) -> dict:
+        return {
+            "time": self.now(),
+            "time_of_day": format_time_of_day(self.time_of_day()),
+            "speed": self._speed,
+            "paused": self._paused,
+        }
@@ -0,0 +1,390 @@
+"""Device-model registry for SimulationEngine.
+
+Each model owns one device class: the engine list holding its instances,
+the device physics (step advances them and adds their grid term), and the
+adaptive-step hooks (next event / bound snapping). SimulationEngine steps
+only the enabled models, in registry order, and builds the grid balance
+from their terms in one pass.
+
+A new device class is added by defining a DeviceModel subclass and passing
+an instance to register_device_model(); SimulationEngine is not edited.
+"""
+import logging
+from abc import ABC, abstractmethod
+from src.config.bindings import settings_binding
+from .models import Solar, Battery, ElectricWaterHeater, V2H, AirConditioner
+from .integration import trapezoid, insert_crossings, cap_integral
+
+logger = logging.getLogger(__name__)
+
+# Adaptive stepping: values this close to a bound are snapped onto it
+EVENT_EPS = 1e-9
+
+def add_constant(grid: list, power: float):
+    """Add a power term that is constant over the tick to every node of the grid balance."""
+    if power:
+        for i in range(len(grid)):
+            grid[i] += power
+
+class DeviceModel(ABC):
+    """Base class: key (settings.echonet.wifi_devices), instance list, step and event hooks."""
+    key = ""
+    attr = ""               # SimulationEngine attribute holding the instances
+    device_cls = None
+    id_prefix = ""
+    # Runtime state saved in checkpoints: (attribute, struct format code) per instance
+    state_fields: tuple = ()
+
+    @abstractmethod
+    def step(self, engine, dt: float, nodes: tuple, grid: list):
+        """
+        Advance all instances by dt seconds and add their grid term to grid
+        (W per node, + = consumption, - = generation).
+        nodes = (t, load, solar) lists; a model may insert nodes (all lists incl. grid).
+        """
+
+    def power(self, engine) -> float:
+        """Current grid term of all instances (W, + = consumption), from their state as of the last step."""
+        return 0.0
+
+    def next_event(self, engine) -> float:
+        """Seconds until an instance reaches a bound at its current rate (0 = transition pending)."""
+        return float("inf")
+
+    def snap(self, engine):
+        """Snap values left a rounding error away from a bound."""
+
+class SolarModel(DeviceModel):
+    key, attr, device_cls, id_prefix = "solar", "solars", Solar, "sol"
+    state_fields = (("cumulative_generation_kwh", "d"),)
+
+    def step(self, engine, dt, nodes, grid):
+        ts, _, solars = nodes
+        if engine.use_scenario:
+            # Scenario solar is shared evenly across PV instances
+            solar_kwh = trapezoid(ts, solars) / 3600.0 / 1000.0 / len(engine.solars)
+            for sol in engine.solars:
+                sol.cumulative_generation_kwh += solar_kwh
+        else:
+            kwh_increment_factor = dt / 3600.0 / 1000.0
+            for sol in engine.solars:
+                sol.cumulative_generation_kwh += max(0.0, sol.instant_generation_power) * kwh_increment_factor
+        for i in range(len(grid)):
+            grid[i] -= solars[i]
+
+    def power(self, engine):
+        return -sum(max(0.0, sol.instant_generation_power) for sol in engine.solars)
+
+class BatteryModel(DeviceModel):
+    key, attr, device_cls, id_prefix = "battery", "batteries", Battery, "bat"
+    state_fields = (
+        ("is_running", "?"), ("is_charging", "?"), ("is_discharging", "?"),
+        ("instant_charge_power", "d"), ("instant_discharge_power", "d"), ("soc", "d"),
+        ("cumulative_charge_wh", "d"), ("cumulative_discharge_wh", "d"),
+    )
+
+    def step(self, engine, dt, nodes, grid):
+        self.update(engine, dt)
+        add_constant(grid, self.power(engine))
+
+    def update(self, engine, dt: float):
+        """
+        Handle battery SOC and guards (all instances in one pass).
+        """
+        hours = dt / 3600.0
+        for bat in engine.batteries:
+            # SOC Guard Logic
+            if bat.soc >= 100.0:
+                if bat.is_charging:
+                    logger.info(f"Battery {bat.device_id} fully charged. Stopping charge.")
+                    bat.is_charging = False
+                    bat.instant_charge_power = 0.0
+
+            if bat.soc <= 0.0:
+                if bat.is_discharging:
+                    logger.info(f"Battery {bat.device_id} empty. Stopping discharge.")
+                    bat.is_discharging = False
+                    bat.instant_discharge_power = 0.0
+
+            # Calculate Energy Flow
+            # Wh change
+            energy_delta_wh = 0.0
+            if bat.is_charging:
+                wh_step = bat.instant_charge_power * hours
+                energy_delta_wh += wh_step
+                bat.cumulative_charge_wh += wh_step
+            if bat.is_discharging:
+                wh_step = bat.instant_discharge_power * hours
+                energy_delta_wh -= wh_step
+                bat.cumulative_discharge_wh += wh_step
+
+            # Update SOC
+            # soc_delta = (Wh change / Capacity) * 100
+            if bat.rated_capacity_wh > 0:
+                soc_delta = (energy_delta_wh / bat.rated_capacity_wh) * 100.0
+                bat.soc += soc_delta
+
+            # Clamp SOC
+            bat.soc = max(0.0, min(100.0, bat.soc))
+
+    def power(self, engine):
+        return (sum(b.instant_charge_power for b in engine.batteries if b.is_charging)
+                - sum(b.instant_discharge_power for b in engine.batteries if b.is_discharging))
+
+    def next_event(self, engine):
+        t = float("inf")
+        for bat in engine.batteries:
+            cap = bat.rated_capacity_wh
+            if cap <= 0:
+                continue
+            if bat.is_charging and bat.soc >= 100.0 or bat.is_discharging and bat.soc <= 0.0:
+                return 0.0
+            rate = ((bat.instant_charge_power if bat.is_charging else 0.0)
+                    - (bat.instant_discharge_power if bat.is_discharging else 0.0))  # W
+            if rate > 0:
+                t = min(t, (100.0 - bat.soc) / 100.0 * cap / rate * 3600.0)
+            elif rate < 0:
+                t = min(t, bat.soc / 100.0 * cap / -rate * 3600.0)
+        return t
+
+    def snap(self, engine):
+        for bat in engine.batteries:
+            if bat.is_charging and bat.soc > 100.0 - EVENT_EPS:
+                bat.soc = 100.0
+            elif bat.is_discharging and bat.soc < EVENT_EPS:
+                bat.soc = 0.0
+
+class WaterHeaterModel(DeviceModel):
+    key, attr, device_cls, id_prefix = "water_heater", "water_heaters", ElectricWaterHeater, "wh"
+    state_fields = (
+        ("is_running", "?"), ("auto_setting", "B"), ("is_heating", "?"),
+        ("remaining_hot_water", "d"), ("heating_power_w", "d"),
+        ("e3_bath_operation_status", "B"), ("c0_operation_status", "B"),
+    )
+
+    def step(self, engine, dt, nodes, grid):
+        self.update(engine, dt)
+        add_constant(grid, self.power(engine))
+
+    def update(self, engine, dt: float):
+        """
+        Handle Water Heater Logic (all instances in one pass)
+        """
+        # Decrease when stopped or auto (10 digit/hour)
+        # Increase when heating (1 digit/minute = 60 digit/hour)
+        # Decrease 10 per hour => 10/3600 per second
+        decay = 10.0 / 3600.0 * dt
+        # Increase 60 per hour => 60/3600 per second = 1/60 per second
+        fill = 1.0 / 60.0 * dt
+        for wh in engine.water_heaters:
+            if not wh.is_running:
+                continue
+
+            # 0xB0 = 0x43 (Manual Stop) or 0x41 (Auto) -> Decrease 10/hour
+            if wh.auto_setting == 0x43 or wh.auto_setting == 0x41:
+                wh.is_heating = False
+                wh.remaining_hot_water -= decay
+
+            # 0xB0 = 0x42 (Manual Start) -> Increase 1/minute
+            elif wh.auto_setting == 0x42:
+                wh.is_heating = True
+                wh.remaining_hot_water += fill
+
+                # Stop if full
+                if wh.remaining_hot_water >= wh.tank_capacity:
+                    wh.remaining_hot_water = float(wh.tank_capacity)
+                    wh.auto_setting = 0x41 # Revert to Auto
+                    wh.is_heating = False
+                    logger.info(f"Water Heater {wh.device_id} full. Stopping heating.")
+
+            # Ensure bounds
+            if wh.remaining_hot_water < 0:
+                wh.remaining_hot_water = 0.0
+            # Upper bound is tank capacity (handled above for heating, but clamp generally)
+            if wh.remaining_hot_water > wh.tank_capacity:
+                wh.remaining_hot_water = float(wh.tank_capacity)
+
+    def power(self, engine):
+        return sum(wh.heating_power_w for wh in engine.water_heaters if wh.is_heating)
+
+    def next_event(self, engine):
+        t = float("inf")
+        for wh in engine.water_heaters:
+            if not wh.is_running:
+                continue
+            if wh.auto_setting == 0x42:
+                # Fills at 1/minute
+                t = min(t, max(0.0, wh.tank_capacity - wh.remaining_hot_water) * 60.0)
+            elif wh.auto_setting in (0x41, 0x43) and wh.remaining_hot_water > 0:
+                # Decays at 10/hour
+                t = min(t, wh.remaining_hot_water * 360.0)
+        return t
+
+    def snap(self, engine):
+        for wh in engine.water_heaters:
+            if wh.remaining_hot_water > wh.tank_capacity - EVENT_EPS:
+                wh.remaining_hot_water = float(wh.tank_capacity)
+            elif wh.remaining_hot_water < EVENT_EPS:
+                wh.remaining_hot_water = 0.0
+
+class AirConditionerModel(DeviceModel):
+    key, attr, device_cls, id_prefix = "air_conditioner", "air_conditioners", AirConditioner, "ac"
+    state_fields = (
+        ("is_running", "?"), ("operation_mode", "B"), ("temperature_setting", "B"),
+        ("air_flow_volume", "B"), ("power_saving_mode", "B"), ("cumulative_power_wh", "d"),
+    )
+
+    def step(self, engine, dt, nodes, grid):
+        self.update(engine, dt)
+        add_constant(grid, self.power(engine))
+
+    @staticmethod
+    def device_power(ac: AirConditioner) -> float:
+        """エアコンの現在の消費電力を返す"""
+        if not ac.is_running:
+            return 0.0
+        mode = ac.operation_mode
+        if mode in (0x45, 0x40):  # 送風, その他
+            return 50.0
+        elif mode in (0x41, 0x42, 0x43, 0x44):  # 自動, 冷房, 暖房, 除湿
+            return settings_binding.ac_power_w
+        return 0.0
+
+    def update(self, engine, dt: float):
+        """エアコンの消費電力を更新し積算する (全インスタンス)"""
+        hours = dt / 3600.0
+        for ac in engine.air_conditioners:
+            p = self.device_power(ac)
+            ac.instant_power_w = p
+            ac.cumulative_power_wh += p * hours
+
+    def power(self, engine):
+        return sum(ac.instant_power_w for ac in engine.air_conditioners)
+
+class V2HModel(DeviceModel):
+    key, attr, device_cls, id_prefix = "v2h", "v2hs", V2H, "v2h"
+    state_fields = (
+        ("is_running", "?"), ("vehicle_connected", "?"), ("operation_mode", "B"),
+        ("remaining_capacity_wh", "d"), ("charge_power_w", "d"), ("discharge_power_w", "d"),
+        ("cumulative_charge_wh", "d"), ("cumulative_discharge_wh", "d"),
+    )
+
+    def step(self, engine, dt, nodes, grid):
+        # Discharge follows the balance of everything stepped before (load, solar, battery, ...);
+        # models stepped after V2H (air conditioner) are seen at their previous-tick power
+        ahead = sum(m.power(engine) for m in engine.models_ahead)
+        add_constant(grid, ahead)
+        self.update(engine, dt, nodes, grid)
+        add_constant(grid, -ahead)
+
+    def update(self, engine, dt: float, nodes: tuple = None, grid: list = None):
+        """
+        V2H (電気自動車充放電器) のシミュレーションロジック
+        充電: V2Hを負荷としてグリッド計算式に加算（current_charge_wをセット）
+        放電: V2Hを発電源としてグリッド計算式に加算（current_discharge_wをセット）
+                放電判断は「正味ネット販電電力（太陽光/バッテリー差引後）」で判断
+        複数台ある場合、後続の V2H は先行する V2H の放電分を差し引いた買電量で判断する
+
+        nodes (t, load, solar) は区間内の負荷・太陽光、grid は V2H 以外の買電電力 (ノード毎)。
+        省略時は現在値で一定とみなす。放電量は負荷に追従するため、放電の折れ点
+        (買電 50W / 上限) にノードを追加して区間全体で厳密に積分し、grid に V2H の項を加える。
+        """
+        if nodes is None:
+            nodes = engine._constant_nodes(dt)
+            # V2Hがない場合のネット買電電力（正=買電）: 負荷 + 他の有効なモデルの項
+            others = sum(m.power(engine) for m in engine._models if m is not self)
+            grid = [engine.current_load_w + others] * 2
+        ts, loads, solars = nodes
+        hours = dt / 3600.0
+        p_charge = 0.0
+        for v2h in engine.v2hs:
+            # 前サイクルの電力値をリセット
+            v2h.current_charge_w = 0.0
+            v2h.current_discharge_w = 0.0
+
+            if not v2h.is_running or not v2h.vehicle_connected:
+                continue
+
+            mode = v2h.operation_mode
+
+            if mode == 0x42:  # 充電
+                # V2Hを負荷としてグリッド計算式に追加（グリッドから引く）
+                charge_wh = v2h.charge_power_w * hours
+                v2h.current_charge_w = v2h.charge_power_w
+                v2h.remaining_capacity_wh += charge_wh
+                v2h.cumulative_charge_wh += charge_wh  # 積算充電電力量を更新
+
+                # 満充電Check
+                if v2h.remaining_capacity_wh >= v2h.battery_capacity_wh:
+                    v2h.remaining_capacity_wh = v2h.battery_capacity_wh
+                    v2h.operation_mode = 0x44  # 待機
+                    v2h.current_charge_w = 0.0
+                    logger.info(f"V2H {v2h.device_id}: Fully charged. Mode -> Standby (0x44)")
+                p_charge += v2h.current_charge_w
+
+            elif mode == 0x43:  # 放電
+                # 「ネット販電電力」(grid) で判断（堆键買電量）
+                # 太陽光・バッテリー放電と先行V2Hの放電を差し引いた後の正味販電量をV2Hが不足する
+
+                # 買電量が50Wを超えている場合にのみ放電 (上限 discharge_power_w)
+                limit = v2h.discharge_power_w
+                insert_crossings(ts, [loads, solars, grid], grid, 50.0)
+                insert_crossings(ts, [loads, solars, grid], grid, 50.0 + limit)
+                discharge = [min(max(n - 50.0, 0.0), limit) for n in grid]
+                # Load rising inside the tick must not discharge more than is left:
+                # the discharge stops at the node where the remaining capacity runs out
+                empty = cap_integral(ts, [loads, solars, grid, discharge], discharge,
+                                     v2h.remaining_capacity_wh * 3600.0)
+                discharge_wh = trapezoid(ts, discharge) / 3600.0
+                if discharge_wh > 0:
+                    v2h.current_discharge_w = discharge[-1]
+                    v2h.remaining_capacity_wh -= discharge_wh
+                    v2h.cumulative_discharge_wh += discharge_wh  # 積算放電電力量を更新
+                    for i, d in enumerate(discharge):
+                        grid[i] -= d
+
+                # 残量枯渇Check
+                if empty:
+                    v2h.remaining_capacity_wh = 0.0
+                    v2h.operation_mode = 0x44  # 待機
+                    v2h.current_discharge_w = 0.0
+                    logger.info(f"V2H {v2h.device_id}: Battery empty. Mode -> Standby (0x44)")
+
+            # 残容量クランプ
+            v2h.remaining_capacity_wh = max(0.0, min(v2h.remaining_capacity_wh, v2h.battery_capacity_wh))
+
+        # 充電はV2H放電判断に含めない (充電分は最後に加算)
+        add_constant(grid, p_charge)
+
+    def next_event(self, engine):
+        t = float("inf")
+        for v2h in engine.v2hs:
+            if not v2h.is_running or not v2h.vehicle_connected:
+                continue
+            if v2h.operation_mode == 0x42 and v2h.charge_power_w > 0:
+                t = min(t, max(0.0, v2h.battery_capacity_wh - v2h.remaining_capacity_wh)
+                        / v2h.charge_power_w * 3600.0)
+            elif v2h.operation_mode == 0x43 and v2h.remaining_capacity_wh > 0:
+                # Discharge follows the household load: estimate from the last rate
+                # (a step past the estimate is still exact, update stops at the empty node)
+                rate = v2h.current_discharge_w or v2h.discharge_power_w
+                if rate > 0:
+                    t = min(t, v2h.remaining_capacity_wh / rate * 3600.0)
+        return t
+
+    def snap(self, engine):
+        for v2h in engine.v2hs:
+            if v2h.remaining_capacity_wh > v2h.battery_capacity_wh - EVENT_EPS:
+                v2h.remaining_capacity_wh = v2h.battery_capacity_wh
+            elif v2h.remaining_capacity_wh < EVENT_EPS:
+                v2h.remaining_capacity_wh = 0.0
+
+# Step order (registration order) matters: V2H decides its discharge from the balance
+# of the models before it and the previous-tick power of those after it
+DEVICE_MODELS: dict[str, DeviceModel] = {}
+
+def register_device_model(model: DeviceModel):
+    DEVICE_MODELS[model.key] = model
+
+for _model in (SolarModel(), BatteryModel(), WaterHeaterModel(), V2HModel(), AirConditionerModel()):
+    register_device_model(_model)
@@ -1,6 +1,9 @@
+import asyncio
 import struct
 import logging
-from typing import List, Optional, Tuple, Protocol, Dict
+from collections import Counter, OrderedDict
+from concurrent.futures import Executor
+from typing import Callable, Iterator, List, Optional, Tuple, Protocol, Dict
 
 # Defines
 EHD1 = 0x10
@@ -14,17 +17,52 @@ ESV_INF_REQ = 0x63
 ESV_SET_RES = 0x71
 ESV_GET_RES = 0x72
 ESV_INF     = 0x73
+ESV_SETGET  = 0x6E
+ESV_SETGET_RES = 0x7E
 ESV_SETI_SNA= 0x50
 ESV_SETC_SNA= 0x51
 ESV_GET_SNA = 0x52
+ESV_INF_SNA = 0x53
+ESV_SETGET_SNA = 0x5E
+
+# Request ESVs this node answers; anything else (responses, INF from
+# other nodes) is foreign traffic
+REQUEST_ESVS = frozenset((ESV_SET_I, ESV_SET_C, ESV_GET, ESV_INF_REQ, ESV_SETGET))
+
+# ESVs whose frames carry OPCSet and OPCGet sections
+SETGET_ESVS = (ESV_SETGET, ESV_SETGET_RES, ESV_SETGET_SNA)
+
+# Instance code 0x00 addresses every instance of a class
+WILDCARD_INSTANCE = 0x00
+
+# Fixed part of Format 1: EHD1 EHD2 TID(2) SEOJ(3) DEOJ(3) ESV OPC
+HEADER_SIZE = 12
+_HEADER = struct.Struct(">BBHBBBBBBBB")
 
 logger = logging.getLogger(__name__)
 
+# Requests that change object state
+WRITE_ESVS = frozenset((ESV_SET_I, ESV_SET_C, ESV_SETGET))
+
 class EchonetObjectInterface(Protocol):
+    # Objects may also expose published = (generation, {EPC: EDT}) snapshots (BaseAdapter);
+    # get_property(epc, snapshot) then reads from the given one
     def get_property(self, epc: int) -> Optional[bytes]: ...
     def set_property(self, epc: int, data: bytes) -> bool: ...
 
 class EchonetFrame:
+    """ECHONET Lite frame (Format 1).
+
+    Parsing decodes only the fixed 12-byte header. The EPC/PDC/EDT section
+    stays in the received buffer (as a memoryview) and is walked on demand by
+    iter_props(), so frames that are dropped after the DEOJ lookup never
+    allocate per-property objects.
+
+    SetGet frames (0x6E/0x7E/0x5E) carry a second OPCGet section, exposed
+    through iter_get_props() / get_props.
+    """
+    __slots__ = ("ehd1", "ehd2", "tid", "seoj", "deoj", "esv", "opc", "_buf", "_props", "_get_props")
+
     def __init__(self, data: bytes = None):
         self.ehd1 = EHD1
         self.ehd2 = EHD2
@@ -33,113 +71,311 @@ class EchonetFrame:
         self.deoj = (0x0E, 0xF0, 0x01) # Default: Node Profile
         self.esv = 0
         self.opc = 0
-        self.props: List[Tuple[int, bytes]] = []
+        self._buf: Optional[memoryview] = None
+        self._props: Optional[List[Tuple[int, bytes]]] = []
+        self._get_props: Optional[List[Tuple[int, bytes]]] = []
         
         if data:
             self.parse(data)
             
     def parse(self, data: bytes):
-        if len(data) < 12:
+        if len(data) < HEADER_SIZE:
             raise ValueError("Data too short")
-        if data[0] != EHD1 or data[1] != EHD2:
+        (ehd1, ehd2, self.tid,
+         s1, s2, s3, d1, d2, d3,
+         self.esv, self.opc) = _HEADER.unpack_from(data)
+        if ehd1 != EHD1 or ehd2 != EHD2:
             raise ValueError("Invalid EHD")
-            
-        self.ehd1 = data[0]
-        self.ehd2 = data[1]
-        self.tid = struct.unpack(">H", data[2:4])[0]
-        self.seoj = (data[4], data[5], data[6])
-        self.deoj = (data[7], data[8], data[9])
-        self.esv = data[10]
-        self.opc = data[11]
-        
-        offset = 12
-        for _ in range(self.opc):
-            if offset + 2 > len(data): break
-            epc = data[offset]
-            pdc = data[offset+1]
+
+        self.ehd1 = ehd1
+        self.ehd2 = ehd2
+        self.seoj = (s1, s2, s3)
+        self.deoj = (d1, d2, d3)
+        # Properties are decoded lazily from the buffer
+        self._buf = memoryview(data)
+        self._props = None
+        self._get_props = None
+
+    def _walk(self, offset: int, count: int) -> Iterator[Tuple[int, memoryview]]:
+        buf = self._buf
+        size = len(buf)
+        for _ in range(count):
+            if offset + 2 > size: return
+            epc = buf[offset]
+            pdc = buf[offset+1]
             offset += 2
-            if offset + pdc > len(data): break
-            pdt = data[offset : offset+pdc]
+            if offset + pdc > size: return
+            yield epc, buf[offset : offset+pdc]
             offset += pdc
-            self.props.append((epc, pdt))
-            
+
+    def iter_props(self) -> Iterator[Tuple[int, memoryview]]:
+        """Yield (EPC, EDT) pairs. EDT is a zero-copy view into the received buffer."""
+        if self._props is not None:
+            yield from self._props
+            return
+        yield from self._walk(HEADER_SIZE, self.opc)
+
+    def iter_get_props(self) -> Iterator[Tuple[int, memoryview]]:
+        """Yield the OPCGet section of a SetGet frame (empty for other ESVs)."""
+        if self._get_props is not None:
+            yield from self._get_props
+            return
+        if self.esv not in SETGET_ESVS:
+            return
+        # Skip the OPCSet section to find OPCGet
+        offset = HEADER_SIZE
+        count = 0
+        for _, pdt in self._walk(HEADER_SIZE, self.opc):
+            offset += 2 + len(pdt)
+            count += 1
+        if count < self.opc or offset >= len(self._buf):
+            return # Truncated
+        yield from self._walk(offset + 1, self._buf[offset])
+
+    @property
+    def props(self) -> List[Tuple[int, bytes]]:
+        # Materialize on first access (e.g. debugging / tests)
+        if self._props is None:
+            self._props = [(epc, bytes(pdt)) for epc, pdt in self.iter_props()]
+        return self._props
+
+    @props.setter
+    def props(self, value: List[Tuple[int, bytes]]):
+        self.get_props # Materialize OPCGet before dropping the buffer
+        self._props = value
+        self._buf = None
+
+    @property
+    def get_props(self) -> List[Tuple[int, bytes]]:
+        # OPCGet section (SetGet ESVs only)
+        if self._get_props is None:
+            self._get_props = [(epc, bytes(pdt)) for epc, pdt in self.iter_get_props()]
+        return self._get_props
+
+    @get_props.setter
+    def get_props(self, value: List[Tuple[int, bytes]]):
+        self.props # Materialize OPCSet before dropping the buffer
+        self._get_props = value
+        self._buf = None
+
     def to_bytes(self) -> bytes:
-        header = struct.pack(">BBHBBB BBB BB", 
+        props = self.props
+        out = bytearray(HEADER_SIZE)
+        _HEADER.pack_into(out, 0,
             self.ehd1, self.ehd2, self.tid,
             *self.seoj, *self.deoj,
-            self.esv, len(self.props)
+            self.esv, len(props)
         )
-        body = b""
-        for epc, pdt in self.props:
-            body += struct.pack("BB", epc, len(pdt)) + pdt
-        return header + body
+        # Append in place: amortized linear, no intermediate bytes objects
+        for epc, pdt in props:
+            out.append(epc)
+            out.append(len(pdt))
+            out += pdt
+        if self.esv in SETGET_ESVS:
+            get_props = self.get_props
+            out.append(len(get_props))
+            for epc, pdt in get_props:
+                out.append(epc)
+                out.append(len(pdt))
+                out += pdt
+        return bytes(out)
 
 class EchonetController:
-    def __init__(self):
+    def __init__(self, cache_size: int = 256):
         self._objects: Dict[Tuple[int, int, int], EchonetObjectInterface] = {}
+        # (group, code) -> registered instance codes, for wildcard fan-out
+        self._instances: Dict[Tuple[int, int], List[int]] = {}
+        # GET response cache: (request bytes from DEOJ onward, object generation) -> response from ESV onward
+        self._cache_size = cache_size
+        self._response_cache: OrderedDict = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Dropped frames per reason (too_short / invalid_ehd / not_request / unknown_deoj)
+        self.rejects: Counter = Counter()
+        # Callable returning the executor that SETs run on (the simulation thread, so
+        # they never interleave with a tick), or None / returning None to run inline
+        self.write_executor: Optional[Callable[[], Optional[Executor]]] = None
         
     def register_instance(self, group: int, code: int, instance: int, handler: EchonetObjectInterface):
         key = (group, code, instance)
         self._objects[key] = handler
+        # Instance lists are replaced, never changed in place: settings listeners
+        # (un)register on the simulation thread while the loop fans out wildcards
+        instances = self._instances.get((group, code), [])
+        if instance not in instances:
+            self._instances[(group, code)] = instances + [instance]
         logger.info(f"Registered object: {key}")
+
+    def unregister_instance(self, group: int, code: int, instance: int) -> Optional[EchonetObjectInterface]:
+        """Remove an object (e.g. its device class was disabled); returns its handler."""
+        key = (group, code, instance)
+        handler = self._objects.pop(key, None)
+        instances = self._instances.get((group, code))
+        if instances and instance in instances:
+            remaining = [i for i in instances if i != instance]
+            if remaining:
+                self._instances[(group, code)] = remaining
+            else:
+                del self._instances[(group, code)]
+        # A later object at the same EOJ restarts its snapshot generations
+        # (a new cache, so a lookup in progress keeps a consistent one)
+        self._response_cache = OrderedDict()
+        if handler is not None:
+            logger.info(f"Unregistered object: {key}")
+        return handler
+
+    def instances_of(self, group: int, code: int) -> List[int]:
+        """Registered instance codes of a class."""
+        return list(self._instances.get((group, code), ()))
+
+    def dispatch(self, data: bytes, source_addr, reply: Callable[[List[bytes]], None]):
+        """handle_packet_all, passing the responses to reply (on the calling event loop).
+
+        Requests that write (SetI / SetC / SetGet) run on write_executor when
+        one is set: the event loop never waits for a running tick, and the
+        reply is sent once the write has been applied between ticks.
+        """
+        executor = self.write_executor() if self.write_executor is not None else None
+        if executor is None or len(data) < HEADER_SIZE or data[10] not in WRITE_ESVS:
+            reply(self.handle_packet_all(data, source_addr))
+            return
+
+        def done(future):
+            try:
+                responses = future.result()
+            except Exception as e:
+                logger.error(f"Failed to handle ECHONET write request: {e}")
+                return
+            reply(responses)
+
+        loop = asyncio.get_running_loop()
+        loop.run_in_executor(executor, self.handle_packet_all, data, source_addr).add_done_callback(done)
+
+    def handle_packet_all(self, data: bytes, source_addr) -> List[bytes]:
+        """Like handle_packet, but a request to instance 0x00 is fanned out to
+        every registered instance of the class, each answering as itself."""
+        if len(data) < HEADER_SIZE or data[9] != WILDCARD_INSTANCE:
+            res = self.handle_packet(data, source_addr)
+            return [res] if res is not None else []
+        # The header is checked (and a dropped frame counted) once, not per instance
+        reason = self._check_header(data)
+        if reason is None:
+            instances = self._instances.get((data[7], data[8]))
+            if not instances:
+                reason = "unknown_deoj"
+        if reason is not None:
+            self.rejects[reason] += 1
+            return []
+        responses = []
+        head, tail = data[:9], data[10:]
+        for instance in instances:
+            handler = self._objects.get((data[7], data[8], instance))
+            if handler is None:
+                continue
+            res = self._answer(b"".join((head, bytes((instance,)), tail)), handler)
+            if res is not None:
+                responses.append(res)
+        return responses
         
     def handle_packet(self, data: bytes, source_addr) -> Optional[bytes]:
-        try:
-            req = EchonetFrame(data)
-        except ValueError as e:
-            logger.warning(f"Parse error: {e} | Data: {data.hex()}")
+        handler = self._accept(data)
+        if handler is None:
             return None
-            
-        target_key = req.deoj
-        
+        return self._answer(data, handler)
 
-            
-        handler = self._objects.get(target_key)
-        if not handler:
-            logger.debug(f"Unknown target object: {target_key}")
-            # Should strictly return SNA (Service Not Available) but ignore for now
+    def _answer(self, data: bytes, handler: EchonetObjectInterface) -> Optional[bytes]:
+        """Response to an accepted request for handler (DEOJ = handler's EOJ)."""
+        # One published snapshot per request: every EPC of the response and the
+        # cache key come from the same tick, even while ticks publish on another thread
+        published = getattr(handler, "published", None)
+
+        # Fast path: repeated identical GETs to an object whose published
+        # snapshot has not changed are answered without parsing or dispatch.
+        key = None
+        if data[10] == ESV_GET:
+            if published is not None:
+                key = (data[7:], published[0])
+                cache = self._response_cache
+                tail = cache.get(key)
+                if tail is not None:
+                    cache.move_to_end(key)
+                    self.cache_hits += 1
+                    # Patch TID and swap SEOJ/DEOJ
+                    return b"".join((data[0:4], data[7:10], data[4:7], tail))
+                self.cache_misses += 1
+
+        res = self._process(data, handler, published)
+        if key is not None and res is not None:
+            cache[key] = res[10:]
+            if len(cache) > self._cache_size:
+                cache.popitem(last=False)
+        return res
+
+    @staticmethod
+    def _check_header(data: bytes) -> Optional[str]:
+        """Reject reason for a frame's length / EHD / ESV, or None if it is a request."""
+        if len(data) < HEADER_SIZE:
+            return "too_short"
+        if data[0] != EHD1 or data[1] != EHD2:
+            return "invalid_ehd"
+        if data[10] not in REQUEST_ESVS:
+            return "not_request"
+        return None
+
+    def _accept(self, data: bytes) -> Optional[EchonetObjectInterface]:
+        """Check length, EHD and ESV and resolve DEOJ on the raw bytes.
+
+        Returns the target object, or None (counted in self.rejects) for
+        frames this node ignores, before any frame object is built.
+        """
+        reason = self._check_header(data)
+        if reason is None:
+            handler = self._objects.get((data[7], data[8], data[9]))
+            if handler is not None:
+                return handler
+            reason = "unknown_deoj"
+        self.rejects[reason] += 1
+        return None
+
+    def cache_stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "entries": len(self._response_cache),
+        }
+
+    def reject_stats(self) -> Dict[str, int]:
+        return dict(self.rejects)
+
+    def _process(self, data: bytes, handler: EchonetObjectInterface, published=None) -> Optional[bytes]:
+        # Header already validated by _accept
+        req = EchonetFrame(data)
+
+        # Single pass over the request: each section is walked once and
+        # dispatched straight to the handler
+        esv = req.esv
+        res_get_props = None
+        if esv == ESV_GET:
+            res_props, ok = self._read(handler, req.iter_props(), published)
+            res_esv = ESV_GET_RES if ok else ESV_GET_SNA
+        elif esv == ESV_INF_REQ:
+            # Answered by a notification (INF) of the requested values
+            res_props, ok = self._read(handler, req.iter_props(), published)
+            res_esv = ESV_INF if ok else ESV_INF_SNA
+        elif esv == ESV_SET_C:
+            res_props, ok = self._write(handler, req.iter_props())
+            res_esv = ESV_SET_RES if ok else ESV_SETC_SNA
+        elif esv == ESV_SET_I:
+            # SetI is "Set Request (no response required)"
+            self._write(handler, req.iter_props())
             return None
-            
-        # Process properties
-        res_props = []
-        is_success = True
-        
-        for epc, pdt in req.props:
-            val = None
-            if req.esv == ESV_GET:
-                val = handler.get_property(epc)
-                if val is not None:
-                    res_props.append((epc, val))
-                else:
-                    # Generic error for Get -> return with count 0 in SNA usually, or 0 length?
-                    # ECHONET spec says for Get SNA: copy EPC, PDC=0
-                    res_props.append((epc, b"")) # SNA placeholder
-                    is_success = False
-            elif req.esv in [ESV_SET_I, ESV_SET_C]:
-                if handler.set_property(epc, pdt):
-                     # For Set response, we usually don't send back data, just EPC and PDC=0
-                    res_props.append((epc, b""))
-                else:
-                    is_success = False
-            
-        # Determine Response ESV
-        res_esv = 0
-        if req.esv == ESV_GET:
-            res_esv = ESV_GET_RES if is_success else ESV_GET_SNA
-        elif req.esv == ESV_SET_C:
-            res_esv = ESV_SET_RES if is_success else ESV_SETC_SNA
-        elif req.esv == ESV_SET_I:
-            # SET_I usually doesn't require response unless error? 
-            # Actually SetI (60) often expects no response, but SetC (61) does.
-            # If implementation requires reliable, use SetC.
-            # If we succeed SetI, we return nothing usually?
-            # ECHONET spec: ESV 0x60 -> 0x7E (SetGet_Res) is not for this.
-            # Actually SetI is "Set Request (no response required)". 
-            # But we might send response if it fails (SNA)?
-            # Keep it simple: if SetI and success -> None.
-            return None 
-
-        if not res_esv:
+        elif esv == ESV_SETGET:
+            # Write then read back in the same request (one round-trip)
+            res_props, set_ok = self._write(handler, req.iter_props())
+            # (the snapshot the write published)
+            res_get_props, get_ok = self._read(handler, req.iter_get_props(), getattr(handler, "published", None))
+            res_esv = ESV_SETGET_RES if set_ok and get_ok else ESV_SETGET_SNA
+        else:
             return None
 
         # Build Response
@@ -149,9 +385,40 @@ class EchonetController:
         res.deoj = req.seoj
         res.esv = res_esv
         res.props = res_props
+        if res_get_props is not None:
+            res.get_props = res_get_props
         
         return res.to_bytes()
 
+    @staticmethod
+    def _read(handler: EchonetObjectInterface, props, published=None) -> Tuple[List[Tuple[int, bytes]], bool]:
+        res_props = []
+        ok = True
+        snapshot = published[1] if published is not None else None
+        for epc, _ in props:
+            val = handler.get_property(epc) if snapshot is None else handler.get_property(epc, snapshot)
+            if val is not None:
+                res_props.append((epc, val))
+            else:
+                # ECHONET spec says for Get SNA: copy EPC, PDC=0
+                res_props.append((epc, b""))
+                ok = False
+        return res_props, ok
+
+    def _write(self, handler: EchonetObjectInterface, props) -> Tuple[List[Tuple[int, bytes]], bool]:
+        res_props = []
+        ok = True
+        for epc, pdt in props:
+            edt = bytes(pdt)
+            if handler.set_property(epc, edt):
+                # Accepted: EPC with PDC=0
+                res_props.append((epc, b""))
+            else:
+                # Rejected: echo the requested EDT back (SNA)
+                res_props.append((epc, edt))
+                ok = False
+        return res_props, ok
+
 # Global ECHONET Controllers
 # Separate controllers for Wi-Fi (Solar/Battery) and Wi-SUN (Smart Meter)
 wifi_echonet_ctrl = EchonetController()
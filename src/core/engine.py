@@ -1,6 +1,11 @@
-import time
 import logging
 from .models import SmartMeter, Solar, Battery, DeviceType, ElectricWaterHeater, V2H, AirConditioner
+from .scenario import CompiledScenario
+from .timeline import load_scenario
+from .stochastic import apply_stochastic
+from .integration import positive_area
+from .device_models import DEVICE_MODELS, DeviceModel
+from .clock import SimulationClock
 
 logger = logging.getLogger(__name__)
 
@@ -9,43 +14,105 @@ from .water_heater_consts import WATER_HEATER_STATIC_PROPS
 import struct
 from src.config.settings import settings
 
+# ECHONET instance codes 0x01-0x7F
+MAX_INSTANCES = 0x7F
+
+def instance_count(key: str) -> int:
+    """settings.echonet.instance_counts から1クラスあたりのインスタンス数を返す"""
+    try:
+        n = int(settings.echonet.instance_counts.get(key, 1))
+    except Exception:
+        n = 1
+    return max(1, min(n, MAX_INSTANCES))
+
+def _make_devices(model, prefix: str, key: str) -> list:
+    return [model(device_id=f"{prefix}_{i:02d}") for i in range(1, instance_count(key) + 1)]
+
 class SimulationEngine:
-    def __init__(self):
+    def __init__(self, scenario: CompiledScenario = None, clock: SimulationClock = None,
+                 enabled: list[str] = None):
         # Initialize devices with default IDs
+        # Each class holds N instances (settings.echonet.instance_counts);
+        # smart_meter is the grid connection point and is always single.
         self.smart_meter = SmartMeter(device_id="sm_01")
-        self.solar = Solar(device_id="sol_01")
-        self.battery = Battery(device_id="bat_01")
-        self.water_heater = ElectricWaterHeater(device_id="wh_01")
-        self.v2h = V2H(device_id="v2h_01")
-        self.air_conditioner = AirConditioner(device_id="ac_01")
+        for model in DEVICE_MODELS.values():
+            setattr(self, model.attr, _make_devices(model.device_cls, model.id_prefix, model.key))
+        # Only enabled device models are stepped (None = all registered models)
+        self._models: list[DeviceModel] = []
+        self.set_enabled_models(enabled)
+        # Models after the one being stepped, in this tick's list (see _integrate)
+        self.models_ahead: list[DeviceModel] = []
         
         # Simulation State
         self.current_load_w: float = 500.0  # Base household load
-        self.last_update_time: float = time.time()
+        # All simulated time (dt, scenario time of day) comes from the clock
+        self.clock = clock if clock is not None else SimulationClock()
+        self.last_update_time: float = self.clock.now()
+        self._seek_count = self.clock.seek_count
+
+        # ECHONET objects whose encoded property snapshot is refreshed every tick.
+        # Device state is only changed where the ticks run (the simulation thread in
+        # simulation.executor = "thread"; see simulation_service.run_on_simulation);
+        # GETs read the published snapshots from any thread.
+        self._snapshot_sources = []
         
         # Scenario Data
         self.use_scenario = True
-        self.scenario_data = [] # List of {'time_sec': int, 'load': float, 'solar': float}
-        # settings からシナリオファイルを読み込む
-        try:
-            _scenario_path = settings.simulation.scenario_file
-        except Exception:
-            _scenario_path = "data/scenarios/default_scenario.csv"
-        self._load_scenario(_scenario_path)
+        self.scenario = CompiledScenario() # Parallel arrays of time_sec / load / solar
+        if scenario is not None:
+            # 読み込み済みのシナリオを共有する (フリートモード)
+            self.scenario = scenario
+        else:
+            # settings からシナリオファイルを読み込む
+            try:
+                _scenario_path = settings.simulation.scenario_file
+            except Exception:
+                _scenario_path = "data/scenarios/default_scenario.csv"
+            self._load_scenario(_scenario_path)
         
         # Initialize properties from settings and consts
         self._init_device_settings()
         
         logger.info("Simulation Engine Initialized")
 
+    def set_enabled_models(self, keys: list[str] = None):
+        """Step only the device models in keys (settings.echonet.wifi_devices keys), in registry order."""
+        self._models = [m for key, m in DEVICE_MODELS.items() if keys is None or key in keys]
+
+    @property
+    def enabled_models(self) -> list[str]:
+        return [m.key for m in self._models]
+
+    # First instance of each class (single-instance callers: UI, tests)
+    @property
+    def solar(self) -> Solar:
+        return self.solars[0]
+
+    @property
+    def battery(self) -> Battery:
+        return self.batteries[0]
+
+    @property
+    def water_heater(self) -> ElectricWaterHeater:
+        return self.water_heaters[0]
+
+    @property
+    def v2h(self) -> V2H:
+        return self.v2hs[0]
+
+    @property
+    def air_conditioner(self) -> AirConditioner:
+        return self.air_conditioners[0]
+
     def _init_device_settings(self):
-        """設定ファイル(settings.yaml)や固定プロパティから各デバイスの初期値を設定する"""
+        """設定ファイル(settings.yaml)や固定プロパティから各デバイスの初期値を設定する (全インスタンス共通)"""
         if 0xD0 in BATTERY_STATIC_PROPS:
             try:
                 # 0xD0: Rated Electric Energy (4 bytes big endian Wh)
                 data = BATTERY_STATIC_PROPS[0xD0]
                 val = struct.unpack(">L", data)[0]
-                self.battery.rated_capacity_wh = float(val)
+                for bat in self.batteries:
+                    bat.rated_capacity_wh = float(val)
                 logger.info(f"Battery Rated Capacity initialized from property 0xD0: {val} Wh")
             except Exception as e:
                 logger.error(f"Failed to parse Battery Property 0xD0: {e}")
@@ -53,16 +120,20 @@ class SimulationEngine:
         # Settings の値で上書き（Settings が 0 でなければ優先）
         try:
             cap = settings.echonet.battery_rated_capacity_wh
+            charge_w = settings.echonet.battery_charge_power_w
+            discharge_w = settings.echonet.battery_discharge_power_w
+            for bat in self.batteries:
+                if cap > 0:
+                    bat.rated_capacity_wh = cap
+                if charge_w > 0:
+                    bat.max_charge_power_w = charge_w
+                if discharge_w > 0:
+                    bat.max_discharge_power_w = discharge_w
             if cap > 0:
-                self.battery.rated_capacity_wh = cap
                 logger.info(f"Battery Rated Capacity overridden by Settings: {cap} Wh")
-            charge_w = settings.echonet.battery_charge_power_w
             if charge_w > 0:
-                self.battery.max_charge_power_w = charge_w
                 logger.info(f"Battery Charge Power set from Settings: {charge_w} W")
-            discharge_w = settings.echonet.battery_discharge_power_w
             if discharge_w > 0:
-                self.battery.max_discharge_power_w = discharge_w
                 logger.info(f"Battery Discharge Power set from Settings: {discharge_w} W")
         except Exception as e:
             logger.error(f"Failed to load Battery settings: {e}")
@@ -70,328 +141,221 @@ class SimulationEngine:
         # Initialize Water Heater Properties
         # 1. Tank Capacity from Settings
         try:
-            self.water_heater.tank_capacity = settings.echonet.water_heater_tank_capacity
-            self.water_heater.heating_power_w = settings.echonet.water_heater_power_w
-            logger.info(f"Water Heater configured: Cap={self.water_heater.tank_capacity}L, Power={self.water_heater.heating_power_w}W")
+            for wh in self.water_heaters:
+                wh.tank_capacity = settings.echonet.water_heater_tank_capacity
+                wh.heating_power_w = settings.echonet.water_heater_power_w
+            logger.info(f"Water Heater configured: Cap={self.water_heater.tank_capacity}L, Power={self.water_heater.heating_power_w}W"
+                        f" x{len(self.water_heaters)}")
         except Exception as e:
             logger.error(f"Failed to load Water Heater settings: {e}")
 
         # 2. Remaining Hot Water = Half of Tank Capacity (User Request)
-        self.water_heater.remaining_hot_water = float(self.water_heater.tank_capacity) / 2.0
+        for wh in self.water_heaters:
+            wh.remaining_hot_water = float(wh.tank_capacity) / 2.0
         logger.info(f"Water Heater Remaining Hot Water initialized to half capacity: {self.water_heater.remaining_hot_water}L")
 
         # Initialize V2H Properties from Settings
         try:
-            self.v2h.battery_capacity_wh = settings.echonet.v2h_battery_capacity_wh
-            self.v2h.charge_power_w = settings.echonet.v2h_charge_power_w
-            self.v2h.discharge_power_w = settings.echonet.v2h_discharge_power_w
-            # 初期残容量 = 車載電池放電可能容量の50%
-            self.v2h.remaining_capacity_wh = self.v2h.battery_capacity_wh * 0.5
-            logger.info(f"V2H configured: Cap={self.v2h.battery_capacity_wh}Wh, "
-                        f"Remain={self.v2h.remaining_capacity_wh}Wh, "
-                        f"ChargePow={self.v2h.charge_power_w}W, DischargePow={self.v2h.discharge_power_w}W")
+            for v2h in self.v2hs:
+                v2h.battery_capacity_wh = settings.echonet.v2h_battery_capacity_wh
+                v2h.charge_power_w = settings.echonet.v2h_charge_power_w
+                v2h.discharge_power_w = settings.echonet.v2h_discharge_power_w
+                # 初期残容量 = 車載電池放電可能容量の50%
+                v2h.remaining_capacity_wh = v2h.battery_capacity_wh * 0.5
+            v2h = self.v2h
+            logger.info(f"V2H configured: Cap={v2h.battery_capacity_wh}Wh, "
+                        f"Remain={v2h.remaining_capacity_wh}Wh, "
+                        f"ChargePow={v2h.charge_power_w}W, DischargePow={v2h.discharge_power_w}W"
+                        f" x{len(self.v2hs)}")
         except Exception as e:
             logger.error(f"Failed to load V2H settings: {e}")
 
     def _load_scenario(self, filepath: str):
-        import csv
         import os
         if not os.path.exists(filepath):
             logger.warning(f"Scenario file not found: {filepath}")
             return
             
         try:
-            with open(filepath, 'r') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # Parse time HH:MM -> seconds from midnight
-                    hh, mm = map(int, row['time'].split(':'))
-                    t_sec = hh * 3600 + mm * 60
-                    self.scenario_data.append({
-                        'time_sec': t_sec,
-                        'load': float(row['load_w']),
-                        'solar': float(row['solar_w'])
-                    })
-            self.scenario_data.sort(key=lambda x: x['time_sec'])
-            logger.info(f"Loaded {len(self.scenario_data)} scenario points")
+            # settings.stochastic.seed adds seeded noise / appliance events / clouds on top
+            self.scenario = apply_stochastic(load_scenario(filepath))
+            logger.info(f"Loaded {len(self.scenario)} scenario points")
         except Exception as e:
             logger.error(f"Failed to load scenario: {e}")
 
     def switch_scenario(self, filepath: str):
         """実行するシナリオを切り替える。再起動不要でエンジンに即時反映される。"""
-        self.scenario_data = []
+        self.scenario = CompiledScenario()
         self._load_scenario(filepath)
         logger.info(f"Scenario switched to: {filepath}")
 
-    def _get_current_scenario_values(self):
-        if not self.scenario_data:
+    def _get_current_scenario_values(self, current_sec: float = None):
+        if not self.scenario:
             return 500.0, 0.0 # Default fallback
             
-        # Get current time of day in seconds
-        now_struct = time.localtime()
-        current_sec = now_struct.tm_hour * 3600 + now_struct.tm_min * 60 + now_struct.tm_sec
-        
-        # Find interval
-        prev_point = self.scenario_data[-1]
-        next_point = self.scenario_data[0]
-        
-        for point in self.scenario_data:
-            if point['time_sec'] > current_sec:
-                next_point = point
-                break
-            prev_point = point
-            
-        # Linear Interpolation
-        t1 = prev_point['time_sec']
-        t2 = next_point['time_sec']
-        
-        if t1 == t2: return prev_point['load'], prev_point['solar']
-        
-        # Wrap around midnight case
-        if t2 < t1:
-             # e.g. t1=23:00 (82800), t2=06:00 (21600). current=02:00 (7200).
-             # Shift t2 and current by +24h for calculation
-             t2 += 86400
-             if current_sec < t1: current_sec += 86400
-        
-        ratio = (current_sec - t1) / (t2 - t1)
-        ratio = max(0.0, min(1.0, ratio))
-        
-        load = prev_point['load'] + (next_point['load'] - prev_point['load']) * ratio
-        solar = prev_point['solar'] + (next_point['solar'] - prev_point['solar']) * ratio
-        
-        return load, solar
+        # Scenario position (time of day; epoch seconds for a ScenarioTimeline)
+        if current_sec is None:
+            current_sec = self.scenario.time_of(self.clock)
+        return self.scenario.values_at(current_sec)
 
     def update_simulation(self):
         """
         Periodic update function to calculate power balance and update device states.
         Should be called every ~1 second.
         """
-        now = time.time()
+        now, seeks = self.clock.sample()
         dt = now - self.last_update_time
         self.last_update_time = now
-        
+        if seeks != self._seek_count:
+            # The clock was moved: don't integrate energy across the jump
+            self._seek_count = seeks
+            dt = 0.0
+        sim = settings.simulation
+        if sim.adaptive_step and dt > 0:
+            self.advance(dt, sim.max_step_sec)
+        else:
+            self.step(dt)
+
+    def step(self, dt: float):
+        """Advance the simulation by dt seconds."""
+        self._integrate(dt)
+        # 4. Publish encoded property values for ECHONET GETs
+        self.publish_snapshots()
+
+    def advance(self, duration: float, max_step: float = 900.0) -> int:
+        """
+        Event-driven stepping over the duration seconds that end at the current clock time.
+        Each sub-step runs straight to the next scenario point or device event
+        (battery 0/100 %, V2H full/empty, water heater full/empty), capped at max_step,
+        so device transitions land exactly on step boundaries.
+        Returns the number of sub-steps.
+        """
+        current_sec = self.scenario.wrap(self.scenario.time_of(self.clock) - duration)
+        remaining = duration
+        steps = 0
+        last_h = None
+        while remaining > 0:
+            h = min(remaining, max_step)
+            at_point = False
+            if self.use_scenario and self.scenario:
+                to_point = self.scenario.time_to_next_point(current_sec)
+                if to_point <= h:
+                    h, at_point = to_point, True
+            h = min(h, self._time_to_next_event())
+            if h <= 0 and last_h == 0:
+                # A pending transition did not fire: don't spin on zero-length steps
+                h, at_point = min(remaining, max_step), False
+            last_h = h
+            if at_point and h == to_point:
+                # Land exactly on the scenario point (no float drift)
+                current_sec = self.scenario.next_point(current_sec)
+            else:
+                current_sec = self.scenario.wrap(current_sec + h)
+            self._integrate(h, current_sec)
+            self._snap_to_bounds()
+            remaining -= h
+            steps += 1
+        self.publish_snapshots()
+        return steps
+
+    def _time_to_next_event(self) -> float:
+        """Seconds until the first enabled device reaches a bound at its current rate (0 = transition pending)."""
+        return min((m.next_event(self) for m in self._models), default=float("inf"))
+
+    def _snap_to_bounds(self):
+        """Snap values left a rounding error away from a bound so the transition fires next step."""
+        for model in self._models:
+            model.snap(self)
+
+    def _scenario_nodes(self, dt: float, current_sec: float):
+        """
+        Nodes (t, load, solar) of the scenario over the dt seconds ending at current_sec.
+        t runs from 0 to dt; load and solar are linear between nodes.
+        """
+        ts = [0.0]
+        scenario = self.scenario
+        cursor = scenario.wrap(current_sec - dt)
+        elapsed = 0.0
+        secs = [cursor]
+        while True:
+            to_point = scenario.time_to_next_point(cursor)
+            if elapsed + to_point >= dt:
+                break
+            elapsed += to_point
+            cursor = scenario.next_point(cursor)
+            ts.append(elapsed)
+            secs.append(cursor)
+        ts.append(dt)
+        secs.append(current_sec)
+        values = [self.scenario.values_at(sec) for sec in secs]
+        return ts, [v[0] for v in values], [max(0.0, v[1]) for v in values]
+
+    def _constant_nodes(self, dt: float):
+        p_solar = sum(max(0.0, sol.instant_generation_power) for sol in self.solars)
+        return [0.0, dt], [self.current_load_w] * 2, [p_solar] * 2
+
+    def _integrate(self, dt: float, current_sec: float = None):
+        """Update device states and the power balance over dt seconds (scenario values at current_sec)."""
+        if current_sec is None:
+            current_sec = self.scenario.time_of(self.clock)
         if self.use_scenario:
-            s_load, s_solar = self._get_current_scenario_values()
+            s_load, s_solar = self._get_current_scenario_values(current_sec)
             # Override only if not manually overridden? 
             # For emulator, scenario usually drives unless manual override.
             # Let's overwrite for now, manual controls effectively offset or disable scenario logic?
             # Or simple: Scenario drives base values.
             self.current_load_w = s_load
-            self.solar.instant_generation_power = s_solar
+            # Scenario solar is the household total, shared across PV instances
+            share = s_solar / len(self.solars)
+            for sol in self.solars:
+                sol.instant_generation_power = share
+
+        # Load / solar profile over the interval: piecewise linear between scenario points
+        if self.use_scenario and self.scenario and dt > 0:
+            nodes = self._scenario_nodes(dt, current_sec)
+        else:
+            nodes = self._constant_nodes(dt)
         
-        # 1. Update Battery State (SOC Logic)
-        self._update_battery(dt)
-
-        # 1.5 Update Water Heater State
-        self._update_water_heater(dt)
-
-        # 1.7 Update V2H State
-        self._update_v2h(dt)
-
-        # 1.9 Update Air Conditioner State
-        self._update_aircon(dt)
-
-        # 2. Update Grid Power (Power Balance Formula)
-        # Formula: P_grid = (P_load + P_charge) - (P_solar + P_discharge)
-
-        p_load = self.current_load_w
-        p_charge = self.battery.instant_charge_power if self.battery.is_charging else 0.0
-        p_discharge = self.battery.instant_discharge_power if self.battery.is_discharging else 0.0
-        p_solar = self.solar.instant_generation_power
-
-        # Guard: Solar power cannot be negative
-        if p_solar < 0: p_solar = 0
-
-        # Water Heater Load
-        p_wh = self.water_heater.heating_power_w if self.water_heater.is_heating else 0.0
-
-        # V2H Load / Discharge
-        p_v2h_charge = self.v2h.current_charge_w
-        p_v2h_discharge = self.v2h.current_discharge_w
+        # 1. Step the enabled device models; each adds its term to the grid balance
+        #    P_grid = P_load + (charge / heating / AC / V2H charge) - (solar / discharge / V2H discharge)
+        ts = nodes[0]
+        grid = list(nodes[1])
+        # One list for the whole tick (set_enabled_models swaps in a new one);
+        # models_ahead is what a model's step sees as stepped after it
+        models = self._models
+        for i, model in enumerate(models):
+            self.models_ahead = models[i + 1:]
+            model.step(self, dt, nodes, grid)
+
+        # 2. Update Grid Power (end of the interval)
+        self.smart_meter.instant_current_power = grid[-1]
 
-        # Air Conditioner Load
-        p_ac = self.air_conditioner.instant_power_w
-
-        p_grid = (p_load + p_charge + p_wh + p_v2h_charge + p_ac) - (p_solar + p_discharge + p_v2h_discharge)
-        
-        self.smart_meter.instant_current_power = p_grid
-        
         # 3. Update Cumulative Values (Integration)
+        # Exact over the interval: trapezoids between nodes, buy/sell split at zero crossings
         # W * s / 3600 / 1000 = kWh
-        kwh_increment_factor = dt / 3600.0 / 1000.0
-        
-        if p_grid > 0:
-            self.smart_meter.cumulative_power_buy_kwh += p_grid * kwh_increment_factor
-        else:
-            self.smart_meter.cumulative_power_sell_kwh += abs(p_grid) * kwh_increment_factor
-            
-        self.solar.cumulative_generation_kwh += p_solar * kwh_increment_factor
-
-    def _update_battery(self, dt: float):
-        """
-        Handle battery SOC and guards.
-        """
-        bat = self.battery
-        
-        # SOC Guard Logic
-        if bat.soc >= 100.0:
-            if bat.is_charging:
-                logger.info("Battery fully charged. Stopping charge.")
-                bat.is_charging = False
-                bat.instant_charge_power = 0.0
-                
-        if bat.soc <= 0.0:
-            if bat.is_discharging:
-                logger.info("Battery empty. Stopping discharge.")
-                bat.is_discharging = False
-                bat.instant_discharge_power = 0.0
-                
-        # Calculate Energy Flow
-        # Wh change
-        energy_delta_wh = 0.0
-        if bat.is_charging:
-            wh_step = bat.instant_charge_power * (dt / 3600.0)
-            energy_delta_wh += wh_step
-            bat.cumulative_charge_wh += wh_step
-        if bat.is_discharging:
-            wh_step = bat.instant_discharge_power * (dt / 3600.0)
-            energy_delta_wh -= wh_step
-            bat.cumulative_discharge_wh += wh_step
-            
-        # Update SOC
-        # soc_delta = (Wh change / Capacity) * 100
-        if bat.rated_capacity_wh > 0:
-            soc_delta = (energy_delta_wh / bat.rated_capacity_wh) * 100.0
-            bat.soc += soc_delta
-            
-        # Clamp SOC
-        bat.soc = max(0.0, min(100.0, bat.soc))
-
-    def _update_water_heater(self, dt: float):
-        """
-        Handle Water Heater Logic
-        """
-        wh = self.water_heater
-        if not wh.is_running:
-            return
-
-        # Decrease when stopped or auto (10 digit/hour)
-        # Increase when heating (1 digit/minute = 60 digit/hour)
-        
-        # 0xB0 = 0x43 (Manual Stop) or 0x41 (Auto) -> Decrease 10/hour
-        if wh.auto_setting == 0x43 or wh.auto_setting == 0x41:
-            wh.is_heating = False
-            # Decrease 10 per hour => 10/3600 per second
-            decay_rate = 10.0 / 3600.0
-            wh.remaining_hot_water -= decay_rate * dt
-        
-        # 0xB0 = 0x42 (Manual Start) -> Increase 1/minute
-        elif wh.auto_setting == 0x42:
-            wh.is_heating = True
-            # Increase 60 per hour => 60/3600 per second = 1/60 per second
-            fill_rate = 1.0 / 60.0
-            wh.remaining_hot_water += fill_rate * dt
-            
-            # Stop if full
-            if wh.remaining_hot_water >= wh.tank_capacity:
-                wh.remaining_hot_water = float(wh.tank_capacity)
-                wh.auto_setting = 0x41 # Revert to Auto
-                wh.is_heating = False
-                logger.info("Water Heater full. Stopping heating.")
-
-        # Ensure bounds
-        if wh.remaining_hot_water < 0:
-            wh.remaining_hot_water = 0.0
-        # Upper bound is tank capacity (handled above for heating, but clamp generally)
-        if wh.remaining_hot_water > wh.tank_capacity:
-            wh.remaining_hot_water = float(wh.tank_capacity)
-
-    def _update_v2h(self, dt: float):
-        """
-        V2H (電気自動車充放電器) のシミュレーションロジック
-        充電: V2Hを負荷としてグリッド計算式に加算（current_charge_wをセット）
-        放電: V2Hを発電源としてグリッド計算式に加算（current_discharge_wをセット）
-                放電判断は「正味ネット販電電力（太陽光/バッテリー差引後）」で判断
-        """
-        v2h = self.v2h
-        # 前サイクルの電力値をリセット
-        v2h.current_charge_w = 0.0
-        v2h.current_discharge_w = 0.0
-
-        if not v2h.is_running or not v2h.vehicle_connected:
-            return
-
-        mode = v2h.operation_mode
-
-        if mode == 0x42:  # 充電
-            # V2Hを負荷としてグリッド計算式に追加（グリッドから引く）
-            charge_wh = v2h.charge_power_w * (dt / 3600.0)
-            v2h.current_charge_w = v2h.charge_power_w
-            v2h.remaining_capacity_wh += charge_wh
-            v2h.cumulative_charge_wh += charge_wh  # 積算充電電力量を更新
-
-            # 満充電Check
-            if v2h.remaining_capacity_wh >= v2h.battery_capacity_wh:
-                v2h.remaining_capacity_wh = v2h.battery_capacity_wh
-                v2h.operation_mode = 0x44  # 待機
-                v2h.current_charge_w = 0.0
-                logger.info("V2H: Fully charged. Mode -> Standby (0x44)")
-
-        elif mode == 0x43:  # 放電
-            # 「ネット販電電力」を計算（堆键買電量）
-            # 太陽光・バッテリー放電を差し引いた後の正味販電量をV2Hが不足する
-            bat = self.battery
-            wh = self.water_heater
-            ac = self.air_conditioner
-            p_solar = max(0.0, self.solar.instant_generation_power)
-            p_bat_discharge = bat.instant_discharge_power if bat.is_discharging else 0.0
-            p_bat_charge    = bat.instant_charge_power    if bat.is_charging    else 0.0
-            p_wh            = wh.heating_power_w          if wh.is_heating       else 0.0
-            p_ac            = ac.instant_power_w
-
-            # V2Hがない場合のネット販電電力（正=買電）
-            net_grid = (self.current_load_w + p_bat_charge + p_wh + p_ac) - (p_solar + p_bat_discharge)
-
-            # 買電量が50Wを超えている場合にのみ放電
-            over_50 = net_grid - 50.0
-            if over_50 > 0:
-                discharge_w = min(over_50, v2h.discharge_power_w)
-                discharge_wh = discharge_w * (dt / 3600.0)
-
-                v2h.current_discharge_w = discharge_w
-                v2h.remaining_capacity_wh -= discharge_wh
-                v2h.cumulative_discharge_wh += discharge_wh  # 積算放電電力量を更新
-
-                # 残量枯源Check
-                if v2h.remaining_capacity_wh <= 0:
-                    v2h.remaining_capacity_wh = 0.0
-                    v2h.operation_mode = 0x44  # 待機
-                    v2h.current_discharge_w = 0.0
-                    logger.info("V2H: Battery empty. Mode -> Standby (0x44)")
-
-        # 残容量クランプ
-        v2h.remaining_capacity_wh = max(0.0, min(v2h.remaining_capacity_wh, v2h.battery_capacity_wh))
-
-    def _get_aircon_power(self) -> float:
-        """エアコンの現在の消費電力を返す"""
-        ac = self.air_conditioner
-        if not ac.is_running:
-            return 0.0
-        mode = ac.operation_mode
-        if mode in (0x45, 0x40):  # 送風, その他
-            return 50.0
-        elif mode in (0x41, 0x42, 0x43, 0x44):  # 自動, 冷房, 暖房, 除湿
-            return float(settings.echonet.ac_power_w)
-        return 0.0
-
-    def _update_aircon(self, dt: float):
-        """エアコンの消費電力を更新し積算する"""
-        ac = self.air_conditioner
-        p = self._get_aircon_power()
-        ac.instant_power_w = p
-        ac.cumulative_power_wh += p * (dt / 3600.0)
-
-
-# Global Singleton
-engine = SimulationEngine()
+        buy_ws = sell_ws = 0.0
+        for i in range(len(ts) - 1):
+            h = ts[i + 1] - ts[i]
+            buy_ws += positive_area(grid[i], grid[i + 1], h)
+            sell_ws += positive_area(-grid[i], -grid[i + 1], h)
+        self.smart_meter.cumulative_power_buy_kwh += buy_ws / 3600.0 / 1000.0
+        self.smart_meter.cumulative_power_sell_kwh += sell_ws / 3600.0 / 1000.0
+
+    def register_snapshot_source(self, source):
+        """ECHONET オブジェクト (publish_snapshot() を持つ) をティック毎のスナップショット対象に登録する"""
+        # Publish before listing it, so a tick on the simulation thread never publishes
+        # the same source concurrently; copy on write, as the tick may be iterating the list
+        source.publish_snapshot()
+        self._snapshot_sources = self._snapshot_sources + [source]
+
+    def unregister_snapshot_source(self, source):
+        self._snapshot_sources = [s for s in self._snapshot_sources if s is not source]
+
+    def publish_snapshots(self):
+        for source in self._snapshot_sources:
+            source.publish_snapshot()
+
+
+# Global Singleton (steps the devices enabled in settings.echonet.wifi_devices)
+# (src.services.echonet_service keeps it and its ECHONET objects in sync with the setting)
+engine = SimulationEngine(clock=SimulationClock.from_settings(), enabled=settings.echonet.wifi_devices)
@@ -0,0 +1,309 @@
+"""Vectorized batch kernel: K households stepped together as NumPy columns.
+
+FleetEngine is a standalone kernel for offline studies and benchmarks
+(tests/bench_fleet_engine.py); it is not what fleet mode runs. Fleet
+mode (src/services/fleet_service.py) gives every node its own
+SimulationEngine and ECHONET Lite objects.
+
+Compared with SimulationEngine it always simulates the built-in device
+set (solar, battery, water heater, V2H, air conditioner, smart meter)
+with one instance of each per home: echonet.wifi_devices / enabled
+models and instance counts are ignored, and homes share the template's
+scenario (scaled by load_scale / solar_scale).
+"""
+import logging
+import numpy as np
+from .engine import SimulationEngine
+from src.config.bindings import settings_binding
+from .integration import positive_area, trapezoid, insert_crossings, cap_integral
+
+logger = logging.getLogger(__name__)
+
+def _positive_area(f0, f1, h):
+    """Vectorized integral of max(0, f) over pieces of length h where f is linear from f0 to f1."""
+    f0, f1, h = np.broadcast_arrays(f0, f1, h)
+    area = (f0 + f1) * 0.5 * h
+    neg = (f0 < 0) | (f1 < 0)
+    if neg.any():
+        # Negative somewhere: triangle on the positive side of the zero crossing (or nothing)
+        a, b, hn = f0[neg], f1[neg], h[neg]
+        p = np.maximum(np.maximum(a, b), 0.0)
+        diff = np.abs(b - a)
+        area[neg] = np.divide(p * p * 0.5 * hn, diff, out=np.zeros(len(a)), where=diff > 0)
+    return area
+
+def _clip_area(n0, n1, h, lo, width):
+    """Integral of clip(n - lo, 0, width) for n linear from n0 to n1 (V2H discharge)."""
+    return _positive_area(n0 - lo, n1 - lo, h) - _positive_area(n0 - lo - width, n1 - lo - width, h)
+
+class FleetEngine:
+    """NumPy 配列で K 世帯をまとめてシミュレーションするエンジン
+
+    SimulationEngine (1世帯・各クラス1台) と同じ計算を、デバイスの各属性を
+    長さ K の列として保持し、1ティックを数回のベクトル演算で進める。
+    初期値は template (SimulationEngine) から全世帯に複製する。
+    """
+
+    def __init__(self, homes: int, template: SimulationEngine = None):
+        if template is None:
+            template = SimulationEngine()
+        self.homes = homes
+        self.clock = template.clock
+        self.last_update_time: float = self.clock.now()
+        self._seek_count = self.clock.seek_count
+
+        # Scenario (shared by all homes, scaled per home)
+        self.use_scenario = True
+        self.scenario = template.scenario
+        self.load_scale = np.ones(homes)
+        self.solar_scale = np.ones(homes)
+
+        def col(value, dtype=np.float64):
+            return np.full(homes, value, dtype=dtype)
+
+        # Household load / Solar
+        self.current_load_w = col(template.current_load_w)
+        self.solar_w = col(template.solar.instant_generation_power)
+        self.solar_cumulative_kwh = col(template.solar.cumulative_generation_kwh)
+
+        # Battery
+        bat = template.battery
+        self.bat_soc = col(bat.soc)
+        self.bat_capacity_wh = col(bat.rated_capacity_wh)
+        self.bat_is_charging = col(bat.is_charging, bool)
+        self.bat_is_discharging = col(bat.is_discharging, bool)
+        self.bat_charge_w = col(bat.instant_charge_power)
+        self.bat_discharge_w = col(bat.instant_discharge_power)
+        self.bat_cumulative_charge_wh = col(bat.cumulative_charge_wh)
+        self.bat_cumulative_discharge_wh = col(bat.cumulative_discharge_wh)
+
+        # Water Heater
+        wh = template.water_heater
+        self.wh_running = col(wh.is_running, bool)
+        self.wh_auto_setting = col(wh.auto_setting, np.uint8)
+        self.wh_is_heating = col(wh.is_heating, bool)
+        self.wh_remaining = col(wh.remaining_hot_water)
+        self.wh_tank_capacity = col(wh.tank_capacity)
+        self.wh_power_w = col(wh.heating_power_w)
+
+        # V2H
+        v2h = template.v2h
+        self.v2h_running = col(v2h.is_running, bool)
+        self.v2h_connected = col(v2h.vehicle_connected, bool)
+        self.v2h_mode = col(v2h.operation_mode, np.uint8)
+        self.v2h_remaining_wh = col(v2h.remaining_capacity_wh)
+        self.v2h_capacity_wh = col(v2h.battery_capacity_wh)
+        self.v2h_charge_power_w = col(v2h.charge_power_w)
+        self.v2h_discharge_power_w = col(v2h.discharge_power_w)
+        self.v2h_current_charge_w = col(v2h.current_charge_w)
+        self.v2h_current_discharge_w = col(v2h.current_discharge_w)
+        self.v2h_cumulative_charge_wh = col(v2h.cumulative_charge_wh)
+        self.v2h_cumulative_discharge_wh = col(v2h.cumulative_discharge_wh)
+
+        # Air Conditioner
+        ac = template.air_conditioner
+        self.ac_running = col(ac.is_running, bool)
+        self.ac_mode = col(ac.operation_mode, np.uint8)
+        self.ac_power_w = col(ac.instant_power_w)
+        self.ac_cumulative_wh = col(ac.cumulative_power_wh)
+
+        # Smart Meter
+        sm = template.smart_meter
+        self.grid_w = col(sm.instant_current_power)
+        self.buy_kwh = col(sm.cumulative_power_buy_kwh)
+        self.sell_kwh = col(sm.cumulative_power_sell_kwh)
+
+        logger.info(f"Fleet Engine Initialized: {homes} homes")
+
+    # Same scenario lookup as the scalar engine (uses self.scenario / self.clock)
+    _get_current_scenario_values = SimulationEngine._get_current_scenario_values
+    _scenario_nodes = SimulationEngine._scenario_nodes
+
+    def update_simulation(self):
+        now, seeks = self.clock.sample()
+        dt = now - self.last_update_time
+        self.last_update_time = now
+        if seeks != self._seek_count:
+            self._seek_count = seeks
+            dt = 0.0
+        self.step(dt)
+
+    def step(self, dt: float):
+        """Advance every home by dt seconds."""
+        current_sec = self.scenario.time_of(self.clock)
+        if self.use_scenario:
+            s_load, s_solar = self._get_current_scenario_values(current_sec)
+            np.multiply(self.load_scale, s_load, out=self.current_load_w)
+            np.multiply(self.solar_scale, s_solar, out=self.solar_w)
+
+        # Load / solar per node (rows) and home (columns), linear between nodes
+        if self.use_scenario and self.scenario and dt > 0:
+            ts, s_loads, s_solars = self._scenario_nodes(dt, current_sec)
+            h = np.diff(ts)[:, None]
+            loads = np.outer(s_loads, self.load_scale)
+            solars = np.outer(s_solars, self.solar_scale)
+        else:
+            ts = [0.0, dt]
+            h = np.array([[dt]])
+            loads = np.vstack([self.current_load_w] * 2)
+            solars = np.vstack([np.maximum(self.solar_w, 0.0)] * 2)
+
+        hours = dt / 3600.0
+        self._update_battery(hours)
+        self._update_water_heater(dt)
+        # Net grid without V2H per node, with the AC power of the previous tick (as the scalar engine)
+        net = loads - solars + self._net_grid_const()
+        v2h_limit, v2h_cut = self._update_v2h(hours, net, h)
+        self._update_aircon(hours)
+
+        # Power Balance Formula
+        # P_grid = (P_load + P_charge + P_wh + P_v2h_charge + P_ac) - (P_solar + P_discharge + P_v2h_discharge)
+        p_charge = np.where(self.bat_is_charging, self.bat_charge_w, 0.0)
+        p_discharge = np.where(self.bat_is_discharging, self.bat_discharge_w, 0.0)
+        p_solar = np.maximum(self.solar_w, 0.0)
+        p_wh = np.where(self.wh_is_heating, self.wh_power_w, 0.0)
+        p_grid = ((self.current_load_w + p_charge + p_wh + self.v2h_current_charge_w + self.ac_power_w)
+                  - (p_solar + p_discharge + self.v2h_current_discharge_w))
+        self.grid_w = p_grid
+
+        # Cumulative Values, exact over the interval (W * s / 3600 / 1000 = kWh)
+        # grid = net + delta - clip(net - 50, 0, limit) is nondecreasing in net, so it is
+        # positive exactly where net > net_zero; buy integrates that part of each piece.
+        delta = p_grid - (net[-1] - np.minimum(np.maximum(net[-1] - 50.0, 0.0), v2h_limit))
+        net_zero = np.where(delta >= -50.0, -delta, v2h_limit - delta)
+        buy_ws = np.zeros(self.homes)
+        total_ws = np.zeros(self.homes)
+        for i in range(len(h)):
+            n0, n1, hi = net[i], net[i + 1], h[i]
+            total_ws += self._grid_area(n0, n1, hi, delta, v2h_limit)
+            above0 = n0 > net_zero
+            above1 = n1 > net_zero
+            cross = np.divide(net_zero - n0, n1 - n0, out=np.zeros(self.homes), where=above0 != above1)
+            a = np.where(above0, n0, net_zero)
+            b = np.where(above1, n1, net_zero)
+            hs = np.where(above0 & above1, hi, np.where(above0, hi * cross, np.where(above1, hi * (1.0 - cross), 0.0)))
+            buy_ws += self._grid_area(a, b, hs, delta, v2h_limit)
+        for k, capacity_wh in zip(*v2h_cut):
+            buy_ws[k], total_ws[k] = self._cut_area(ts, net[:, k], delta[k], self.v2h_discharge_power_w[k], capacity_wh)
+        self.buy_kwh += buy_ws / 3600.0 / 1000.0
+        self.sell_kwh += np.maximum(buy_ws - total_ws, 0.0) / 3600.0 / 1000.0
+        self.solar_cumulative_kwh += ((solars[:-1] + solars[1:]) * 0.5 * h).sum(axis=0) / 3600.0 / 1000.0
+
+    @staticmethod
+    def _grid_area(n0, n1, h, delta, v2h_limit):
+        """Integral of the grid power over a piece where the net (without V2H) is linear."""
+        return h * ((n0 + n1) * 0.5 + delta) - _clip_area(n0, n1, h, 50.0, v2h_limit)
+
+    @staticmethod
+    def _cut_area(ts, net, delta, power, capacity_wh):
+        """(buy, total) grid energy of a home whose V2H ran out inside the tick: the
+        discharge stops where capacity_wh is used up (as V2HModel.update, per node)."""
+        ts, net = list(ts), list(net)
+        insert_crossings(ts, [net], net, 50.0)
+        insert_crossings(ts, [net], net, 50.0 + power)
+        discharge = [min(max(n - 50.0, 0.0), power) for n in net]
+        cap_integral(ts, [net, discharge], discharge, capacity_wh * 3600.0)
+        grid = [n + delta - d for n, d in zip(net, discharge)]
+        buy = sum(positive_area(grid[i], grid[i + 1], ts[i + 1] - ts[i]) for i in range(len(ts) - 1))
+        return buy, trapezoid(ts, grid)
+
+    def _net_grid_const(self):
+        """Net grid terms other than load / solar (battery, water heater, AC)."""
+        return (np.where(self.bat_is_charging, self.bat_charge_w, 0.0)
+                + np.where(self.wh_is_heating, self.wh_power_w, 0.0)
+                + self.ac_power_w
+                - np.where(self.bat_is_discharging, self.bat_discharge_w, 0.0))
+
+    def _update_battery(self, hours: float):
+        # SOC guards: stop charging when full, discharging when empty
+        full = self.bat_is_charging & (self.bat_soc >= 100.0)
+        self.bat_is_charging[full] = False
+        self.bat_charge_w[full] = 0.0
+        empty = self.bat_is_discharging & (self.bat_soc <= 0.0)
+        self.bat_is_discharging[empty] = False
+        self.bat_discharge_w[empty] = 0.0
+
+        charge_wh = np.where(self.bat_is_charging, self.bat_charge_w * hours, 0.0)
+        discharge_wh = np.where(self.bat_is_discharging, self.bat_discharge_w * hours, 0.0)
+        self.bat_cumulative_charge_wh += charge_wh
+        self.bat_cumulative_discharge_wh += discharge_wh
+
+        cap = self.bat_capacity_wh
+        soc_delta = np.divide(charge_wh - discharge_wh, cap, out=np.zeros(self.homes), where=cap > 0) * 100.0
+        np.clip(self.bat_soc + soc_delta, 0.0, 100.0, out=self.bat_soc)
+
+    def _update_water_heater(self, dt: float):
+        run = self.wh_running
+        auto = self.wh_auto_setting
+        remaining = self.wh_remaining
+        tank = self.wh_tank_capacity
+
+        # 0x41 (Auto) / 0x43 (Manual Stop): decrease 10/hour
+        decay = run & ((auto == 0x41) | (auto == 0x43))
+        self.wh_is_heating[decay] = False
+        remaining[decay] -= 10.0 / 3600.0 * dt
+
+        # 0x42 (Manual Start): increase 1/minute, revert to Auto when full
+        heat = run & (auto == 0x42)
+        self.wh_is_heating[heat] = True
+        remaining[heat] += 1.0 / 60.0 * dt
+        full = heat & (remaining >= tank)
+        remaining[full] = tank[full]
+        auto[full] = 0x41
+        self.wh_is_heating[full] = False
+
+        # Ensure bounds (running units only)
+        np.copyto(remaining, np.clip(remaining, 0.0, tank), where=run)
+
+    def _update_v2h(self, hours: float, net, h):
+        """net: net grid without V2H per node and home; returns the discharge limit in effect per home
+        and the homes that ran out inside the tick (indices, capacity left at the start)."""
+        self.v2h_current_charge_w[:] = 0.0
+        self.v2h_current_discharge_w[:] = 0.0
+        active = self.v2h_running & self.v2h_connected
+        remaining = self.v2h_remaining_wh
+        capacity = self.v2h_capacity_wh
+
+        # 充電 (0x42)
+        charge = active & (self.v2h_mode == 0x42)
+        charge_wh = self.v2h_charge_power_w[charge] * hours
+        self.v2h_current_charge_w[charge] = self.v2h_charge_power_w[charge]
+        remaining[charge] += charge_wh
+        self.v2h_cumulative_charge_wh[charge] += charge_wh
+        full = charge & (remaining >= capacity)
+        remaining[full] = capacity[full]
+        self.v2h_mode[full] = 0x44
+        self.v2h_current_charge_w[full] = 0.0
+
+        # 放電 (0x43): V2Hがない場合の買電量が50Wを超えている分だけ放電 (区間で厳密に積分)
+        limit = np.zeros(self.homes)
+        cut = (np.zeros(0, dtype=np.intp), np.zeros(0))
+        discharge = active & (self.v2h_mode == 0x43)
+        if discharge.any():
+            power = self.v2h_discharge_power_w
+            discharge_wh = _clip_area(net[:-1], net[1:], h, 50.0, power).sum(axis=0) / 3600.0
+            discharge &= discharge_wh > 0
+            # Running out inside the tick: only what is left is discharged (grid: _cut_area)
+            empty = discharge & (discharge_wh >= remaining)
+            cut = (np.flatnonzero(empty), remaining[empty].copy())
+            discharge_wh = np.where(empty, remaining, discharge_wh)
+            self.v2h_current_discharge_w[discharge] = np.clip(net[-1] - 50.0, 0.0, power)[discharge]
+            remaining[discharge] -= discharge_wh[discharge]
+            self.v2h_cumulative_discharge_wh[discharge] += discharge_wh[discharge]
+            remaining[empty] = 0.0
+            self.v2h_mode[empty] = 0x44
+            self.v2h_current_discharge_w[empty] = 0.0
+            limit[discharge & ~empty] = power[discharge & ~empty]
+
+        # 残容量クランプ
+        np.copyto(remaining, np.clip(remaining, 0.0, capacity), where=active)
+        return limit, cut
+
+    def _update_aircon(self, hours: float):
+        mode = self.ac_mode
+        fan = (mode == 0x40) | (mode == 0x45)            # その他, 送風
+        powered = (mode >= 0x41) & (mode <= 0x44)        # 自動, 冷房, 暖房, 除湿
+        p = np.where(powered, settings_binding.ac_power_w, np.where(fan, 50.0, 0.0))
+        p[~self.ac_running] = 0.0
+        self.ac_power_w = p
+        self.ac_cumulative_wh += p * hours
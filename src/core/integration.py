@@ -0,0 +1,64 @@
+"""Exact integration helpers for piecewise-linear power profiles.
+
+Powers between two nodes are linear in time (scenario interpolation), so
+energies are trapezoids; the buy/sell split of a piece whose sign changes
+is taken at the zero crossing.
+"""
+
+def positive_area(f0: float, f1: float, h: float) -> float:
+    """Integral of max(0, f) over a piece of length h where f is linear from f0 to f1."""
+    if f0 >= 0.0 and f1 >= 0.0:
+        return (f0 + f1) * 0.5 * h
+    if f0 <= 0.0 and f1 <= 0.0:
+        return 0.0
+    # Sign change: triangle on the positive side of the zero crossing
+    p = f0 if f0 > 0.0 else f1
+    return p * p * 0.5 * h / abs(f1 - f0)
+
+def trapezoid(ts: list, ys: list) -> float:
+    return sum((ys[i] + ys[i + 1]) * 0.5 * (ts[i + 1] - ts[i]) for i in range(len(ts) - 1))
+
+def insert_crossings(ts: list, cols: list, ys: list, level: float):
+    """Insert nodes where ys crosses level so that max/min(ys, level) stays linear between nodes.
+
+    ys must be one of cols; every column is interpolated at the new nodes.
+    """
+    i = 0
+    while i < len(ts) - 1:
+        a = ys[i] - level
+        b = ys[i + 1] - level
+        if a * b < 0.0:
+            r = a / (a - b)
+            ts.insert(i + 1, ts[i] + (ts[i + 1] - ts[i]) * r)
+            for col in cols:
+                col.insert(i + 1, col[i] + (col[i + 1] - col[i]) * r)
+            i += 1
+        i += 1
+
+def cap_integral(ts: list, cols: list, ys: list, total: float) -> bool:
+    """Cut ys off where its integral reaches total; returns True when it was cut.
+
+    The cut is two nodes at the crossing time (ys there, then 0) and ys is 0
+    after it, so trapezoid(ts, ys) == total. ys must be one of cols.
+    """
+    area = 0.0
+    for i in range(len(ts) - 1):
+        h = ts[i + 1] - ts[i]
+        y0, y1 = ys[i], ys[i + 1]
+        piece = (y0 + y1) * 0.5 * h
+        if area + piece < total or piece <= 0.0:
+            area += piece
+            continue
+        # Solve y0 s + (y1 - y0) s^2 / 2h = need for s in [0, h] (stable quadratic root)
+        need = total - area
+        a = (y1 - y0) / (2.0 * h)
+        s = 2.0 * need / (y0 + max(0.0, y0 * y0 + 4.0 * a * need) ** 0.5)
+        r = min(1.0, max(0.0, s / h))
+        for col in [ts] + cols:
+            value = col[i] + (col[i + 1] - col[i]) * r
+            col.insert(i + 1, value)
+            col.insert(i + 1, value)
+        for j in range(i + 2, len(ts)):
+            ys[j] = 0.0
+        return True
+    return False
@@ -0,0 +1,113 @@
+import csv
+from array import array
+from bisect import bisect_right
+from itertools import pairwise
+
+SECONDS_PER_DAY = 86400
+
+class CompiledScenario:
+    """Scenario points compiled into parallel arrays (time_sec, load, solar).
+
+    values_at() finds the bracketing points with bisect (O(log n)) and caches
+    the current segment, so consecutive ticks inside the same segment are O(1).
+    Interpolation and the midnight wraparound match the original linear scan.
+    """
+    __slots__ = ("times", "loads", "solars", "_lo", "_hi", "_idx")
+
+    def __init__(self, points: list[tuple[int, float, float]] = ()):
+        points = sorted(points, key=lambda p: p[0])
+        self._use(array("d", (p[0] for p in points)), array("d", (p[1] for p in points)),
+                  array("d", (p[2] for p in points)))
+
+    def _use(self, times: array, loads: array, solars: array):
+        self.times = times
+        self.loads = loads
+        self.solars = solars
+        # Cached segment: times in [_lo, _hi) bisect to _idx
+        self._lo = self._hi = 0.0
+        self._idx = None
+
+    @classmethod
+    def from_arrays(cls, times: array, loads: array, solars: array) -> "CompiledScenario":
+        """CompiledScenario on parallel arrays, used as they are when times are
+        already sorted (the usual CSV); otherwise sorted into new arrays."""
+        if any(a > b for a, b in pairwise(times)):
+            return cls(zip(times, loads, solars))
+        scenario = cls.__new__(cls)
+        scenario._use(times, loads, solars)
+        return scenario
+
+    @classmethod
+    def from_csv(cls, filepath: str) -> "CompiledScenario":
+        points = []
+        with open(filepath, 'r') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                # Parse time HH:MM -> seconds from midnight
+                hh, mm = map(int, row['time'].split(':'))
+                points.append((hh * 3600 + mm * 60, float(row['load_w']), float(row['solar_w'])))
+        return cls(points)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def _segment(self, current_sec: float) -> int:
+        if self._idx is not None and self._lo <= current_sec < self._hi:
+            return self._idx
+        times = self.times
+        idx = bisect_right(times, current_sec)
+        self._idx = idx
+        self._lo = times[idx - 1] if idx > 0 else float("-inf")
+        self._hi = times[idx] if idx < len(times) else float("inf")
+        return idx
+
+    # Scenario position of a clock and its wraparound: seconds from midnight for a daily
+    # profile (ScenarioTimeline uses epoch seconds with the same interface)
+    def time_of(self, clock) -> float:
+        return clock.time_of_day()
+
+    def wrap(self, current_sec: float) -> float:
+        return current_sec % SECONDS_PER_DAY
+
+    def next_point(self, current_sec: float) -> float:
+        """The first point after current_sec (wrapping past midnight)."""
+        times = self.times
+        return times[bisect_right(times, current_sec) % len(times)]
+
+    def time_to_next_point(self, current_sec: float) -> float:
+        """Seconds from current_sec to the next scenario point (wrapping past midnight)."""
+        times = self.times
+        if not times:
+            return float("inf")
+        idx = bisect_right(times, current_sec)
+        if idx < len(times):
+            return times[idx] - current_sec
+        return times[0] + SECONDS_PER_DAY - current_sec
+
+    def values_at(self, current_sec: float) -> tuple[float, float]:
+        """(load, solar) at current_sec seconds from midnight."""
+        idx = self._segment(current_sec)
+        # Before the first point the previous one is the last (idx - 1 == -1),
+        # after the last point the next one is the first
+        prev_i = idx - 1
+        next_i = idx if idx < len(self.times) else 0
+
+        # Linear Interpolation
+        t1 = self.times[prev_i]
+        t2 = self.times[next_i]
+
+        if t1 == t2: return self.loads[prev_i], self.solars[prev_i]
+
+        # Wrap around midnight case
+        if t2 < t1:
+            # e.g. t1=23:00 (82800), t2=06:00 (21600). current=02:00 (7200).
+            # Shift t2 and current by +24h for calculation
+            t2 += SECONDS_PER_DAY
+            if current_sec < t1: current_sec += SECONDS_PER_DAY
+
+        ratio = (current_sec - t1) / (t2 - t1)
+        ratio = max(0.0, min(1.0, ratio))
+
+        load = self.loads[prev_i] + (self.loads[next_i] - self.loads[prev_i]) * ratio
+        solar = self.solars[prev_i] + (self.solars[next_i] - self.solars[prev_i]) * ratio
+        return load, solar
@@ -0,0 +1,166 @@
+"""Shared loader for daily scenario CSVs, cached in memory and on disk.
+
+Each CSV is parsed once into a ScenarioTable (compact arrays in file order
+plus the notes column; malformed rows are skipped). The engine gets the
+CompiledScenario built on the same arrays, the Scenarios tab gets its rows,
+so both share one parse.
+
+Entries are keyed by absolute path + mtime + size: saving, replacing or
+touching the file invalidates them. The on-disk copy (CACHE_DIR) is a
+fixed-layout binary that loads with array.frombytes, so a large CSV is
+parsed again only after it changes, even across restarts:
+
+    header  <4sHqqI   magic b"HESS", version, mtime_ns, size, row count
+    rows    n x int32 time_sec, n x float64 load_w, n x float64 solar_w
+    notes   UTF-8, NUL separated
+"""
+import csv
+import hashlib
+import logging
+import os
+import struct
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Optional
+from .scenario import CompiledScenario
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = "data/cache/scenarios"
+# Parsed scenarios kept in memory (least recently used are dropped)
+MEMORY_ENTRIES = 16
+
+MAGIC = b"HESS"
+VERSION = 1
+_HEADER = struct.Struct("<4sHqqI")
+
+def parse_time(value: str) -> int:
+    """'HH:MM' -> seconds from midnight."""
+    hh, mm = map(int, value.split(':'))
+    return hh * 3600 + mm * 60
+
+def format_time(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}"
+
+class ScenarioTable:
+    """One scenario CSV as parallel arrays in file order (time_sec, load_w, solar_w, notes)."""
+    __slots__ = ("times", "loads", "solars", "notes", "_compiled")
+
+    def __init__(self, times: array, loads: array, solars: array, notes: list[str]):
+        self.times = times
+        self.loads = loads
+        self.solars = solars
+        self.notes = notes
+        self._compiled = None
+
+    @classmethod
+    def from_csv(cls, path: str) -> "ScenarioTable":
+        times, loads, solars, notes = array("i"), array("d"), array("d"), []
+        with open(path, "r", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                # A malformed row is skipped, the rest of the file still loads
+                try:
+                    point = parse_time(row["time"]), float(row["load_w"]), float(row["solar_w"])
+                except (KeyError, TypeError, ValueError, AttributeError) as e:
+                    logger.warning(f"{path}:{reader.line_num}: skipping malformed row: {e}")
+                    continue
+                times.append(point[0])
+                loads.append(point[1])
+                solars.append(point[2])
+                notes.append(row.get("notes") or "")
+        return cls(times, loads, solars, notes)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def compiled(self) -> CompiledScenario:
+        """The CompiledScenario of this table (built once)."""
+        if self._compiled is None:
+            self._compiled = CompiledScenario.from_arrays(self.times, self.loads, self.solars)
+        return self._compiled
+
+    def rows(self) -> list[dict]:
+        """Rows in the Scenarios tab editor format."""
+        return [{"_id": i, "time": format_time(t), "load_w": load, "solar_w": solar, "notes": note}
+                for i, (t, load, solar, note) in enumerate(zip(self.times, self.loads, self.solars, self.notes))]
+
+    def to_bytes(self, mtime_ns: int, size: int) -> bytes:
+        return b"".join((
+            _HEADER.pack(MAGIC, VERSION, mtime_ns, size, len(self)),
+            self.times.tobytes(), self.loads.tobytes(), self.solars.tobytes(),
+            "\0".join(self.notes).encode("utf-8"),
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes, mtime_ns: int, size: int) -> Optional["ScenarioTable"]:
+        """Decode a cache file; None when it is stale or not a cache file."""
+        if len(data) < _HEADER.size:
+            return None
+        magic, version, c_mtime, c_size, n = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION or (c_mtime, c_size) != (mtime_ns, size):
+            return None
+        offset = _HEADER.size
+        times, loads, solars = array("i"), array("d"), array("d")
+        for arr in (times, loads, solars):
+            end = offset + n * arr.itemsize
+            if end > len(data):
+                return None
+            arr.frombytes(data[offset:end])
+            offset = end
+        notes = data[offset:].decode("utf-8").split("\0") if n else []
+        if len(notes) != n:
+            return None
+        return cls(times, loads, solars, notes)
+
+_memory: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+
+def _cache_path(path: str) -> str:
+    return os.path.join(CACHE_DIR, hashlib.sha1(path.encode("utf-8")).hexdigest() + ".bin")
+
+def load_table(path: str) -> ScenarioTable:
+    """Parsed scenario CSV at path (memory cache, then disk cache, then the CSV itself)."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _lock:
+        table = _memory.get(key)
+        if table is not None:
+            _memory.move_to_end(key)
+            return table
+
+    cache_file = _cache_path(path)
+    table = None
+    try:
+        with open(cache_file, "rb") as f:
+            table = ScenarioTable.from_bytes(f.read(), st.st_mtime_ns, st.st_size)
+    except OSError:
+        pass
+    if table is None:
+        table = ScenarioTable.from_csv(path)
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp = f"{cache_file}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(table.to_bytes(st.st_mtime_ns, st.st_size))
+            os.replace(tmp, cache_file)
+        except OSError as e:
+            logger.warning(f"Scenario cache not written ({cache_file}): {e}")
+
+    with _lock:
+        # Drop entries of older versions of the same file
+        for stale in [k for k in _memory if k[0] == path]:
+            del _memory[stale]
+        _memory[key] = table
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+    return table
+
+def load_compiled(path: str) -> CompiledScenario:
+    return load_table(path).compiled()
+
+def clear_memory():
+    with _lock:
+        _memory.clear()
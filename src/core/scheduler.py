@@ -0,0 +1,117 @@
+"""Fixed-rate tick scheduling on time.monotonic() deadlines.
+
+Tick k is due at start + k * interval, independent of how long the ticks
+take or how late the event loop wakes up, so the tick rate does not drift.
+When a deadline has already passed, the policy decides what happens to the
+missed ticks:
+
+    catch_up: run them back-to-back (at most max_catch_up, the rest are dropped)
+    skip:     run one late tick now and drop the others
+
+The engine integrates the real elapsed dt on every tick, so skipped ticks
+only lower the time resolution; no energy is lost.
+"""
+import math
+import time
+from bisect import bisect_left
+from typing import Callable
+
+POLICIES = ("catch_up", "skip")
+
+class Histogram:
+    """Fixed-bucket histogram of durations (bucket upper bounds in ms)."""
+    BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self, bounds_ms: tuple = BOUNDS_MS):
+        self.bounds_ms = tuple(bounds_ms)
+        # counts[i] = samples <= bounds_ms[i]; the last bucket is everything above
+        self.counts = [0] * (len(self.bounds_ms) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        ms = seconds * 1000.0
+        self.counts[bisect_left(self.bounds_ms, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def stats(self) -> dict:
+        buckets = {f"le_{b:g}ms": c for b, c in zip(self.bounds_ms, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "max_ms": self.max,
+            "buckets": buckets,
+        }
+
+class TickScheduler:
+    """Deadline-based periodic scheduler with lateness / duration histograms.
+
+    Usage:
+        delay = sched.delay()   # sleep this long (<= 0: due now)
+        sched.begin()           # records lateness against the deadline
+        tick()
+        sched.end()             # records duration, picks the next deadline
+    """
+
+    def __init__(self, interval: float, policy: str = "skip", max_catch_up: int = 5,
+                 clock: Callable[[], float] = time.monotonic):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {', '.join(POLICIES)}")
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self._clock = clock
+        self.interval = float(interval)
+        self.policy = policy
+        self.max_catch_up = max(1, int(max_catch_up))
+        self.deadline = clock()
+        self._started = None
+        self.ticks = 0
+        self.skipped = 0
+        self.lateness = Histogram()
+        self.duration = Histogram()
+
+    def set_interval(self, interval: float):
+        """Change the period; the next tick is due one new interval after the last one."""
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if interval != self.interval:
+            self.deadline += interval - self.interval
+            self.interval = float(interval)
+
+    def delay(self) -> float:
+        return self.deadline - self._clock()
+
+    def begin(self):
+        self._started = self._clock()
+        self.lateness.add(max(0.0, self._started - self.deadline))
+
+    def end(self):
+        now = self._clock()
+        self.duration.add(now - self._started)
+        self.ticks += 1
+        self.deadline += self.interval
+        # Whole intervals already missed beyond the next deadline
+        missed = math.floor((now - self.deadline) / self.interval)
+        if missed <= 0:
+            return
+        # missed + 1 ticks are overdue (the next deadline is due now as well)
+        keep = self.max_catch_up if self.policy == "catch_up" else 1
+        drop = missed + 1 - keep
+        if drop > 0:
+            self.deadline += drop * self.interval
+            self.skipped += drop
+
+    def stats(self) -> dict:
+        return {
+            "interval_sec": self.interval,
+            "policy": self.policy,
+            "ticks": self.ticks,
+            "skipped": self.skipped,
+            "lateness": self.lateness.stats(),
+            "duration": self.duration.stats(),
+        }
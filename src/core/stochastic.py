@@ -0,0 +1,168 @@
+"""Seeded stochastic layer over a scenario: load noise, appliance events and cloud ramps.
+
+    load  = base * (1 + correlated noise) + appliance pulses
+    solar = base * prod(1 - depth * cloud shape)   (trapezoid ramps)
+
+Each simulated day draws its randomness once, in one vectorized numpy pass:
+the noise knots, the appliance on/off edges and the clouds. Only those draws
+are kept (a few tens of KB per day); values_at() evaluates them at t over the
+base scenario, so nodes of a fleet share the base and no 1 s day profile is
+built or held, and a new day costs well under a millisecond on the tick path.
+
+The generator of a day is seeded with (seed, date), so a day always comes
+out the same, whatever the start time or the order the days are visited in.
+No RNG runs on the tick path.
+
+StochasticScenario has the scenario lookup interface on epoch seconds
+(like ScenarioTimeline) with a point every second.
+
+Fleet nodes share the base scenario but each draws its own randomness, from
+a seed derived from the configured seed and the node index (node_seed).
+"""
+import math
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+import numpy as np
+from src.config.settings import settings, StochasticSettings
+from .timeline import ScenarioTimeline
+
+# Days kept (the current one, plus its neighbour across midnight)
+CACHED_DAYS = 2
+
+class _Day:
+    __slots__ = ("start", "end", "step", "knots", "edges", "levels", "clouds")
+
+    def __init__(self, start: float, end: float, step: float, knots: np.ndarray,
+                 edges: list, levels: list, clouds: list):
+        self.start = start
+        self.end = end
+        # Load noise knots every step seconds (memoryview: plain floats on the tick path)
+        self.step = step
+        self.knots = memoryview(knots)
+        # Appliance power after each on/off edge (seconds from start, sorted)
+        self.edges = edges
+        self.levels = levels
+        # (start, full cover from, full cover until, end, depth) per cloud
+        self.clouds = clouds
+
+    def noise(self, x: float) -> float:
+        k = x / self.step
+        i = int(k)
+        knots = self.knots
+        return knots[i] + (knots[i + 1] - knots[i]) * (k - i)
+
+    def appliances(self, x: float) -> float:
+        i = bisect_right(self.edges, x)
+        return self.levels[i - 1] if i else 0.0
+
+    def cloud_factor(self, x: float) -> float:
+        factor = 1.0
+        for c0, c1, c2, c3, depth in self.clouds:
+            if c0 < x < c3:
+                cover = (x - c0) / (c1 - c0) if x < c1 else (c3 - x) / (c3 - c2) if x > c2 else 1.0
+                factor *= 1.0 - depth * min(cover, 1.0)
+        return factor
+
+class StochasticScenario:
+    """Base scenario + seeded per-day randomness (see module docstring)."""
+    __slots__ = ("base", "seed", "params", "_epoch_base", "_days", "_day")
+
+    def __init__(self, base, seed: int, params: StochasticSettings = None):
+        self.base = base
+        self.seed = int(seed)
+        self.params = params if params is not None else StochasticSettings()
+        # ScenarioTimeline is looked up on epoch seconds, a daily profile on seconds from midnight
+        self._epoch_base = isinstance(base, ScenarioTimeline)
+        self._days: OrderedDict = OrderedDict()
+        self._day = None
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    def time_of(self, clock) -> float:
+        return clock.now()
+
+    def wrap(self, t: float) -> float:
+        return t
+
+    def next_point(self, t: float) -> float:
+        return math.floor(t) + 1.0
+
+    def time_to_next_point(self, t: float) -> float:
+        return self.next_point(t) - t
+
+    def values_at(self, t: float) -> tuple[float, float]:
+        day = self._day
+        if day is None or not (day.start <= t < day.end):
+            day = self._day = self.day(t)
+        x = t - day.start
+        base = self.base
+        load, solar = base.values_at(t if self._epoch_base else base.wrap(x))
+        load = load * (1.0 + day.noise(x)) + day.appliances(x)
+        solar = max(0.0, solar) * day.cloud_factor(x)
+        return max(load, 0.0), max(solar, 0.0)
+
+    def day(self, t: float) -> _Day:
+        """The generated local day containing t (cached)."""
+        lt = time.localtime(t)
+        key = (lt.tm_year, lt.tm_mon, lt.tm_mday)
+        day = self._days.get(key)
+        if day is None:
+            day = self._days[key] = self._generate(*key)
+            while len(self._days) > CACHED_DAYS:
+                self._days.popitem(last=False)
+        return day
+
+    def _generate(self, year: int, month: int, mday: int) -> _Day:
+        start = time.mktime((year, month, mday, 0, 0, 0, 0, 0, -1))
+        end = time.mktime((year, month, mday + 1, 0, 0, 0, 0, 0, -1))
+        n = int(round(end - start))  # 86400 (23 / 25 h on DST changes)
+        p = self.params
+        rng = np.random.default_rng([self.seed, year, month, mday])
+
+        # Load noise: Gaussian knots every noise_interval_sec, linear in between
+        step = max(1.0, p.noise_interval_sec)
+        knots = rng.normal(0.0, p.load_noise, int(n // step) + 2)
+
+        # Appliance events: rectangular pulses (start edge +P, end edge -P at whole seconds)
+        count = rng.poisson(p.appliance_events_per_day * n / 86400.0)
+        starts = rng.integers(0, n, count)
+        ends = np.minimum(starts + rng.uniform(*p.appliance_duration_sec, count).astype(np.int64), n + 1)
+        powers = rng.uniform(*p.appliance_power_w, count)
+        edges = np.concatenate((starts, ends)).astype(np.float64)
+        order = np.argsort(edges, kind="stable")
+        levels = np.cumsum(np.concatenate((powers, -powers))[order])
+
+        # Clouds: trapezoid cover (ramp down, hold, ramp up); overlapping clouds multiply
+        clouds = []
+        count = rng.poisson(p.cloud_events_per_day * n / 86400.0)
+        if count:
+            c_start = rng.uniform(0, n, count)
+            ramp = rng.uniform(*p.cloud_ramp_sec, count)
+            hold = rng.uniform(*p.cloud_hold_sec, count)
+            depth = rng.uniform(*p.cloud_depth, count)
+            clouds = list(zip(c_start.tolist(), (c_start + ramp).tolist(), (c_start + ramp + hold).tolist(),
+                              (c_start + 2 * ramp + hold).tolist(), depth.tolist()))
+        return _Day(start, end, step, knots, edges[order].tolist(), levels.tolist(), clouds)
+
+def node_seed(seed: int, node_index: int) -> int:
+    """Seed of node node_index: the configured seed itself for the main node (0),
+    otherwise a 64-bit seed derived from (seed, node_index)."""
+    if node_index == 0:
+        return int(seed)
+    return int(np.random.SeedSequence([int(seed), node_index]).generate_state(1, np.uint64)[0])
+
+def apply_stochastic(scenario, node_index: int = 0):
+    """Wrap scenario in the stochastic layer when settings.stochastic.seed is set."""
+    params = settings.stochastic
+    if params.seed is None or not scenario:
+        return scenario
+    return StochasticScenario(scenario, node_seed(params.seed, node_index), params)
+
+def for_node(scenario, node_index: int):
+    """scenario for fleet node node_index: a stochastic layer is re-seeded for the
+    node (over the same base scenario), anything else is shared as it is."""
+    if isinstance(scenario, StochasticScenario):
+        return StochasticScenario(scenario.base, node_seed(scenario.seed, node_index), scenario.params)
+    return scenario
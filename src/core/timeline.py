@@ -0,0 +1,208 @@
+"""Multi-day scenarios: calendar rule sets compiled into a memory-mapped sample file.
+
+A rule set (YAML) picks one daily profile CSV per date:
+
+    start: 2026-01-01
+    end: 2026-12-31            # inclusive
+    resolution_sec: 60         # sample spacing (1 s for a year = 31.5 M samples, 252 MB)
+    profiles:
+      workday: sunny_day.csv   # paths are relative to the YAML file
+      home: default_scenario.csv
+      rainy: cloudy_day.csv
+    rules:                     # priority: dates > holiday > weekend > weekday
+      weekday: workday
+      weekend: home
+      holiday: home            # default: the weekend profile
+    holidays: [2026-01-01, 2026-05-04]
+    dates:
+      2026-06-15: rainy
+
+compile_rules() samples every day in one vectorized pass per day and streams
+the days into a fixed-layout binary file (peak memory is one day's samples):
+
+    header  <4sHHqIQ (32 bytes)  magic b"HESC", version, reserved,
+                                 start (epoch s, local midnight), resolution (s), sample count
+    samples count x <ff          load_w, solar_w
+
+ScenarioTimeline maps the file read-only and serves values_at() by index
+arithmetic on the timestamp (O(1)); nothing is loaded into Python objects.
+It has the same lookup interface as CompiledScenario, on epoch seconds
+instead of seconds from midnight, so the engine steps either one unchanged.
+Past the end, the timeline repeats from its start.
+"""
+import math
+import mmap
+import os
+import struct
+import time
+from datetime import date, timedelta
+import numpy as np
+import yaml
+from .scenario import CompiledScenario, SECONDS_PER_DAY
+from .scenario_cache import load_compiled
+
+MAGIC = b"HESC"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHqIQ4x")
+SAMPLE_SIZE = 8
+
+def _midnight(d: date) -> int:
+    return int(time.mktime((d.year, d.month, d.day, 0, 0, 0, 0, 0, -1)))
+
+def sample_profile(profile: CompiledScenario, tod: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Profile values at the seconds-from-midnight tod (linear, wrapping past midnight like values_at)."""
+    if not profile:
+        return np.full(len(tod), 500.0), np.zeros(len(tod))
+    return (np.interp(tod, profile.times, profile.loads, period=SECONDS_PER_DAY),
+            np.interp(tod, profile.times, profile.solars, period=SECONDS_PER_DAY))
+
+def _as_date(value) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+def compile_rules(rule_path: str, out_path: str) -> int:
+    """Compile a YAML rule set into a timeline file; returns the sample count."""
+    with open(rule_path, "r") as f:
+        spec = yaml.safe_load(f)
+    base = os.path.dirname(rule_path)
+    start, end = _as_date(spec["start"]), _as_date(spec["end"])
+    res = int(spec.get("resolution_sec", 60))
+    if end < start:
+        raise ValueError("end is before start")
+    if res <= 0:
+        raise ValueError("resolution_sec must be positive")
+
+    profiles = {name: load_compiled(os.path.join(base, path))
+                for name, path in (spec.get("profiles") or {}).items()}
+    rules = spec.get("rules") or {}
+    weekday = rules.get("weekday")
+    weekend = rules.get("weekend", weekday)
+    holiday = rules.get("holiday", weekend)
+    holidays = {_as_date(d) for d in spec.get("holidays") or ()}
+    dates = {_as_date(d): name for d, name in (spec.get("dates") or {}).items()}
+    for name in {weekday, weekend, holiday, *dates.values()}:
+        if name not in profiles:
+            raise ValueError(f"unknown profile: {name}")
+
+    start_epoch = _midnight(start)
+    count = (_midnight(end + timedelta(days=1)) - start_epoch) // res
+    # Days are written as they are sampled: only one day's samples are in memory
+    tmp = f"{out_path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, start_epoch, res, count))
+        d = start
+        while d <= end:
+            if d in dates:
+                name = dates[d]
+            elif d in holidays:
+                name = holiday
+            elif d.weekday() >= 5:
+                name = weekend
+            else:
+                name = weekday
+            day_start = _midnight(d)
+            # Samples whose timestamp falls on this local date (23 / 25 h on DST changes);
+            # each day starts where the previous one ended, so the file is written in order
+            i0 = -(-(day_start - start_epoch) // res)
+            i1 = min(count, -(-(_midnight(d + timedelta(days=1)) - start_epoch) // res))
+            tod = start_epoch + np.arange(i0, i1, dtype=np.float64) * res - day_start
+            day = np.empty((i1 - i0, 2), dtype="<f4")
+            day[:, 0], day[:, 1] = sample_profile(profiles[name], tod)
+            day.tofile(f)
+            d += timedelta(days=1)
+    os.replace(tmp, out_path)
+    return count
+
+class ScenarioTimeline:
+    """Read-only memory-mapped timeline (see module docstring); positions are epoch seconds."""
+    __slots__ = ("path", "start", "resolution", "_count", "_samples")
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(buf) < _HEADER.size:
+            raise ValueError(f"{path}: not a scenario timeline")
+        magic, version, _, start, res, count = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} scenario timeline")
+        if count == 0 or len(buf) != _HEADER.size + count * SAMPLE_SIZE:
+            raise ValueError(f"{path}: size does not match its header")
+        self.start = float(start)
+        self.resolution = float(res)
+        self._count = count
+        # Flat load, solar, load, solar, ... view straight onto the mapping
+        self._samples = memoryview(buf)[_HEADER.size:].cast("f")
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def end(self) -> float:
+        return self.start + self._count * self.resolution
+
+    def time_of(self, clock) -> float:
+        return clock.now()
+
+    def wrap(self, t: float) -> float:
+        return t
+
+    def _sample(self, t: float) -> tuple[int, float]:
+        """(sample index at or before t, fraction towards the next sample)."""
+        x = (t - self.start) / self.resolution
+        k = math.floor(x)
+        return k % self._count, x - k
+
+    def values_at(self, t: float) -> tuple[float, float]:
+        i, frac = self._sample(t)
+        j = (i + 1) % self._count
+        s = self._samples
+        load0, solar0 = s[2 * i], s[2 * i + 1]
+        load = load0 + (s[2 * j] - load0) * frac
+        solar = solar0 + (s[2 * j + 1] - solar0) * frac
+        return load, solar
+
+    def values_array(self, ts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """values_at() for an array of timestamps, in one vectorized pass."""
+        samples = np.frombuffer(self._samples, dtype=np.float32).reshape(-1, 2)
+        x = (ts - self.start) / self.resolution
+        k = np.floor(x)
+        frac = x - k
+        i = k.astype(np.int64) % self._count
+        j = (i + 1) % self._count
+        # Rows: (load, solar) at the sample before and after each timestamp
+        a, b = samples[i].T.astype(np.float64), samples[j].T.astype(np.float64)
+        return a[0] + (b[0] - a[0]) * frac, a[1] + (b[1] - a[1]) * frac
+
+    def next_point(self, t: float) -> float:
+        """Timestamp of the first sample after t."""
+        return self.start + (math.floor((t - self.start) / self.resolution) + 1) * self.resolution
+
+    def time_to_next_point(self, t: float) -> float:
+        return self.next_point(t) - t
+
+def load_scenario(path: str):
+    """Scenario for path: daily CSV (shared, cached parse), compiled timeline (.bin)
+    or rule set (.yaml / .yml).
+
+    A rule set is compiled to <name>.bin next to it when that file is missing
+    or older than the rule set or any of its profile CSVs.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".yaml", ".yml"):
+        compiled = os.path.splitext(path)[0] + ".bin"
+        if _stale(compiled, path):
+            compile_rules(path, compiled)
+        return ScenarioTimeline(compiled)
+    if ext == ".bin":
+        return ScenarioTimeline(path)
+    return load_compiled(path)
+
+def _stale(compiled: str, rule_path: str) -> bool:
+    if not os.path.exists(compiled):
+        return True
+    built = os.path.getmtime(compiled)
+    with open(rule_path, "r") as f:
+        spec = yaml.safe_load(f) or {}
+    base = os.path.dirname(rule_path)
+    sources = [rule_path] + [os.path.join(base, p) for p in (spec.get("profiles") or {}).values()]
+    return any(os.path.getmtime(src) > built for src in sources if os.path.exists(src))
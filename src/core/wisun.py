@@ -187,17 +187,20 @@ class WiSunManager:
             
             logger.info(f"Received ECHONET packet from {sender_ip}")
             
-            # Use Echonet Controller to process
-            response_bytes = wisun_echonet_ctrl.handle_packet(data_bytes, (sender_ip, 3610))
-            
-            if response_bytes:
-                # Send response back via SKSENDTO
-                # SKSENDTO <HANDLE> <IPADDR> <PORT> <SECURE> <DATALEN> <DATA>
-                asyncio.create_task(self._send_udp(sender_ip, 3610, response_bytes))
+            # Use Echonet Controller to process (instance 0x00 is answered by every instance;
+            # SETs are applied on the simulation thread, if any)
+            wisun_echonet_ctrl.dispatch(data_bytes, (sender_ip, 3610),
+                                        lambda responses: self._send_responses(sender_ip, responses))
                 
         except Exception as e:
             logger.error(f"Failed to handle ERXUDP: {e}")
             
+    def _send_responses(self, ip: str, responses: list[bytes]):
+        for response_bytes in responses:
+            # Send response back via SKSENDTO
+            # SKSENDTO <HANDLE> <IPADDR> <PORT> <SECURE> <DATALEN> <DATA>
+            asyncio.create_task(self._send_udp(ip, 3610, response_bytes))
+
     async def _send_udp(self, ip: str, port: int, data: bytes):
         handle = "1"
         secured = "1" # Always encrypted for B-route
@@ -1,10 +1,14 @@
 from nicegui import ui
 from fastapi import FastAPI
 from src.ui import layout
+from src import api
 from src.services.echonet_service import start_echonet_service
 from src.services.simulation_service import start_simulation_service
+from src.services.checkpoint_service import start_checkpoint_service, save_checkpoint
+from src.services.fleet_service import build_fleet, start_fleet_service
 
 app = FastAPI()
+app.include_router(api.router)
 
 @ui.page('/')
 def main_page():
@@ -12,10 +16,24 @@ def main_page():
 
 @app.on_event("startup")
 async def startup_event():
+    # Build virtual fleet nodes (settings.fleet.node_count > 0) so the checkpoint covers them
+    build_fleet()
+
+    # Restore device state saved by the previous run (before the first tick)
+    await start_checkpoint_service()
+
     # Start Simulation Loop
     await start_simulation_service()
     
     # Start ECHONET Service (Wi-Fi & Wi-SUN)
     await start_echonet_service()
 
+    # Serve and step the virtual fleet nodes
+    await start_fleet_service()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Keep counters monotonic across restarts (docker restart / stop)
+    await save_checkpoint()
+
 ui.run_with(app, title='Home Energy Emulator', storage_secret='secret')
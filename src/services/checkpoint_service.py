@@ -0,0 +1,58 @@
+import asyncio
+import logging
+import struct
+import time
+from src.core import checkpoint
+from src.core.engine import engine
+from src.config.settings import settings
+from src.services.simulation_service import run_on_simulation
+from src.services.fleet_service import fleet_nodes
+
+logger = logging.getLogger("uvicorn")
+
+def checkpointed_engines() -> list:
+    """The main engine followed by every fleet node's engine (checkpoint file order)."""
+    return [engine] + [node.engine for node in fleet_nodes]
+
+def restore_checkpoint():
+    """Restore the device state of every engine from simulation.checkpoint_file (before the first tick)."""
+    path = settings.simulation.checkpoint_file
+    if not path:
+        return
+    started = time.perf_counter()
+    engines = checkpointed_engines()
+    try:
+        saved_at = checkpoint.load(engines, path)
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"Ignoring checkpoint {path}: {e}")
+        return
+    if saved_at is None:
+        logger.info(f"No checkpoint at {path}, starting from initial values")
+        return
+    for restored in engines:
+        restored.publish_snapshots()
+    logger.info(f"Restored checkpoint {path} ({len(engines)} engines, "
+                f"saved {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(saved_at))}, "
+                f"{(time.perf_counter() - started) * 1000:.1f} ms)")
+
+async def save_checkpoint():
+    """Pack the state between ticks (on the simulation thread in thread mode) and
+    write it from a worker thread; the event loop never waits on a tick or on disk I/O."""
+    path = settings.simulation.checkpoint_file
+    if not path:
+        return
+    data = await run_on_simulation(checkpoint.encode_nodes, checkpointed_engines())
+    try:
+        await asyncio.to_thread(checkpoint.write_atomic, path, data)
+    except OSError as e:
+        logger.error(f"Failed to write checkpoint {path}: {e}")
+
+async def checkpoint_loop():
+    while True:
+        await asyncio.sleep(settings.simulation.checkpoint_interval_sec)
+        await save_checkpoint()
+
+async def start_checkpoint_service():
+    restore_checkpoint()
+    if settings.simulation.checkpoint_interval_sec > 0:
+        asyncio.create_task(checkpoint_loop())
@@ -1,75 +1,212 @@
 import asyncio
 import logging
+import random
 import socket
 import struct
-from src.config.settings import settings
-from src.core.echonet import wifi_echonet_ctrl, wisun_echonet_ctrl
+import sys
+from typing import Optional
+from src.config.settings import settings, add_change_listener
+from src.core.echonet import EchonetController, wifi_echonet_ctrl, wisun_echonet_ctrl, ESV_INF, WILDCARD_INSTANCE
 from src.core.adapters import SolarAdapter, BatteryAdapter, NodeProfileAdapter, SmartMeterAdapter, ElectricWaterHeaterAdapter, V2HAdapter, AirConditionerAdapter
 from src.core.wisun import wisun_manager
-from src.core.engine import engine
+from src.core.engine import engine, SimulationEngine
+from src.services.simulation_service import tick_executor, submit_to_simulation
 
 logger = logging.getLogger("uvicorn")
 
+# Linux value; the socket module has no IP_PKTINFO constant before Python 3.12
+IP_PKTINFO = getattr(socket, "IP_PKTINFO", 8 if sys.platform.startswith("linux") else None)
+# struct in_pktinfo { int ipi_ifindex; in_addr ipi_spec_dst; in_addr ipi_addr; }
+_PKTINFO = struct.Struct("=i4s4s")
+RECV_SIZE = 65535
+
+ECHONET_MULTICAST = "224.0.23.0"
+
+# Protocols of the other nodes hosted in this process (fleet mode). Their sockets are
+# bound to unicast addresses, so requests to the multicast group reach only the main
+# 0.0.0.0 socket, which hands them on to these (see EchonetProtocol.datagram_received)
+multicast_peers: list["EchonetProtocol"] = []
+
+def _is_multicast(dst: Optional[bytes]) -> bool:
+    return dst is not None and 224 <= dst[0] <= 239
+
+def _is_discovery(data: bytes, multicast: bool) -> bool:
+    # Requests several nodes answer at once: wildcard instance or sent to the multicast group
+    return multicast or (len(data) > 9 and data[9] == WILDCARD_INSTANCE)
+
+def _destination(ancdata) -> Optional[bytes]:
+    """Destination address (4 bytes) of a datagram from its IP_PKTINFO control message."""
+    for level, ctype, cdata in ancdata:
+        if level == socket.IPPROTO_IP and ctype == IP_PKTINFO and len(cdata) >= _PKTINFO.size:
+            return _PKTINFO.unpack_from(cdata)[2]
+    return None
+
 class EchonetProtocol(asyncio.DatagramProtocol):
+    def __init__(self, ctrl: EchonetController = wifi_echonet_ctrl, quiet: bool = False, relay: bool = False):
+        self.ctrl = ctrl
+        self.quiet = quiet
+        # The main socket's protocol passes multicast requests on to multicast_peers
+        self.relay = relay
+
     def connection_made(self, transport):
         self.transport = transport
-        logger.info(f"ECHONET Lite UDP Server (Wi-Fi) listening on port {settings.communication.echonet_port}")
+        if not self.quiet:
+            logger.info(f"ECHONET Lite UDP Server (Wi-Fi) listening on port {settings.communication.echonet_port}")
+
+    def datagram_received(self, data, addr, dst: bytes = None):
+        # Dispatch to Wi-Fi controller (SETs are applied on the simulation thread, if any)
+        # Note: addr is (ip, port); dst is the destination address when known (PktInfoEndpoint)
+        self.ctrl.dispatch(data, addr, lambda responses: self._reply(data, addr, dst, responses))
+        if self.relay and _is_multicast(dst):
+            # Every hosted node answers a multicast request from its own address
+            for peer in multicast_peers:
+                peer.datagram_received(data, addr, dst)
 
-    def datagram_received(self, data, addr):
-        # Dispatch to Wi-Fi controller
-        # Note: addr is (ip, port)
-        res = wifi_echonet_ctrl.handle_packet(data, addr)
-        if res:
+    def _reply(self, data, addr, dst, responses: list[bytes]):
+        if not responses:
+            return
+        jitter = settings.communication.multicast_response_jitter_sec
+        if jitter > 0 and _is_discovery(data, _is_multicast(dst)):
+            # Spread replies so discovery storms from several controllers
+            # don't turn into transmit bursts
+            loop = asyncio.get_running_loop()
+            for res in responses:
+                loop.call_later(random.uniform(0, jitter), self._send, res, addr)
+        else:
+            for res in responses:
+                self._send(res, addr)
+
+    def _send(self, res: bytes, addr):
+        if res[10] == ESV_INF:
+            # INF_REQ is answered by a notification to the multicast group
+            self.transport.sendto(res, (ECHONET_MULTICAST, 3610))
+        else:
             self.transport.sendto(res, addr)
 
-async def start_echonet_service():
-    # --- 1. Wi-Fi Controller Setup (Solar + Battery) ---
-    # --- 1. Wi-Fi Controller Setup (Solar + Battery) ---
-    # Node Profile for Wi-Fi: Solar(0279) and Battery(027D)
-    
-    wifi_instances = []
-    
-    # Always check settings for enabled devices
-    enabled_devs = settings.echonet.wifi_devices
-    
-    if 'solar' in enabled_devs:
-        wifi_instances.append((0x02, 0x79, 0x01))
-        
-    if 'battery' in enabled_devs:
-        wifi_instances.append((0x02, 0x7D, 0x01))
+class PktInfoEndpoint:
+    """UDP endpoint that passes each datagram's destination address to the protocol.
 
-    if 'water_heater' in enabled_devs:
-        wifi_instances.append((0x02, 0x6B, 0x01))
+    asyncio's datagram transport reads with recvfrom() and drops control
+    messages, so unicast and multicast requests on the shared 0.0.0.0 socket
+    would be indistinguishable. This reads with recvmsg() and IP_PKTINFO
+    instead; it also serves as the protocol's transport (sendto only).
+    """
 
-    if 'v2h' in enabled_devs:
-        wifi_instances.append((0x02, 0x7E, 0x01))
+    def __init__(self, sock: socket.socket, protocol: EchonetProtocol):
+        self.sock = sock
+        self.protocol = protocol
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_IP, IP_PKTINFO, 1)
+        self._ancbufsize = socket.CMSG_SPACE(_PKTINFO.size)
+        protocol.connection_made(self)
+        asyncio.get_running_loop().add_reader(sock.fileno(), self._read_ready)
 
-    if 'air_conditioner' in enabled_devs:
-        wifi_instances.append((0x01, 0x30, 0x01))
+    def _read_ready(self):
+        # One datagram per callback, like asyncio's own transport
+        try:
+            data, ancdata, _, addr = self.sock.recvmsg(RECV_SIZE, self._ancbufsize)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            logger.error(f"ECHONET Lite UDP receive failed: {e}")
+            return
+        self.protocol.datagram_received(data, addr, _destination(ancdata))
 
-    if 'smart_meter' in enabled_devs:
-        wifi_instances.append((0x02, 0x88, 0x01))
+    def sendto(self, data: bytes, addr):
+        try:
+            self.sock.sendto(data, addr)
+        except (BlockingIOError, InterruptedError):
+            logger.warning(f"ECHONET Lite UDP send buffer full, dropped response to {addr}")
+        except OSError as e:
+            logger.error(f"ECHONET Lite UDP send to {addr} failed: {e}")
 
-    wifi_echonet_ctrl.register_instance(0x0E, 0xF0, 0x01, NodeProfileAdapter(wifi_instances))
-    
-    if 'solar' in enabled_devs:
-        wifi_echonet_ctrl.register_instance(0x02, 0x79, 0x01, SolarAdapter(engine.solar))
-        
-    if 'battery' in enabled_devs:
-        wifi_echonet_ctrl.register_instance(0x02, 0x7D, 0x01, BatteryAdapter(engine.battery))
+    def close(self):
+        asyncio.get_running_loop().remove_reader(self.sock.fileno())
+        self.sock.close()
+
+# (settings key, class group/code, adapter, engine attribute holding the instances)
+# Each engine instance i (1-based) is exposed as instance code i.
+WIFI_CLASSES = [
+    ('solar',           (0x02, 0x79), SolarAdapter,               'solars'),
+    ('battery',         (0x02, 0x7D), BatteryAdapter,             'batteries'),
+    ('water_heater',    (0x02, 0x6B), ElectricWaterHeaterAdapter, 'water_heaters'),
+    ('v2h',             (0x02, 0x7E), V2HAdapter,                 'v2hs'),
+    ('air_conditioner', (0x01, 0x30), AirConditionerAdapter,      'air_conditioners'),
+    # Wi-Fi側にも Smart Meter を登録（engine.smart_meter は Wi-SUN 側と共通インスタンス）
+    ('smart_meter',     (0x02, 0x88), SmartMeterAdapter,          None),
+]
+
+NODE_PROFILE = (0x0E, 0xF0, 0x01)
+
+def _devices(sim: SimulationEngine, attr: str) -> list:
+    return getattr(sim, attr) if attr else [sim.smart_meter]
+
+def register_wifi_objects(ctrl: EchonetController, sim: SimulationEngine, enabled_devs: list[str], node_index: int = 0):
+    """Node Profile と有効なデバイスの全インスタンスを ctrl に登録する。
+
+    node_index はフリートモードのノード番号で、識別番号 (0x83) の導出に使う
+    (0 = 設定値そのまま)。
+    """
+    # SETs change the engine's device state: apply them where its ticks run
+    ctrl.write_executor = tick_executor
+
+    node_profile = NodeProfileAdapter([], node_index)
+    ctrl.register_instance(*NODE_PROFILE, node_profile)
+    sim.register_snapshot_source(node_profile)
+    sync_wifi_objects(ctrl, sim, enabled_devs, node_index)
+
+def sync_wifi_objects(ctrl: EchonetController, sim: SimulationEngine, enabled_devs: list[str], node_index: int = 0):
+    """有効なクラスのオブジェクトを登録し、無効になったクラスのオブジェクトを登録解除する。
 
-    if 'water_heater' in enabled_devs:
-        wifi_echonet_ctrl.register_instance(0x02, 0x6B, 0x01, ElectricWaterHeaterAdapter(engine.water_heater))
+    無効化したデバイスが固まった値で応答し続けないよう、エンジンの
+    スナップショット対象とノードプロファイルのインスタンスリストも合わせる。
+    """
+    for key, (group, code), adapter_cls, attr in WIFI_CLASSES:
+        registered = ctrl.instances_of(group, code)
+        if key in enabled_devs and not registered:
+            for inst, device in enumerate(_devices(sim, attr), start=1):
+                adapter = adapter_cls(device, inst, node_index)
+                ctrl.register_instance(group, code, inst, adapter)
+                sim.register_snapshot_source(adapter)
+        elif key not in enabled_devs:
+            for inst in registered:
+                sim.unregister_snapshot_source(ctrl.unregister_instance(group, code, inst))
 
-    if 'v2h' in enabled_devs:
-        wifi_echonet_ctrl.register_instance(0x02, 0x7E, 0x01, V2HAdapter(engine.v2h))
+    instances = [(group, code, inst) for _, (group, code), _, _ in WIFI_CLASSES
+                 for inst in ctrl.instances_of(group, code)]
+    ctrl._objects[NODE_PROFILE].set_instances(instances)
 
-    if 'air_conditioner' in enabled_devs:
-        wifi_echonet_ctrl.register_instance(0x01, 0x30, 0x01, AirConditionerAdapter(engine.air_conditioner))
+def apply_wifi_devices(ctrl: EchonetController, sim: SimulationEngine, node_index: int = 0):
+    """settings.echonet.wifi_devices の変更をエンジン (ステップ対象) と ECHONET オブジェクトに反映する"""
+    enabled_devs = settings.echonet.wifi_devices
+    sim.set_enabled_models(enabled_devs)
+    sync_wifi_objects(ctrl, sim, enabled_devs, node_index)
+
+def instance_list_inf(ctrl: EchonetController) -> Optional[bytes]:
+    """Instance List Notification (0xD5 INF from the Node Profile) of the node served by ctrl."""
+    node_profile = ctrl._objects.get(NODE_PROFILE)
+    d5_value = node_profile.get_property(0xD5) if node_profile else None
+    if not d5_value:
+        return None
+    # EHD(2) + TID(2) + SEOJ(3) + DEOJ(3) + ESV(1) + OPC(1) + EPC(1) + PDC(1) + EDT(N)
+    # SEOJ / DEOJ: Node Profile (to every node); ESV 0x73 INF
+    return b'\x10\x81\x00\x00\x0E\xF0\x01\x0E\xF0\x01\x73\x01\xD5' + bytes([len(d5_value)]) + d5_value
+
+def announce(ctrl: EchonetController, sendto, quiet: bool = False):
+    """Send the node's Instance List Notification to the multicast group (startup announcement)."""
+    try:
+        frame = instance_list_inf(ctrl)
+        if frame:
+            sendto(frame, (ECHONET_MULTICAST, 3610))
+            if not quiet:
+                logger.info(f"Sent Initial Instance List Notification (INF) to {ECHONET_MULTICAST}:3610")
+    except Exception as e:
+        logger.error(f"Failed to send initial announcement: {e}")
 
-    if 'smart_meter' in enabled_devs:
-        # Wi-Fi側にも Smart Meter を登録（engine.smart_meter は Wi-SUN 側と共通インスタンス）
-        wifi_echonet_ctrl.register_instance(0x02, 0x88, 0x01, SmartMeterAdapter(engine.smart_meter))
+async def start_echonet_service():
+    # --- 1. Wi-Fi Controller Setup (Solar + Battery) ---
+    # Node Profile for Wi-Fi: enabled devices (all instances)
+    register_wifi_objects(wifi_echonet_ctrl, engine, settings.echonet.wifi_devices)
     
     # --- 2. Wi-SUN Controller Setup (Smart Meter) ---
     # Node Profile for Wi-SUN: Smart Meter(0288)
@@ -78,7 +215,16 @@ async def start_echonet_service():
     
     # Smart Meter: Class Group 0x02, Class Code 0x88, Instance 0x01
     wisun_echonet_ctrl.register_instance(0x02, 0x88, 0x01, SmartMeterAdapter(engine.smart_meter))
+    wisun_echonet_ctrl.write_executor = tick_executor
 
+    # GET は エンジンがティック毎に発行するエンコード済みスナップショットから応答する
+    # (Wi-Fi 側は register_wifi_objects で登録済み)
+    for adapter in wisun_echonet_ctrl._objects.values():
+        engine.register_snapshot_source(adapter)
+
+    # Devices enabled / disabled from the Settings tab take effect without a restart
+    # (applied on the simulation thread, between ticks)
+    add_change_listener(lambda: submit_to_simulation(apply_wifi_devices, wifi_echonet_ctrl, engine))
     
     # --- 3. Start UDP Server (Wi-Fi) with Multicast Support ---
     try:
@@ -98,39 +244,20 @@ async def start_echonet_service():
         # Set Multicast TTL
         sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
         
-        await loop.create_datagram_endpoint(
-            lambda: EchonetProtocol(),
-            sock=sock
-        )
+        if IP_PKTINFO is not None:
+            # Destination addresses tell multicast discovery from unicast requests
+            # (and let the fleet nodes answer multicast requests too)
+            PktInfoEndpoint(sock, EchonetProtocol(relay=True))
+        else:
+            await loop.create_datagram_endpoint(
+                lambda: EchonetProtocol(),
+                sock=sock
+            )
         logger.info("ECHONET Lite UDP Server started with Multicast (224.0.23.0) support.")
 
         # --- 3.5 Send Instance List Notification (INF) ---
         # Announce presence to the network via Multicast
-        try:
-            # 1. Get Instance List (D5) from Node Profile
-            # Node Profile instance tuple: (0x0E, 0xF0, 0x01)
-            node_profile = wifi_echonet_ctrl._objects.get((0x0E, 0xF0, 0x01))
-            if node_profile:
-                d5_value = node_profile.get_property(0xD5) # Instance List Notification
-                if d5_value:
-                    # 2. Build ECHONET Lite Frame (Format 1)
-                    # EHD(2) + TID(2) + SEOJ(3) + DEOJ(3) + ESV(1) + OPC(1) + EPC(1) + PDC(1) + EDT(N)
-                    tid = b'\x00\x00' # Transaction ID
-                    seoj = b'\x0E\xF0\x01' # Source: Node Profile
-                    deoj = b'\x0E\xF0\x01' # Dest: Node Profile (Broadcast to all nodes)
-                    esv = b'\x73' # INF (Property Value Notification)
-                    opc = b'\x01'
-                    epc = b'\xD5'
-                    pdc = bytes([len(d5_value)])
-                    edt = d5_value
-                    
-                    frame = b'\x10\x81' + tid + seoj + deoj + esv + opc + epc + pdc + edt
-                    
-                    # 3. Send to Multicast
-                    sock.sendto(frame, ('224.0.23.0', 3610))
-                    logger.info("Sent Initial Instance List Notification (INF) to 224.0.23.0:3610")
-        except Exception as e:
-            logger.error(f"Failed to send initial announcement: {e}")
+        announce(wifi_echonet_ctrl, sock.sendto)
             
     except Exception as e:
         logger.error(f"Failed to start UDP server: {e}")
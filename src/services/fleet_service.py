@@ -0,0 +1,111 @@
+import asyncio
+import ipaddress
+import logging
+import socket
+import tracemalloc
+from src.config.settings import settings, add_change_listener
+from src.core.echonet import EchonetController
+from src.core.engine import engine, SimulationEngine
+from src.core.scenario import CompiledScenario
+from src.core.stochastic import for_node
+from src.services.echonet_service import (EchonetProtocol, register_wifi_objects, apply_wifi_devices, announce,
+                                         multicast_peers, IP_PKTINFO)
+from src.services.simulation_service import run_periodic, make_scheduler, submit_to_simulation
+
+logger = logging.getLogger("uvicorn")
+
+class FleetNode:
+    """フリートモードの1ノード (1世帯分): 専用のエンジン・コントローラー・ノードプロファイルを持つ"""
+    __slots__ = ("index", "address", "engine", "ctrl", "protocol", "transport")
+
+    def __init__(self, index: int, address: str, scenario: CompiledScenario, enabled_devs: list[str]):
+        self.index = index
+        self.address = address
+        # Nodes follow the main engine's clock (speed / pause / seek apply fleet-wide)
+        self.engine = SimulationEngine(scenario, engine.clock, enabled_devs)
+        self.ctrl = EchonetController(cache_size=settings.fleet.cache_size)
+        self.protocol = EchonetProtocol(self.ctrl, quiet=True)
+        self.transport = None
+        # Node index 0 is the main node, so fleet nodes start at 1
+        register_wifi_objects(self.ctrl, self.engine, enabled_devs, index + 1)
+
+def node_address(index: int) -> str:
+    return str(ipaddress.IPv4Address(settings.fleet.base_address) + index)
+
+def build_nodes(count: int) -> list[FleetNode]:
+    # All nodes share the main engine's compiled scenario (read-only apart from its lookup cache);
+    # with stochastic.seed set each node gets its own seeded layer over it (node 0 is the main
+    # engine), holding only its days' random draws
+    return [FleetNode(i, node_address(i), for_node(engine.scenario, i + 1), settings.echonet.wifi_devices)
+            for i in range(count)]
+
+def measure_node_memory(count: int) -> tuple[list[FleetNode], float]:
+    """Build count nodes and return them with the traced allocation per node (bytes)."""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = build_nodes(count)
+    per_node = (tracemalloc.get_traced_memory()[0] - before) / max(count, 1)
+    if started:
+        tracemalloc.stop()
+    return nodes, per_node
+
+fleet_nodes: list[FleetNode] = []
+
+def step_fleet():
+    for node in fleet_nodes:
+        try:
+            node.engine.update_simulation()
+        except Exception as e:
+            logger.error(f"Error in fleet node {node.index} simulation: {e}")
+
+def apply_fleet_devices():
+    for node in fleet_nodes:
+        apply_wifi_devices(node.ctrl, node.engine, node.index + 1)
+
+async def fleet_simulation_loop():
+    # All nodes are stepped from this one loop (single asyncio task);
+    # simulation.executor = "thread" moves the sweep onto the simulation thread
+    await run_periodic(make_scheduler("fleet"), step_fleet)
+
+def build_fleet():
+    """Build settings.fleet.node_count nodes (before the checkpoint restores their state)."""
+    count = settings.fleet.node_count
+    if count <= 0:
+        return
+
+    nodes, per_node = measure_node_memory(count)
+    fleet_nodes.extend(nodes)
+    add_change_listener(lambda: submit_to_simulation(apply_fleet_devices))
+    logger.info(f"Fleet: built {count} nodes, {per_node / 1024:.1f} KiB/node")
+
+async def start_fleet_service():
+    if not fleet_nodes:
+        return
+
+    count = len(fleet_nodes)
+    loop = asyncio.get_running_loop()
+    port = settings.communication.echonet_port
+    for node in fleet_nodes:
+        try:
+            # SO_REUSEADDR lets the node share the port with the main 0.0.0.0 socket;
+            # unicast to the node address is delivered to the more specific bind
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((node.address, port))
+            # Notifications to the multicast group leave through the node address's interface
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(node.address))
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+            node.transport, _ = await loop.create_datagram_endpoint(lambda node=node: node.protocol, sock=sock)
+        except Exception as e:
+            logger.error(f"Fleet node {node.index} failed to bind {node.address}:{port}: {e}")
+            continue
+        # Multicast requests arrive on the main socket, which hands them on to the nodes
+        multicast_peers.append(node.protocol)
+        announce(node.ctrl, node.transport.sendto, quiet=True)
+    if IP_PKTINFO is None:
+        logger.warning("Fleet: IP_PKTINFO unavailable, nodes answer unicast requests only (no multicast discovery)")
+
+    asyncio.create_task(fleet_simulation_loop())
+    logger.info(f"Fleet: serving {count} nodes on {node_address(0)} - {node_address(count - 1)}:{port}")
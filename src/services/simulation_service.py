@@ -1,19 +1,101 @@
 import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from src.core.engine import engine
+from src.core.scheduler import TickScheduler, POLICIES
 from src.config.settings import settings
 
 logger = logging.getLogger("uvicorn")
 
-async def simulation_loop():
-    logger.info("Starting Background Simulation Loop")
+EXECUTORS = ("inline", "thread")
+
+# Running tick schedulers by loop name ("main", "fleet")
+schedulers: dict[str, TickScheduler] = {}
+
+# Dedicated simulation thread (simulation.executor = "thread"); one worker keeps ticks ordered
+_executor: ThreadPoolExecutor = None
+
+def tick_executor():
+    """ThreadPoolExecutor running the ticks, or None to tick on the event loop."""
+    global _executor
+    mode = settings.simulation.executor
+    if mode not in EXECUTORS:
+        logger.warning(f"Unknown simulation.executor '{mode}', running inline")
+        return None
+    if mode == "inline":
+        return None
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="simulation")
+    return _executor
+
+async def run_on_simulation(func, *args):
+    """Run func(*args) where the ticks run and return its result.
+
+    Inline mode calls it directly. Thread mode queues it on the simulation
+    thread, between ticks; the event loop keeps serving UDP / Wi-SUN / UI
+    while it waits. Every change to engine state goes through here or
+    submit_to_simulation, so no lock is needed around the devices.
+    """
+    executor = tick_executor()
+    if executor is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+def submit_to_simulation(func, *args):
+    """Like run_on_simulation, for callers that need no result (UI handlers): never blocks."""
+    executor = tick_executor()
+    if executor is None:
+        func(*args)
+        return
+
+    def done(future):
+        if future.exception() is not None:
+            logger.error(f"Failed to apply simulation change: {future.exception()}")
+
+    executor.submit(func, *args).add_done_callback(done)
+
+async def run_tick(func):
+    """Run one tick inline or on the simulation thread (see run_on_simulation).
+
+    GETs read the snapshots the tick publishes at its end and never wait for it.
+    """
+    await run_on_simulation(func)
+
+def make_scheduler(name: str) -> TickScheduler:
+    """TickScheduler following settings.simulation, listed in schedulers (GET /api/ticks)."""
+    sim = settings.simulation
+    policy = sim.tick_policy
+    if policy not in POLICIES:
+        logger.warning(f"Unknown simulation.tick_policy '{policy}', using skip")
+        policy = "skip"
+    sched = TickScheduler(sim.update_interval_sec, policy, sim.max_catch_up_ticks)
+    schedulers[name] = sched
+    return sched
+
+async def run_periodic(sched: TickScheduler, func):
+    """Run func every sched.interval seconds on monotonic deadlines (no drift from work or loop lag)."""
     while True:
+        interval = settings.simulation.update_interval_sec
+        if interval > 0:
+            sched.set_interval(interval)
+        # Always yield, so back-to-back catch-up ticks don't starve the event loop
+        await asyncio.sleep(max(0.0, sched.delay()))
+        sched.begin()
+        try:
+            await run_tick(func)
+        finally:
+            sched.end()
+
+async def simulation_loop():
+    logger.info(f"Starting Background Simulation Loop ({settings.simulation.executor})")
+
+    def tick():
         try:
             engine.update_simulation()
         except Exception as e:
             logger.error(f"Error in simulation loop: {e}")
-        
-        await asyncio.sleep(settings.simulation.update_interval_sec)
+
+    await run_periodic(make_scheduler("main"), tick)
 
 async def start_simulation_service():
     asyncio.create_task(simulation_loop())
@@ -2,6 +2,8 @@ from nicegui import ui
 from src.core.engine import engine
 from src.core.version import get_git_info
 from src.config.settings import settings
+from src.core.clock import parse_time_of_day
+from src.services.simulation_service import submit_to_simulation
 
 def render():
     is_updating_ui = False
@@ -21,10 +23,33 @@ def render():
             lbl_battery = ui.label().classes('text-lg')
             lbl_v2h = ui.label().classes('text-lg')
             
+            lbl_clock = ui.label().classes('text-lg')
+
             # Application Version
             ui.separator().classes('my-2')
             ui.label(get_git_info()).classes('text-xs text-gray-400 text-center w-full')
 
+    # Simulation Clock (time-warp / pause / seek)
+    with ui.row().classes('w-full justify-center mt-8'):
+        with ui.card().classes('p-4'):
+            ui.label('Simulation Clock').classes('font-bold')
+            clock = engine.clock
+
+            with ui.row().classes('items-center'):
+                ui.label('Speed:').classes('font-bold')
+                for speed in (1, 60, 3600):
+                    ui.button(f'{speed}x', on_click=lambda s=speed: clock.set_speed(s)).props('dense')
+                btn_pause = ui.button('Pause', on_click=lambda: clock.resume() if clock.paused else clock.pause()).props('dense')
+
+            def seek(e):
+                try:
+                    clock.seek_time_of_day(parse_time_of_day(inp_seek.value))
+                except ValueError:
+                    ui.notify(f'Invalid time: {inp_seek.value}', type='negative')
+            with ui.row().classes('items-center'):
+                inp_seek = ui.input('Seek (HH:MM)', value='00:00').classes('w-32')
+                ui.button('Seek', on_click=seek).props('dense')
+
     # Debug Controls
     with ui.row().classes('w-full justify-center mt-8'):
         with ui.card().classes('p-4'):
@@ -32,15 +57,22 @@ def render():
             
             # Scenario Control
             scenario_sw = ui.switch('Scenario Active', value=True, 
-                                  on_change=lambda e: setattr(engine, 'use_scenario', e.value))
+                                  on_change=lambda e: submit_to_simulation(setattr, engine, 'use_scenario', e.value))
             
             def manual_override():
                 if is_updating_ui: return
-                engine.use_scenario = False
+                submit_to_simulation(setattr, engine, 'use_scenario', False)
                 scenario_sw.set_value(False)
 
+            def write(obj, name, value):
+                # Engine state is changed between ticks (on the simulation thread in thread mode);
+                # skipped while update_ui mirrors the engine into the sliders
+                if is_updating_ui: return
+                manual_override()
+                submit_to_simulation(setattr, obj, name, value)
+
             ui.number('Load (W)', value=500, step=100, 
-                      on_change=lambda e: (manual_override(), setattr(engine, 'current_load_w', float(e.value or 0)))).classes('hidden')
+                      on_change=lambda e: write(engine, 'current_load_w', float(e.value or 0))).classes('hidden')
                  
             # --- Manual Sliders (Grouped by Class) ---
             
@@ -52,7 +84,7 @@ def render():
                     with ui.row().classes('w-full items-center'):
                         ui.label('Power consumption:').classes('whitespace-nowrap font-bold')
                         sl_load = ui.slider(min=0, max=3000, step=10, value=500,
-                                            on_change=lambda e: (manual_override(), setattr(engine, 'current_load_w', float(e.value)))
+                                            on_change=lambda e: write(engine, 'current_load_w', float(e.value))
                                            ).classes('flex-grow')
                         ui.label().bind_text_from(sl_load, 'value', backward=lambda v: f"{v:.2f} W").classes('w-20 text-right')
 
@@ -62,7 +94,7 @@ def render():
                     with ui.row().classes('w-full items-center'):
                         ui.label('Power generation:').classes('whitespace-nowrap font-bold')
                         sl_solar = ui.slider(min=0, max=5000, step=10, value=0,
-                                             on_change=lambda e: (manual_override(), setattr(engine.solar, 'instant_generation_power', float(e.value)))
+                                             on_change=lambda e: write(engine.solar, 'instant_generation_power', float(e.value))
                                             ).classes('flex-grow')
                         ui.label().bind_text_from(sl_solar, 'value', backward=lambda v: f"{v:.2f} W").classes('w-20 text-right')
 
@@ -88,7 +120,10 @@ def render():
                             if is_updating_ui: return
                             manual_override()
                             pct = float(e.value) / 100.0
-                            engine.water_heater.remaining_hot_water = engine.water_heater.tank_capacity * pct
+                            def apply():
+                                wh = engine.water_heater
+                                wh.remaining_hot_water = wh.tank_capacity * pct
+                            submit_to_simulation(apply)
                         sl_wh = ui.slider(min=0, max=100, step=0.1, value=50,
                                           on_change=update_wh_amount
                                          ).classes('flex-grow')
@@ -102,15 +137,17 @@ def render():
                             if is_updating_ui: return
                             manual_override()
                             val = float(e.value)
-                            wh = engine.water_heater
-                            if val > 0:
-                                wh.is_heating = True
-                                wh.heating_power_w = val
-                                wh.auto_setting = 0x42 # Manual Start
-                            else:
-                                wh.is_heating = False
-                                wh.heating_power_w = 0.0
-                                wh.auto_setting = 0x43 # Manual Stop
+                            def apply():
+                                wh = engine.water_heater
+                                if val > 0:
+                                    wh.is_heating = True
+                                    wh.heating_power_w = val
+                                    wh.auto_setting = 0x42 # Manual Start
+                                else:
+                                    wh.is_heating = False
+                                    wh.heating_power_w = 0.0
+                                    wh.auto_setting = 0x43 # Manual Stop
+                            submit_to_simulation(apply)
 
                         sl_wh_power = ui.slider(min=0, max=3000, step=10, value=0, on_change=update_wh_power).classes('flex-grow')
                         ui.label().bind_text_from(sl_wh_power, 'value', backward=lambda v: f"{int(v)} W").classes('w-20 text-right')
@@ -123,7 +160,7 @@ def render():
                     with ui.row().classes('w-full items-center mb-2'):
                         ui.label('SOC:').classes('whitespace-nowrap font-bold')
                         sl_soc = ui.slider(min=0, max=100, step=0.1, value=50, 
-                                           on_change=lambda e: (manual_override(), setattr(engine.battery, 'soc', float(e.value)))
+                                           on_change=lambda e: write(engine.battery, 'soc', float(e.value))
                                           ).classes('flex-grow')
                         ui.label().bind_text_from(sl_soc, 'value', backward=lambda v: f"{v:.1f} %").classes('w-20 text-right')
 
@@ -134,22 +171,24 @@ def render():
                             if is_updating_ui: return
                             manual_override()
                             val = e.value
-                            bat = engine.battery
-                            if val > 0:
-                                bat.is_charging = True
-                                bat.is_discharging = False
-                                bat.instant_charge_power = float(val)
-                                bat.instant_discharge_power = 0.0
-                            elif val < 0:
-                                bat.is_charging = False
-                                bat.is_discharging = True
-                                bat.instant_charge_power = 0.0
-                                bat.instant_discharge_power = abs(float(val))
-                            else:
-                                bat.is_charging = False
-                                bat.is_discharging = False
-                                bat.instant_charge_power = 0.0
-                                bat.instant_discharge_power = 0.0
+                            def apply():
+                                bat = engine.battery
+                                if val > 0:
+                                    bat.is_charging = True
+                                    bat.is_discharging = False
+                                    bat.instant_charge_power = float(val)
+                                    bat.instant_discharge_power = 0.0
+                                elif val < 0:
+                                    bat.is_charging = False
+                                    bat.is_discharging = True
+                                    bat.instant_charge_power = 0.0
+                                    bat.instant_discharge_power = abs(float(val))
+                                else:
+                                    bat.is_charging = False
+                                    bat.is_discharging = False
+                                    bat.instant_charge_power = 0.0
+                                    bat.instant_discharge_power = 0.0
+                            submit_to_simulation(apply)
 
                         sl_bat = ui.slider(min=-3000, max=3000, step=10, value=0, on_change=update_battery).classes('flex-grow')
                         ui.label().bind_text_from(sl_bat, 'value', backward=lambda v: f"{v:.2f} W").classes('w-20 text-right')
@@ -164,9 +203,11 @@ def render():
                         def update_v2h_soc(e):
                             if is_updating_ui: return
                             manual_override()
-                            v2h = engine.v2h
                             pct = float(e.value) / 100.0  # 0-100% -> 0.0-1.0
-                            v2h.remaining_capacity_wh = v2h.battery_capacity_wh * pct
+                            def apply():
+                                v2h = engine.v2h
+                                v2h.remaining_capacity_wh = v2h.battery_capacity_wh * pct
+                            submit_to_simulation(apply)
                         sl_v2h_soc = ui.slider(min=0, max=100, step=0.1, value=50,
                                                on_change=update_v2h_soc).classes('flex-grow')
                         ui.label().bind_text_from(sl_v2h_soc, 'value', backward=lambda v: f"{v:.1f} %").classes('w-20 text-right')
@@ -175,7 +216,7 @@ def render():
                     with ui.row().classes('w-full items-center mb-2'):
                         ui.label('Charging power setting:').classes('whitespace-nowrap font-bold')
                         sl_v2h_charge = ui.slider(min=0, max=6000, step=10, value=3000,
-                                                  on_change=lambda e: (manual_override(), setattr(engine.v2h, 'charge_power_w', float(e.value)))
+                                                  on_change=lambda e: write(engine.v2h, 'charge_power_w', float(e.value))
                                                  ).classes('flex-grow')
                         ui.label().bind_text_from(sl_v2h_charge, 'value', backward=lambda v: f"{int(v)} W").classes('w-20 text-right')
 
@@ -183,7 +224,7 @@ def render():
                     with ui.row().classes('w-full items-center'):
                         ui.label('Max discharging power setting:').classes('whitespace-nowrap font-bold')
                         sl_v2h_discharge = ui.slider(min=0, max=6000, step=10, value=3000,
-                                                     on_change=lambda e: (manual_override(), setattr(engine.v2h, 'discharge_power_w', float(e.value)))
+                                                     on_change=lambda e: write(engine.v2h, 'discharge_power_w', float(e.value))
                                                     ).classes('flex-grow')
                         ui.label().bind_text_from(sl_v2h_discharge, 'value', backward=lambda v: f"{int(v)} W").classes('w-20 text-right')
 
@@ -207,6 +248,11 @@ def render():
         
         lbl_battery.set_text(f"Battery: {bat.soc:.1f}% ({state_str})")
 
+        clock_state = engine.clock.state()
+        paused_str = ", Paused" if clock_state["paused"] else ""
+        lbl_clock.set_text(f"Clock: {clock_state['time_of_day']} ({clock_state['speed']:g}x{paused_str})")
+        btn_pause.set_text('Resume' if clock_state["paused"] else 'Pause')
+
         # 2. Update Sliders from Engine State (Scenario or Manual or ECHONET Lite)
         
         is_updating_ui = True
@@ -9,6 +9,8 @@ from typing import Any
 from nicegui import ui
 
 from src.core.engine import engine
+from src.core.scenario_cache import load_table
+from src.services.simulation_service import submit_to_simulation
 from src.config.settings import settings
 
 SCENARIOS_DIR = Path("data/scenarios")
@@ -26,20 +28,12 @@ def _load_csv_data(filename: str) -> list[dict[str, Any]]:
     path = SCENARIOS_DIR / filename
     if not path.exists():
         return []
-    rows = []
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for i, row in enumerate(reader):
-                val = {"_id": i}
-                val["time"] = row.get("time", "")
-                val["load_w"] = float(row.get("load_w", 0))
-                val["solar_w"] = float(row.get("solar_w", 0))
-                val["notes"] = row.get("notes", "")
-                rows.append(val)
+        # エンジンと同じキャッシュ済みの解析結果を使う
+        return load_table(str(path)).rows()
     except Exception as e:
         ui.notify(f"Failed to load CSV: {e}", type="negative")
-    return rows
+    return []
 
 def _save_csv_data(filename: str, rows: list[dict[str, Any]]) -> None:
     path = SCENARIOS_DIR / filename
@@ -166,10 +160,11 @@ class ScenarioController:
             ui.notify("Please select a scenario.", type="warning")
             return
         path = str(SCENARIOS_DIR / fname)
-        engine.switch_scenario(path)
+        submit_to_simulation(engine.switch_scenario, path)
         self.active_file[0] = fname
-        settings.simulation.scenario_file = path
-        settings.save_to_yaml()
+        with settings.batch():
+            settings.simulation.scenario_file = path
+            settings.save_to_yaml()
         self._update_active_label()
         ui.notify(f"Set '{fname}' as active scenario.", type="positive")
 
@@ -196,8 +191,9 @@ class ScenarioController:
                     (SCENARIOS_DIR / fname).rename(SCENARIOS_DIR / new_name)
                     if fname == self.active_file[0]:
                         self.active_file[0] = new_name
-                        settings.simulation.scenario_file = str(SCENARIOS_DIR / new_name)
-                        settings.save_to_yaml()
+                        with settings.batch():
+                            settings.simulation.scenario_file = str(SCENARIOS_DIR / new_name)
+                            settings.save_to_yaml()
                         self._update_active_label()
                     ui.notify(f"Renamed '{fname}' → '{new_name}'.", type="positive")
                     self._refresh_select()
@@ -341,7 +337,7 @@ class ScenarioController:
         self._refresh_chart(rows)
         ui.notify(f"Saved '{fname}'.", type="positive", position="top")
         if fname == self.active_file[0]:
-            engine.switch_scenario(str(SCENARIOS_DIR / fname))
+            submit_to_simulation(engine.switch_scenario, str(SCENARIOS_DIR / fname))
 
     def _open_edit_dialog(self, row: dict[str, Any], is_new: bool = False):
         row_id = row.get("_id")
@@ -25,7 +25,7 @@ def render():
             # 1.5 Wi-Fi Settings Card (New)
             with ui.card().classes('w-96 p-4'):
                 ui.label('Wi-Fi Settings').classes('text-lg font-bold mb-2')
-                ui.label('Requires Restart').classes('text-xs text-red-500 mb-2')
+                ui.label('Applied on Save (no restart needed)').classes('text-xs text-green-600 mb-2')
                 # Checkboxes for devices
                 wifi_devs = settings.echonet.wifi_devices
 
@@ -113,39 +113,41 @@ def render():
                                                step=10).classes('w-full')
 
         def save_settings():
-            settings.communication.b_route_id = id_input.value
-            settings.communication.b_route_password = pwd_input.value
+            # One change notification for the whole form (listeners see it complete)
+            with settings.batch():
+                settings.communication.b_route_id = id_input.value
+                settings.communication.b_route_password = pwd_input.value
             
-            # Save Wi-Fi Devices
-            new_wifi_devs = []
-            if chk_sm.value: new_wifi_devs.append('smart_meter')
-            if chk_solar.value: new_wifi_devs.append('solar')
-            if chk_battery.value: new_wifi_devs.append('battery')
-            if chk_wh.value: new_wifi_devs.append('water_heater')
-            if chk_v2h.value: new_wifi_devs.append('v2h')
-            if chk_ac.value: new_wifi_devs.append('air_conditioner')
-            settings.echonet.wifi_devices = new_wifi_devs
+                # Save Wi-Fi Devices
+                new_wifi_devs = []
+                if chk_sm.value: new_wifi_devs.append('smart_meter')
+                if chk_solar.value: new_wifi_devs.append('solar')
+                if chk_battery.value: new_wifi_devs.append('battery')
+                if chk_wh.value: new_wifi_devs.append('water_heater')
+                if chk_v2h.value: new_wifi_devs.append('v2h')
+                if chk_ac.value: new_wifi_devs.append('air_conditioner')
+                settings.echonet.wifi_devices = new_wifi_devs
             
-            settings.echonet.maker_code = maker_input.value
-            settings.echonet.node_profile_id = np_id_input.value
-            settings.echonet.solar_id = solar_id_input.value
-            settings.echonet.battery_id = bat_id_input.value
-            settings.echonet.battery_rated_capacity_wh = float(bat_cap_input.value or 0)
-            settings.echonet.battery_charge_power_w = float(bat_charge_input.value or 0)
-            settings.echonet.battery_discharge_power_w = float(bat_discharge_input.value or 0)
-            settings.echonet.water_heater_id = wh_id_input.value
-            settings.echonet.water_heater_tank_capacity = int(wh_cap_input.value or 0)
-            settings.echonet.water_heater_power_w = float(wh_power_input.value or 0)
-            settings.echonet.smart_meter_id = sm_id_input.value
-            settings.echonet.v2h_id = v2h_id_input.value
-            settings.echonet.v2h_battery_capacity_wh = float(v2h_cap_input.value or 0)
-            settings.echonet.v2h_charge_power_w = float(v2h_charge_input.value or 0)
-            settings.echonet.v2h_discharge_power_w = float(v2h_discharge_input.value or 0)
-            settings.echonet.ac_id = ac_id_input.value
-            settings.echonet.ac_power_w = float(ac_power_input.value or 0)
+                settings.echonet.maker_code = maker_input.value
+                settings.echonet.node_profile_id = np_id_input.value
+                settings.echonet.solar_id = solar_id_input.value
+                settings.echonet.battery_id = bat_id_input.value
+                settings.echonet.battery_rated_capacity_wh = float(bat_cap_input.value or 0)
+                settings.echonet.battery_charge_power_w = float(bat_charge_input.value or 0)
+                settings.echonet.battery_discharge_power_w = float(bat_discharge_input.value or 0)
+                settings.echonet.water_heater_id = wh_id_input.value
+                settings.echonet.water_heater_tank_capacity = int(wh_cap_input.value or 0)
+                settings.echonet.water_heater_power_w = float(wh_power_input.value or 0)
+                settings.echonet.smart_meter_id = sm_id_input.value
+                settings.echonet.v2h_id = v2h_id_input.value
+                settings.echonet.v2h_battery_capacity_wh = float(v2h_cap_input.value or 0)
+                settings.echonet.v2h_charge_power_w = float(v2h_charge_input.value or 0)
+                settings.echonet.v2h_discharge_power_w = float(v2h_discharge_input.value or 0)
+                settings.echonet.ac_id = ac_id_input.value
+                settings.echonet.ac_power_w = float(ac_power_input.value or 0)
 
-            settings.save_to_yaml()
-            ui.notify('Settings saved. Please restart the application.', type='positive')
+                settings.save_to_yaml()
+            ui.notify('Settings saved. Wi-Fi devices are applied now; B-route changes need a restart.', type='positive')
         
         def reset_settings():
             user_path = "config/user_settings.yaml"
@@ -0,0 +1,49 @@
+"""EchonetFrame エンコード性能のマイクロベンチマーク
+
+旧実装 (body += ... の連結) と、ヘッダーを struct.pack_into で書き込んだ
+単一の bytearray にプロパティを追記していく現行実装を比較する。
+
+    PYTHONPATH=. python tests/bench_echonet_frame.py
+"""
+import sys
+import os
+import struct
+import timeit
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.core.echonet import EchonetFrame, ESV_GET_RES
+
+def legacy_to_bytes(frame: EchonetFrame) -> bytes:
+    """ベースライン: 以前の to_bytes と同じ連結方式"""
+    header = struct.pack(">BBHBBB BBB BB",
+        frame.ehd1, frame.ehd2, frame.tid,
+        *frame.seoj, *frame.deoj,
+        frame.esv, len(frame.props)
+    )
+    body = b""
+    for epc, pdt in frame.props:
+        body += struct.pack("BB", epc, len(pdt)) + pdt
+    return header + body
+
+def make_frame(n_props: int) -> EchonetFrame:
+    # 蓄電池への多EPC GET 応答相当 (4バイト値中心)
+    frame = EchonetFrame()
+    frame.esv = ESV_GET_RES
+    frame.props = [(0x80 + i, struct.pack(">L", i * 1000)) for i in range(n_props)]
+    return frame
+
+def main():
+    number = 20000
+    print(f"{'EPCs':>5} {'legacy (us)':>12} {'to_bytes (us)':>14} {'speedup':>8}")
+    for n_props in (1, 5, 20, 40):
+        frame = make_frame(n_props)
+        assert legacy_to_bytes(frame) == frame.to_bytes()
+        t_legacy = min(timeit.repeat(lambda: legacy_to_bytes(frame), number=number, repeat=5))
+        t_new = min(timeit.repeat(lambda: frame.to_bytes(), number=number, repeat=5))
+        per = 1e6 / number
+        print(f"{n_props:>5} {t_legacy * per:>12.2f} {t_new * per:>14.2f} {t_legacy / t_new:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""FleetEngine (NumPy) の1ティックあたり処理時間の計測
+
+スカラーの SimulationEngine を K 台回した場合と比較する。
+
+    PYTHONPATH=. python tests/bench_fleet_engine.py
+"""
+import sys
+import os
+import time
+import logging
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.core.engine import SimulationEngine
+from src.core.fleet_engine import FleetEngine
+
+def per_tick(step, ticks: int) -> float:
+    start = time.perf_counter()
+    for _ in range(ticks):
+        step(1.0)
+    return (time.perf_counter() - start) / ticks
+
+def main():
+    logging.disable(logging.INFO)
+    template = SimulationEngine()
+    # 充放電・V2H放電・エアコン運転が混在する状態で計測
+    template.battery.is_charging = True
+    template.battery.instant_charge_power = 1000.0
+    template.v2h.vehicle_connected = True
+    template.v2h.operation_mode = 0x43
+
+    scalar = [SimulationEngine(template.scenario) for _ in range(1000)]
+    t_scalar = per_tick(lambda dt: [e.step(dt) for e in scalar], 5) / len(scalar)
+
+    print(f"{'homes':>7} {'ms/tick':>9} {'scalar est.':>12} {'speedup':>8}")
+    for homes in (1000, 10000, 100000):
+        fleet = FleetEngine(homes, template)
+        t = per_tick(fleet.step, 50)
+        print(f"{homes:>7} {t * 1e3:>9.2f} {t_scalar * homes * 1e3:>10.1f}ms {t_scalar * homes / t:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
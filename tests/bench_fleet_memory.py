@@ -0,0 +1,26 @@
+"""フリートモードのノードあたりメモリ使用量の計測
+
+    PYTHONPATH=. python tests/bench_fleet_memory.py [ノード数...]
+"""
+import sys
+import os
+import logging
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.config.settings import settings
+from src.services.fleet_service import measure_node_memory
+
+def main():
+    logging.disable(logging.INFO)
+    counts = [int(a) for a in sys.argv[1:]] or [10, 100]
+    print(f"devices: {settings.echonet.wifi_devices}")
+    print(f"{'nodes':>6} {'KiB/node':>9} {'total MiB':>10}")
+    for count in counts:
+        nodes, per_node = measure_node_memory(count)
+        assert len({n.address for n in nodes}) == count
+        print(f"{count:>6} {per_node / 1024:>9.1f} {per_node * count / 1024 / 1024:>10.2f}")
+
+if __name__ == "__main__":
+    main()
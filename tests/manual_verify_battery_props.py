@@ -9,6 +9,7 @@ sys.path.append(os.getcwd())
 from src.core.models import Battery
 from src.core.adapters import BatteryAdapter
 from src.core.engine import SimulationEngine
+from src.core.device_models import DEVICE_MODELS
 
 def run_test():
     print("=== Battery Property Verification ===")
@@ -64,7 +65,7 @@ def run_test():
     bat.instant_charge_power = 1000.0
     
     # Update for 3600 seconds
-    engine._update_battery(3600.0)
+    DEVICE_MODELS["battery"].update(engine, 3600.0)
     
     # Expected: 
     # Added 1000Wh
@@ -95,7 +96,7 @@ def run_test():
     bat.is_discharging = True
     bat.instant_discharge_power = 2000.0
     
-    engine._update_battery(1800.0) # 0.5h
+    DEVICE_MODELS["battery"].update(engine, 1800.0) # 0.5h
     
     # Expected:
     # Removed 1000Wh
@@ -0,0 +1,112 @@
+"""テーブル駆動アダプター (EPC テーブル / プロパティマップ) のテスト"""
+import sys
+import os
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.core.models import Battery, AirConditioner
+from src.core.adapters import BatteryAdapter, AirConditionerAdapter, NodeProfileAdapter
+from src.core.battery_consts import BATTERY_STATIC_PROPS
+
+passed = 0
+failed = 0
+
+def check(label, actual, expected):
+    global passed, failed
+    if actual == expected:
+        print(f"  [OK] {label}: {actual}")
+        passed += 1
+    else:
+        print(f"  [NG] {label}: got {actual}, expected {expected}")
+        failed += 1
+
+print("=== Adapter Table Tests ===")
+
+bat = BatteryAdapter(Battery(device_id="bat_test"))
+ac = AirConditionerAdapter(AirConditioner(device_id="ac_test"))
+node = NodeProfileAdapter([(0x02, 0x7D, 0x01)])
+
+# 1. 優先順位: 動的 > Settings(0x83/0x8A) > 静的
+check("Battery 0xD3 dynamic overrides static", bat.get_property(0xD3), b'\x00\x00\x00\x00')
+check("Battery 0x8A from settings", len(bat.get_property(0x8A)), 3)
+check("Battery 0x81 static", bat.get_property(0x81), BATTERY_STATIC_PROPS[0x81])
+check("Battery 0x9F user map kept", bat.get_property(0x9F), BATTERY_STATIC_PROPS[0x9F])
+check("Unknown EPC -> None", bat.get_property(0xF0), None)
+
+# 2. 静的マップが無い場合はテーブルから生成
+supported = node._get_supported_epcs()
+check("Node 0x9F map", node.get_property(0x9F), bytes([len(supported)] + supported))
+check("Node 0x9E map (no settable EPC)", node.get_property(0x9E), b'\x00')
+check("Node 0x9D map", node.get_property(0x9D), b'\x02\x80\x88')
+check("AC 0x9F covers dynamic EPCs", all(epc in ac._get_supported_epcs() for epc in (0x84, 0x85, 0xB3)), True)
+check("AC settable EPCs", ac._get_settable_epcs(), [0x80, 0x8F, 0xA0, 0xB0, 0xB3])
+
+# プロパティマップ・インスタンスリストはキャッシュされ、変更時のみ再生成
+check("Map cached (same object)", node.get_property(0x9F) is node.get_property(0x9F), True)
+check("Node 0xD6 initial", node.get_property(0xD6), b'\x01\x02\x7D\x01')
+node.set_instances([(0x02, 0x7D, 0x01), (0x01, 0x30, 0x01)])
+check("Node 0xD6 after set_instances", node.get_property(0xD6), b'\x02\x02\x7D\x01\x01\x30\x01')
+
+# 3. SET はテーブル経由で1回の辞書参照
+check("Battery SET 0xDA", bat.set_property(0xDA, b'\x42'), True)
+check("Battery 0xDA after SET", bat.get_property(0xDA), b'\x42')
+check("Battery SET read-only 0xE4", bat.set_property(0xE4, b'\x10'), False)
+check("AC SET 0xB0 invalid", ac.set_property(0xB0, b'\x50'), False)
+check("AC SET 0xB0 valid", ac.set_property(0xB0, b'\x42'), True)
+check("AC 0xB0 after SET", ac.get_property(0xB0), b'\x42')
+
+# 4. ティック毎のスナップショット
+print("\n=== Snapshot Tests ===")
+from src.core.engine import SimulationEngine
+eng = SimulationEngine()
+eng.use_scenario = False
+snap_bat = BatteryAdapter(eng.battery)
+eng.register_snapshot_source(snap_bat)
+eng.battery.soc = 40.0
+eng.update_simulation()
+check("0xE4 after tick", snap_bat.get_property(0xE4), b'\x28')
+eng.battery.soc = 60.0
+check("0xE4 unchanged within tick", snap_bat.get_property(0xE4), b'\x28')
+check("0xA3 and 0xE2 consistent", snap_bat.get_property(0xA3), snap_bat.get_property(0xE2))
+eng.update_simulation()
+check("0xE4 after next tick", snap_bat.get_property(0xE4), b'\x3C')
+snap_bat.set_property(0xDA, b'\x43')
+check("SET read-back from snapshot", snap_bat.get_property(0xDA), b'\x43')
+check("Snapshot is read-only", hasattr(snap_bat.published[1], '__setitem__'), False)
+
+# 5. Settings 由来の値は事前エンコードされ、変更時のみ再計算
+print("\n=== Settings Binding Tests ===")
+from src.config.settings import settings
+from src.config.bindings import settings_binding
+orig_maker, orig_id = settings.echonet.maker_code, settings.echonet.battery_id
+check("0x8A cached bytes", bat.get_property(0x8A) is bat.get_property(0x8A), True)
+settings.echonet.maker_code = "00000B"
+check("Assignment refreshes binding", settings_binding.maker_code, b'\x00\x00\x0B')
+check("0x8A follows settings", bat.get_property(0x8A), b'\x00\x00\x0B')
+settings.echonet.battery_id = "FE" + "11" * 16
+check("0x83 follows settings", bat.get_property(0x83), bytes.fromhex("FE" + "11" * 16))
+settings.echonet.battery_id = "zz"
+check("Invalid ID -> default", bat.get_property(0x83), b'\xFE' + b'\x00' * 16)
+gen = snap_bat.snapshot_generation
+snap_bat.publish_snapshot()
+check("Settings change bumps snapshot generation", snap_bat.snapshot_generation, gen + 1)
+check("Snapshot 0x8A updated", snap_bat.get_property(0x8A), b'\x00\x00\x0B')
+settings.echonet.maker_code, settings.echonet.battery_id = orig_maker, orig_id
+
+# 保存ボタン相当: batch() 内の複数代入は 1 回だけ通知
+from src.config.settings import add_change_listener, _change_listeners
+calls = []
+add_change_listener(lambda: calls.append(1))
+with settings.batch():
+    settings.echonet.maker_code = "00000C"
+    settings.echonet.battery_id = orig_id
+    check("Batch defers notification", len(calls), 0)
+check("Batch notifies once", len(calls), 1)
+check("Binding refreshed after batch", settings_binding.maker_code, b'\x00\x00\x0C')
+settings.echonet.maker_code = orig_maker
+check("Assignment outside batch notifies", len(calls), 2)
+_change_listeners.pop()
+
+print(f"\n=== Result: {passed} passed, {failed} failed ===")
+sys.exit(0 if failed == 0 else 1)
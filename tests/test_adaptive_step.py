@@ -0,0 +1,121 @@
+"""イベント駆動の可変ステップ (SimulationEngine.advance) のテスト"""
+import sys
+import os
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.core.clock import SimulationClock
+from src.core.engine import SimulationEngine
+from src.core.scenario import CompiledScenario
+
+passed = 0
+failed = 0
+
+def check(label, actual, expected):
+    global passed, failed
+    if actual == expected:
+        print(f"  [OK] {label}: {actual}")
+        passed += 1
+    else:
+        print(f"  [NG] {label}: got {actual}, expected {expected}")
+        failed += 1
+
+POINTS = [(h * 3600, 300.0 + 50.0 * h, max(0.0, 3000.0 - 400.0 * abs(h - 12))) for h in range(24)]
+
+def make_engine():
+    clock = SimulationClock(start_time_of_day=0.0, real_time=lambda: 0.0)
+    eng = SimulationEngine(CompiledScenario(POINTS), clock)
+    # 蓄電池: 3000W 充電 (50% -> 100% まで 6000 秒)
+    bat = eng.battery
+    bat.rated_capacity_wh = 10000.0
+    bat.soc = 50.0
+    bat.is_charging = True
+    bat.instant_charge_power = 3000.0
+    # 給湯器: 手動沸き上げ (200L -> 370L まで 10200 秒)
+    wh = eng.water_heater
+    wh.tank_capacity = 370
+    wh.remaining_hot_water = 200.0
+    wh.auto_setting = 0x42
+    # V2H: 6000W 充電 (45000 -> 50000Wh まで 3000 秒)
+    v2h = eng.v2h
+    v2h.vehicle_connected = True
+    v2h.operation_mode = 0x42
+    v2h.battery_capacity_wh = 50000.0
+    v2h.remaining_capacity_wh = 45000.0
+    v2h.charge_power_w = 6000.0
+    return eng
+
+def run_fixed(eng, seconds):
+    for _ in range(seconds):
+        eng.clock.advance(1.0)
+        eng.step(1.0)
+
+def run_adaptive(eng, seconds, chunk=3600):
+    steps = 0
+    for _ in range(seconds // chunk):
+        eng.clock.advance(chunk)
+        steps += eng.advance(chunk)
+    return steps
+
+print("=== 境界での状態遷移 ===")
+eng = make_engine()
+eng.clock.advance(3000.0)
+check("steps to V2H full", eng.advance(3000.0, max_step=86400.0) <= 2, True)
+check("V2H exactly full", eng.v2h.remaining_capacity_wh, 50000.0)
+check("V2H charged exactly 5000Wh", eng.v2h.cumulative_charge_wh, 5000.0)
+eng.clock.advance(3000.0)
+eng.advance(3000.0, max_step=86400.0)
+check("V2H standby after full", eng.v2h.operation_mode, 0x44)
+check("battery exactly full at 6000s", eng.battery.soc, 100.0)
+check("battery charged exactly 5000Wh", round(eng.battery.cumulative_charge_wh, 9), 5000.0)
+eng.clock.advance(4200.0)
+eng.advance(4200.0, max_step=86400.0)
+check("battery stopped charging", eng.battery.is_charging, False)
+check("water heater full, back to auto", (eng.water_heater.remaining_hot_water, eng.water_heater.auto_setting), (370.0, 0x41))
+
+print("=== 固定1秒ステップとの比較 (1日) ===")
+fixed = make_engine()
+run_fixed(fixed, 86400)
+adaptive = make_engine()
+steps = run_adaptive(adaptive, 86400)
+check("steps per day < 300", steps < 300, True)
+check("battery state", (adaptive.battery.soc, adaptive.battery.is_charging), (fixed.battery.soc, fixed.battery.is_charging))
+check("battery charge Wh", round(adaptive.battery.cumulative_charge_wh, 6), round(fixed.battery.cumulative_charge_wh, 6))
+# 固定ステップは満充電・満水のティックで最大1ティック分ずれるため、解析値と比較する
+check("V2H charge Wh (exact)", round(adaptive.v2h.cumulative_charge_wh, 6), 5000.0)
+check("V2H charge Wh (fixed within 1 tick)", abs(fixed.v2h.cumulative_charge_wh - 5000.0) <= 6000.0 / 3600.0 + 1e-6, True)
+check("V2H mode", adaptive.v2h.operation_mode, fixed.v2h.operation_mode)
+# 10200 秒で満水 -> 残り 76200 秒は 10/時間で減少
+check("water heater (exact)", (round(adaptive.water_heater.remaining_hot_water, 6), adaptive.water_heater.auto_setting),
+      (round(370.0 - 76200 / 360.0, 6), 0x41))
+check("water heater (fixed within 1 tick)", abs(fixed.water_heater.remaining_hot_water - adaptive.water_heater.remaining_hot_water) <= 1 / 60.0, True)
+check("scenario load at end of day", round(adaptive.current_load_w, 6), round(fixed.current_load_w, 6))
+
+print("=== V2H 放電: 区間内で負荷が増える場合 ===")
+RISING = [(0, 300.0, 0.0), (7200, 3000.0, 0.0), (86399, 3000.0, 0.0)]
+
+def make_discharging():
+    clock = SimulationClock(start_time_of_day=0.0, real_time=lambda: 0.0)
+    eng = SimulationEngine(CompiledScenario(RISING), clock, ["v2h"])
+    v2h = eng.v2h
+    v2h.vehicle_connected = True
+    v2h.operation_mode = 0x43
+    v2h.battery_capacity_wh = 10000.0
+    v2h.remaining_capacity_wh = 500.0
+    v2h.discharge_power_w = 3000.0
+    return eng
+
+fixed = make_discharging()
+run_fixed(fixed, 7200)
+adaptive = make_discharging()
+run_adaptive(adaptive, 7200)
+check("adaptive discharges exactly the capacity", round(adaptive.v2h.cumulative_discharge_wh, 6), 500.0)
+check("fixed 1 s within 1 tick", abs(fixed.v2h.cumulative_discharge_wh - 500.0) <= 3000.0 / 3600.0, True)
+check("empty -> standby", (adaptive.v2h.remaining_capacity_wh, adaptive.v2h.operation_mode), (0.0, 0x44))
+check("grid buy matches 1 s stepping",
+      abs(adaptive.smart_meter.cumulative_power_buy_kwh - fixed.smart_meter.cumulative_power_buy_kwh) <= 3000.0 / 3600.0 / 1000.0,
+      True)
+
+print(f"\n=== Result: {passed} passed, {failed} failed ===")
+sys.exit(0 if failed == 0 else 1)
@@ -0,0 +1,76 @@
+"""バッチ実行 (src/batch.py run) の固定ステップ・可変ステップの一致テスト"""
+import sys
+import os
+import tempfile
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.config.settings import settings
+from src import batch
+
+passed = 0
+failed = 0
+
+def check(label, actual, expected):
+    global passed, failed
+    if actual == expected:
+        print(f"  [OK] {label}: {actual}")
+        passed += 1
+    else:
+        print(f"  [NG] {label}: got {actual}, expected {expected}")
+        failed += 1
+
+class Rows(list):
+    """csv.writer stand-in: keeps the rows"""
+    writerow = list.append
+
+SCENARIO = "data/scenarios/default_scenario.csv"
+DAY = 86400.0
+# 積算値の比較許容差 (kWh / Wh)
+TOL_KWH = 0.01
+TOL_WH = 10.0
+
+settings.stochastic.seed = None
+DEVICES = [d for d in settings.echonet.wifi_devices if d in batch.DEVICE_MODELS]
+
+def replay(step, adaptive):
+    rows = Rows()
+    engine = batch.build_engine(SCENARIO, 0.0, DEVICES)
+    result = batch.run(engine, DAY, step, 60.0, rows, adaptive, settings.simulation.max_step_sec)
+    return result, dict(zip(batch.COLUMNS, rows[-1]))
+
+print("=== Batch Replay Tests ===")
+runs = {
+    "fixed 10s": replay(10.0, False),
+    "fixed 60s": replay(60.0, False),
+    "adaptive": replay(1.0, True),
+}
+ref_result, ref = runs["fixed 10s"]
+check("fixed 10s rows / steps", ref_result, (1441, 8640))
+check("adaptive rows", runs["adaptive"][0][0], 1441)
+check("adaptive uses fewer steps", runs["adaptive"][0][1] < ref_result[1], True)
+check("day has purchases", ref["buy_kwh"] > 1.0, True)
+check("day has sales", ref["sell_kwh"] > 1.0, True)
+for name in ("fixed 60s", "adaptive"):
+    last = runs[name][1]
+    check(f"{name} reaches end of day", last["elapsed_sec"], DAY)
+    for col in ("buy_kwh", "sell_kwh", "solar_kwh"):
+        check(f"{name} {col} matches fixed 10s", abs(last[col] - ref[col]) < TOL_KWH, True)
+    for col in ("battery_charge_wh", "battery_discharge_wh", "v2h_charge_wh", "v2h_discharge_wh"):
+        check(f"{name} {col} matches fixed 10s", abs(last[col] - ref[col]) < TOL_WH, True)
+
+# --devices に smart_meter (モデルではない) を含めても実行できる
+print("\n=== Batch CLI Tests ===")
+with tempfile.TemporaryDirectory() as tmp:
+    out = os.path.join(tmp, "batch.csv")
+    code = batch.main(["--scenario", SCENARIO, "--days", "0.01", "--adaptive",
+                       "--devices", "smart_meter,solar,battery", "-o", out])
+    check("main exit code", code, 0)
+    with open(out) as f:
+        lines = f.read().splitlines()
+check("CSV header", lines[0].split(","), batch.COLUMNS)
+check("CSV rows", len(lines), 1 + 15)
+
+print(f"\n=== Result: {passed} passed, {failed} failed ===")
+sys.exit(1 if failed else 0)
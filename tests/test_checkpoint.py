@@ -0,0 +1,113 @@
+"""デバイス状態のバイナリチェックポイント (保存・復元・破損検出) のテスト"""
+import sys
+import os
+import tempfile
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.core import checkpoint
+from src.core.clock import SimulationClock
+from src.core.engine import SimulationEngine
+from src.core.scenario import CompiledScenario
+
+passed = 0
+failed = 0
+
+def check(label, actual, expected):
+    global passed, failed
+    if actual == expected:
+        print(f"  [OK] {label}: {actual}")
+        passed += 1
+    else:
+        print(f"  [NG] {label}: got {actual}, expected {expected}")
+        failed += 1
+
+def rejected(label, data, engine):
+    try:
+        checkpoint.restore(engine, data)
+        check(label, "accepted", "rejected")
+    except ValueError:
+        check(label, "rejected", "rejected")
+
+def make_engine():
+    scenario = CompiledScenario([(0, 800.0, 0.0), (43200, 300.0, 3000.0)])
+    return SimulationEngine(scenario, SimulationClock(real_time=lambda: 0.0))
+
+print("=== 保存 → 復元 ===")
+src = make_engine()
+src.battery.is_charging = True
+src.battery.instant_charge_power = 1500.0
+src.v2h.vehicle_connected = True
+src.v2h.operation_mode = 0x43
+src.water_heater.auto_setting = 0x42
+src.air_conditioner.temperature_setting = 26
+for _ in range(600):
+    src.step(10.0)
+data = checkpoint.encode(src)
+
+dst = make_engine()
+saved_at = checkpoint.restore(dst, data)
+check("saved_at returned", saved_at > 0, True)
+check("SOC", dst.battery.soc, src.battery.soc)
+check("battery charging (SET state)", (dst.battery.is_charging, dst.battery.instant_charge_power), (True, 1500.0))
+check("hot water", dst.water_heater.remaining_hot_water, src.water_heater.remaining_hot_water)
+check("V2H remaining / mode", (dst.v2h.remaining_capacity_wh, dst.v2h.operation_mode),
+      (src.v2h.remaining_capacity_wh, 0x43))
+check("meter counters (0xE0/0xE3)",
+      (dst.smart_meter.cumulative_power_buy_kwh, dst.smart_meter.cumulative_power_sell_kwh),
+      (src.smart_meter.cumulative_power_buy_kwh, src.smart_meter.cumulative_power_sell_kwh))
+check("battery counters (0xA8/0xA9)",
+      (dst.battery.cumulative_charge_wh, dst.battery.cumulative_discharge_wh),
+      (src.battery.cumulative_charge_wh, src.battery.cumulative_discharge_wh))
+check("V2H counters (0xD6/0xD8)", dst.v2h.cumulative_discharge_wh, src.v2h.cumulative_discharge_wh)
+check("aircon counter (0x85) / setting",
+      (dst.air_conditioner.cumulative_power_wh, dst.air_conditioner.temperature_setting),
+      (src.air_conditioner.cumulative_power_wh, 26))
+check("solar counter", dst.solar.cumulative_generation_kwh, src.solar.cumulative_generation_kwh)
+check("compact (< 1 KiB)", len(data) < 1024, True)
+
+print("=== 原子的な書き込み ===")
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "state", "checkpoint.bin")
+    check("missing file", checkpoint.load([make_engine()], path), None)
+    checkpoint.write_atomic(path, data)
+    check("no temp file left", os.listdir(os.path.dirname(path)), ["checkpoint.bin"])
+    loaded = make_engine()
+    checkpoint.load([loaded], path)
+    check("load from file", loaded.battery.soc, src.battery.soc)
+
+print("=== 破損・不一致の検出 ===")
+untouched = make_engine()
+soc = untouched.battery.soc
+rejected("truncated", data[:-10], untouched)
+flipped = bytearray(data)
+flipped[40] ^= 0xFF
+rejected("bit flip (CRC)", bytes(flipped), untouched)
+rejected("not a checkpoint", b"\0" * 64, untouched)
+check("rejected checkpoint leaves state", untouched.battery.soc, soc)
+
+print("=== フリートノード ===")
+node = make_engine()
+node.battery.soc = 12.5
+node.smart_meter.cumulative_power_buy_kwh = 7.25
+fleet_data = checkpoint.encode_nodes([src, node])
+main, restored = make_engine(), make_engine()
+checkpoint.restore_nodes([main, restored], fleet_data)
+check("main engine first", main.battery.soc, src.battery.soc)
+check("node state restored", (restored.battery.soc, restored.smart_meter.cumulative_power_buy_kwh), (12.5, 7.25))
+added = make_engine()
+checkpoint.restore_nodes([make_engine(), make_engine(), added], fleet_data)
+check("added node keeps startup values", added.battery.soc, make_engine().battery.soc)
+fewer = make_engine()
+check("extra saved nodes dropped", (checkpoint.restore_nodes([fewer], fleet_data) > 0, fewer.battery.soc),
+      (True, src.battery.soc))
+single = make_engine()
+checkpoint.restore_nodes([make_engine(), single], data)
+check("single-engine file restores main only", single.battery.soc, make_engine().battery.soc)
+rejected("corrupt node rejects whole file", fleet_data[:-3] + bytes([fleet_data[-3] ^ 0xFF]) + fleet_data[-2:], untouched)
+rejected("trailing garbage", data + b"\0" * 8, untouched)
+check("rejected node file leaves state", untouched.battery.soc, soc)
+
+print(f"\n=== Result: {passed} passed, {failed} failed ===")
+sys.exit(0 if failed == 0 else 1)
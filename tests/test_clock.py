@@ -0,0 +1,96 @@
+"""SimulationClock (速度倍率・一時停止・シーク) とエンジン連携のテスト"""
+import sys
+import os
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.core.clock import SimulationClock, parse_time_of_day, format_time_of_day
+from src.core.engine import SimulationEngine
+from src.core.scenario import CompiledScenario
+
+passed = 0
+failed = 0
+
+def check(label, actual, expected):
+    global passed, failed
+    if actual == expected:
+        print(f"  [OK] {label}: {actual}")
+        passed += 1
+    else:
+        print(f"  [NG] {label}: got {actual}, expected {expected}")
+        failed += 1
+
+class FakeRealTime:
+    """手動で進める実時間ソース"""
+    def __init__(self):
+        self.t = 1000.0
+    def __call__(self):
+        return self.t
+
+print("=== 時刻文字列 ===")
+check("parse 06:30", parse_time_of_day("06:30"), 23400.0)
+check("parse 23:59:59", parse_time_of_day("23:59:59"), 86399.0)
+check("format", format_time_of_day(23400.5), "06:30:00")
+try:
+    parse_time_of_day("25:00")
+    check("parse 25:00 rejected", False, True)
+except ValueError:
+    check("parse 25:00 rejected", True, True)
+
+print("=== 速度倍率 ===")
+rt = FakeRealTime()
+clock = SimulationClock(speed=60, start_time_of_day=parse_time_of_day("06:00"), real_time=rt)
+check("start time of day", clock.time_of_day(), 21600.0)
+start = clock.now()
+rt.t += 10
+check("60x: 10 s real = 600 s sim", clock.now() - start, 600.0)
+clock.set_speed(3600)
+rt.t += 1
+check("3600x after 60x", clock.now() - start, 4200.0)
+check("time of day 07:10", format_time_of_day(clock.time_of_day()), "07:10:00")
+
+print("=== 一時停止 / 再開 ===")
+clock.pause()
+frozen = clock.now()
+rt.t += 100
+check("paused clock does not advance", clock.now(), frozen)
+clock.resume()
+rt.t += 1
+check("resumed clock advances", clock.now() - frozen, 3600.0)
+
+print("=== シーク ===")
+clock.seek_time_of_day(parse_time_of_day("23:00"))
+check("seek to 23:00", format_time_of_day(clock.time_of_day()), "23:00:00")
+check("seek count", clock.seek_count, 1)
+rt.t += 2
+check("wraps past midnight", format_time_of_day(clock.time_of_day()), "01:00:00")
+
+print("=== エンジン連携 ===")
+rt = FakeRealTime()
+clock = SimulationClock(speed=3600, start_time_of_day=parse_time_of_day("12:00"), real_time=rt)
+scenario = CompiledScenario([(0, 100.0, 0.0), (43200, 1000.0, 2000.0)])
+eng = SimulationEngine(scenario, clock)
+eng.smart_meter.cumulative_power_buy_kwh = 0.0
+eng.smart_meter.cumulative_power_sell_kwh = 0.0
+rt.t += 1  # 1 s real = 1 h simulated
+eng.update_simulation()
+check("scenario follows sim clock (load)", round(eng.current_load_w, 3), round(1000.0 - 900.0 * 3600 / 43200, 3))
+# 3600倍の1ティック (1時間) と 1秒ティック x 3600 の積算値が一致する
+twin_rt = FakeRealTime()
+twin = SimulationEngine(scenario, SimulationClock(start_time_of_day=parse_time_of_day("12:00"), real_time=twin_rt))
+twin.smart_meter.cumulative_power_buy_kwh = 0.0
+twin.smart_meter.cumulative_power_sell_kwh = 0.0
+for _ in range(3600):
+    twin_rt.t += 1
+    twin.update_simulation()
+check("1 h integrated at 3600x", round(eng.smart_meter.cumulative_power_buy_kwh + eng.smart_meter.cumulative_power_sell_kwh, 6),
+      round(twin.smart_meter.cumulative_power_buy_kwh + twin.smart_meter.cumulative_power_sell_kwh, 6))
+before = (eng.smart_meter.cumulative_power_buy_kwh, eng.smart_meter.cumulative_power_sell_kwh)
+clock.seek_time_of_day(parse_time_of_day("18:00"))
+eng.update_simulation()
+check("no energy integrated across seek",
+      (eng.smart_meter.cumulative_power_buy_kwh, eng.smart_meter.cumulative_power_sell_kwh), before)
+
+print(f"\n=== Result: {passed} passed, {failed} failed ===")
+sys.exit(0 if failed == 0 else 1)
@@ -0,0 +1,110 @@
+"""デバイスモデルレジストリ (有効なモデルのみステップ) のテスト"""
+import sys
+import os
+import logging
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.core.engine import SimulationEngine
+from src.core.device_models import DEVICE_MODELS, DeviceModel, register_device_model, add_constant
+from pydantic import BaseModel
+
+passed = 0
+failed = 0
+
+def check(label, actual, expected):
+    global passed, failed
+    if actual == expected:
+        print(f"  [OK] {label}: {actual}")
+        passed += 1
+    else:
+        print(f"  [NG] {label}: got {actual}, expected {expected}")
+        failed += 1
+
+logging.disable(logging.INFO)
+
+def make_engine(enabled):
+    eng = SimulationEngine(enabled=enabled)
+    eng.use_scenario = False
+    eng.current_load_w = 1000.0
+    eng.solar.instant_generation_power = 400.0
+    eng.battery.is_charging = True
+    eng.battery.instant_charge_power = 200.0
+    eng.air_conditioner.operation_mode = 0x42
+    eng.water_heater.auto_setting = 0x42
+    return eng
+
+print("=== 有効なモデルのみステップ ===")
+check("registry order", list(DEVICE_MODELS), ["solar", "battery", "water_heater", "v2h", "air_conditioner"])
+eng = make_engine(["solar", "battery"])
+check("enabled models", eng.enabled_models, ["solar", "battery"])
+wh_before = eng.water_heater.remaining_hot_water
+eng.step(60.0)
+check("grid = load - solar + battery charge", eng.smart_meter.instant_current_power, 1000.0 - 400.0 + 200.0)
+check("disabled AC not stepped", eng.air_conditioner.cumulative_power_wh, 0.0)
+check("disabled water heater not stepped", eng.water_heater.remaining_hot_water, wh_before)
+check("battery stepped", round(eng.battery.cumulative_charge_wh, 9), round(200.0 * 60 / 3600, 9))
+
+full = make_engine(None)
+full.step(60.0)
+check("all models by default", full.enabled_models, list(DEVICE_MODELS))
+check("AC and heater add to grid", full.smart_meter.instant_current_power,
+      1000.0 - 400.0 + 200.0 + full.air_conditioner.instant_power_w + full.water_heater.heating_power_w)
+
+eng.set_enabled_models(["solar", "battery", "air_conditioner"])
+eng.step(60.0)
+check("enabled at runtime", eng.air_conditioner.cumulative_power_wh > 0, True)
+
+print("=== モデルの追加 ===")
+class HeatPump(BaseModel):
+    device_id: str
+    power_w: float = 0.0
+    cumulative_wh: float = 0.0
+
+class HeatPumpModel(DeviceModel):
+    key, attr, device_cls, id_prefix = "heat_pump", "heat_pumps", HeatPump, "hp"
+
+    def step(self, engine, dt, nodes, grid):
+        for hp in engine.heat_pumps:
+            hp.cumulative_wh += hp.power_w * dt / 3600.0
+        add_constant(grid, self.power(engine))
+
+    def power(self, engine):
+        return sum(hp.power_w for hp in engine.heat_pumps)
+
+class NoStepModel(DeviceModel):
+    key = "no_step"
+
+try:
+    NoStepModel()
+    check("step is abstract", False, True)
+except TypeError:
+    check("step is abstract", True, True)
+
+register_device_model(HeatPumpModel())
+try:
+    eng = make_engine(["solar", "heat_pump"])
+    check("instances built from registry", len(eng.heat_pumps), 1)
+    eng.heat_pumps[0].power_w = 700.0
+    eng.step(3600.0)
+    check("custom model in grid balance", eng.smart_meter.instant_current_power, 1000.0 - 400.0 + 700.0)
+    check("custom model stepped", eng.heat_pumps[0].cumulative_wh, 700.0)
+finally:
+    del DEVICE_MODELS["heat_pump"]
+
+# 設定変更でティック中に有効モデルが差し替わっても、そのティックは同じ一覧で進む
+eng = make_engine(None)
+battery_model = DEVICE_MODELS["battery"]
+battery_model.step = lambda engine, *args: (type(battery_model).step(battery_model, engine, *args),
+                                            engine.set_enabled_models(["solar"]))
+try:
+    eng.step(1.0)
+    check("models swapped mid-tick", eng.enabled_models, ["solar"])
+except ValueError as e:
+    check("models swapped mid-tick", str(e), None)
+finally:
+    del battery_model.step
+
+print(f"\n=== Result: {passed} passed, {failed} failed ===")
+sys.exit(0 if failed == 0 else 1)
@@ -0,0 +1,293 @@
+"""EchonetFrame / EchonetController のパケット処理テスト"""
+import sys
+import os
+import struct
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.core.echonet import (EchonetFrame, EchonetController, ESV_GET, ESV_GET_RES, ESV_SET_C, ESV_SET_RES,
+                              ESV_SETC_SNA, ESV_SETGET, ESV_SETGET_RES, ESV_SETGET_SNA, ESV_INF_REQ, ESV_INF, ESV_INF_SNA)
+
+passed = 0
+failed = 0
+
+def check(label, actual, expected):
+    global passed, failed
+    if actual == expected:
+        print(f"  [OK] {label}: {actual}")
+        passed += 1
+    else:
+        print(f"  [NG] {label}: got {actual}, expected {expected}")
+        failed += 1
+
+def build_frame(deoj, esv, props, tid=0x0001, seoj=(0x05, 0xFF, 0x01)):
+    header = struct.pack(">BBHBBBBBBBB", 0x10, 0x81, tid, *seoj, *deoj, esv, len(props))
+    body = b"".join(bytes([epc, len(pdt)]) + pdt for epc, pdt in props)
+    return header + body
+
+class DummyObject:
+    def __init__(self):
+        self.values = {0x80: b'\x30', 0xE0: b'\x01\x02'}
+
+    def get_property(self, epc):
+        return self.values.get(epc)
+
+    def set_property(self, epc, data):
+        if epc != 0x80:
+            return False
+        self.values[epc] = bytes(data)
+        return True
+
+print("=== EchonetFrame Tests ===")
+
+# 1. ヘッダーのみデコードし、プロパティは遅延評価
+data = build_frame((0x02, 0x79, 0x01), ESV_GET, [(0x80, b""), (0xE0, b"")], tid=0x1234)
+frame = EchonetFrame(data)
+check("TID", frame.tid, 0x1234)
+check("DEOJ", frame.deoj, (0x02, 0x79, 0x01))
+check("OPC", frame.opc, 2)
+check("props not decoded yet", frame._props, None)
+check("iter_props EPCs", [epc for epc, _ in frame.iter_props()], [0x80, 0xE0])
+check("props materialized", frame.props, [(0x80, b""), (0xE0, b"")])
+
+# 2. 不正フレーム
+for label, raw in [("short", b"\x10\x81\x00"), ("bad EHD", b"\x10\x82" + bytes(10))]:
+    try:
+        EchonetFrame(raw)
+        check(f"{label} raises", False, True)
+    except ValueError:
+        check(f"{label} raises", True, True)
+
+# 3. PDC がバッファを超える場合はそこで打ち切る
+truncated = build_frame((0x02, 0x79, 0x01), ESV_SET_C, [(0x80, b"\x30"), (0x81, b"\x01\x02")])[:-1]
+check("truncated props", EchonetFrame(truncated).props, [(0x80, b"\x30")])
+
+# 4. to_bytes 往復
+res = EchonetFrame()
+res.tid = 0x0042
+res.esv = ESV_GET_RES
+res.props = [(0x80, b"\x30"), (0xE0, b"\x01\x02")]
+check("to_bytes roundtrip", EchonetFrame(res.to_bytes()).props, res.props)
+
+print("\n=== EchonetController Tests ===")
+
+ctrl = EchonetController()
+obj = DummyObject()
+ctrl.register_instance(0x02, 0x79, 0x01, obj)
+
+# GET
+out = EchonetFrame(ctrl.handle_packet(data, ("127.0.0.1", 3610)))
+check("GET ESV", out.esv, ESV_GET_RES)
+check("GET SEOJ/DEOJ swapped", (out.seoj, out.deoj), ((0x02, 0x79, 0x01), (0x05, 0xFF, 0x01)))
+check("GET props", out.props, [(0x80, b"\x30"), (0xE0, b"\x01\x02")])
+
+# SET_C
+req = build_frame((0x02, 0x79, 0x01), ESV_SET_C, [(0x80, b"\x31")])
+out = EchonetFrame(ctrl.handle_packet(req, ("127.0.0.1", 3610)))
+check("SET_C ESV", out.esv, ESV_SET_RES)
+check("SET_C applied", obj.values[0x80], b"\x31")
+check("SET_C value is bytes", type(obj.values[0x80]), bytes)
+
+# SET_C SNA は拒否された EDT をそのまま返す
+req = build_frame((0x02, 0x79, 0x01), ESV_SET_C, [(0x80, b"\x30"), (0xE0, b"\x05")])
+out = EchonetFrame(ctrl.handle_packet(req, ("127.0.0.1", 3610)))
+check("SET_C SNA ESV", out.esv, ESV_SETC_SNA)
+check("SET_C SNA echoes rejected EDT", out.props, [(0x80, b""), (0xE0, b"\x05")])
+
+# SetGet: 書き込みと読み出しを1往復で
+def build_setget(deoj, set_props, get_epcs, tid=0x0001):
+    frame = build_frame(deoj, ESV_SETGET, set_props, tid=tid)
+    return frame + bytes([len(get_epcs)]) + b"".join(bytes([epc, 0]) for epc in get_epcs)
+
+req = build_setget((0x02, 0x79, 0x01), [(0x80, b"\x31")], [0x80, 0xE0])
+parsed = EchonetFrame(req)
+check("SetGet OPCGet parsed", [epc for epc, _ in parsed.iter_get_props()], [0x80, 0xE0])
+out = EchonetFrame(ctrl.handle_packet(req, ("127.0.0.1", 3610)))
+check("SetGet ESV", out.esv, ESV_SETGET_RES)
+check("SetGet set section", out.props, [(0x80, b"")])
+check("SetGet get section reads back", out.get_props, [(0x80, b"\x31"), (0xE0, b"\x01\x02")])
+
+req = build_setget((0x02, 0x79, 0x01), [(0xE0, b"\x05")], [0x81])
+out = EchonetFrame(ctrl.handle_packet(req, ("127.0.0.1", 3610)))
+check("SetGet SNA ESV", out.esv, ESV_SETGET_SNA)
+check("SetGet SNA sections", (out.props, out.get_props), ([(0xE0, b"\x05")], [(0x81, b"")]))
+check("SetGet truncated OPCGet", list(EchonetFrame(build_frame((0x02, 0x79, 0x01), ESV_SETGET, [(0x80, b"\x31")])).iter_get_props()), [])
+
+# INF_REQ は INF で応答
+req = build_frame((0x02, 0x79, 0x01), ESV_INF_REQ, [(0x80, b"")])
+out = EchonetFrame(ctrl.handle_packet(req, ("127.0.0.1", 3610)))
+check("INF_REQ -> INF", (out.esv, out.props), (ESV_INF, [(0x80, b"\x31")]))
+req = build_frame((0x02, 0x79, 0x01), ESV_INF_REQ, [(0x81, b"")])
+check("INF_REQ unknown EPC -> INF_SNA", EchonetFrame(ctrl.handle_packet(req, ("127.0.0.1", 3610))).esv, ESV_INF_SNA)
+
+# 未登録オブジェクト宛は応答しない
+req = build_frame((0x02, 0x7D, 0x01), ESV_GET, [(0x80, b"")])
+check("unknown DEOJ -> None", ctrl.handle_packet(req, ("127.0.0.1", 3610)), None)
+
+# インスタンス 0x00 (ワイルドカード) は同クラスの全インスタンスに展開
+ctrl.register_instance(0x02, 0x79, 0x02, DummyObject())
+req = build_frame((0x02, 0x79, 0x00), ESV_GET, [(0x80, b"")])
+outs = [EchonetFrame(r) for r in ctrl.handle_packet_all(req, ("127.0.0.1", 3610))]
+check("wildcard fan-out SEOJs", [o.seoj for o in outs], [(0x02, 0x79, 0x01), (0x02, 0x79, 0x02)])
+check("wildcard keeps TID", [o.tid for o in outs], [0x0001, 0x0001])
+check("wildcard unknown class", ctrl.handle_packet_all(build_frame((0x02, 0x7D, 0x00), ESV_GET, [(0x80, b"")]), None), [])
+check("exact instance via handle_packet_all", len(ctrl.handle_packet_all(data, None)), 1)
+
+# 不正・対象外フレームは生バイト列のまま破棄し、理由別に数える
+ctrl.rejects.clear()
+for raw in (b"\x10\x81\x00",
+            b"\x10\x82" + bytes(10),
+            build_frame((0x02, 0x79, 0x01), ESV_GET_RES, [(0x80, b"\x30")]),
+            build_frame((0x02, 0x88, 0x01), ESV_GET, [(0x80, b"")])):
+    check("reject -> None", ctrl.handle_packet(raw, ("127.0.0.1", 3610)), None)
+check("reject counters", ctrl.reject_stats(),
+      {"too_short": 1, "invalid_ehd": 1, "not_request": 1, "unknown_deoj": 1})
+
+# ワイルドカード宛の不正フレームは展開前に 1 回だけ検査・計数
+ctrl.rejects.clear()
+bad_ehd = b"\x10\x82" + build_frame((0x02, 0x79, 0x00), ESV_GET, [(0x80, b"")])[2:]
+check("wildcard bad EHD -> []", ctrl.handle_packet_all(bad_ehd, None), [])
+check("wildcard response -> []", ctrl.handle_packet_all(build_frame((0x02, 0x79, 0x00), ESV_GET_RES, [(0x80, b"\x30")]), None), [])
+check("wildcard rejects counted once", ctrl.reject_stats(), {"invalid_ehd": 1, "not_request": 1})
+
+print("\n=== GET Response Cache Tests ===")
+from src.core.models import Battery
+from src.core.adapters import BatteryAdapter
+
+ctrl = EchonetController(cache_size=2)
+bat = Battery(device_id="bat_cache")
+adapter = BatteryAdapter(bat)
+ctrl.register_instance(0x02, 0x7D, 0x01, adapter)
+get_req = build_frame((0x02, 0x7D, 0x01), ESV_GET, [(0xE4, b""), (0xD3, b"")], tid=0x0001)
+
+# スナップショット未発行のオブジェクトはキャッシュしない
+ctrl.handle_packet(get_req, ("127.0.0.1", 3610))
+check("no snapshot -> not cached", ctrl.cache_stats()["entries"], 0)
+
+adapter.publish_snapshot()
+first = ctrl.handle_packet(get_req, ("127.0.0.1", 3610))
+req2 = build_frame((0x02, 0x7D, 0x01), ESV_GET, [(0xE4, b""), (0xD3, b"")], tid=0x0002, seoj=(0x05, 0xFF, 0x02))
+second = ctrl.handle_packet(req2, ("127.0.0.1", 3610))
+check("cache hit counted", (ctrl.cache_hits, ctrl.cache_misses), (1, 1))
+out = EchonetFrame(second)
+check("hit patches TID", out.tid, 0x0002)
+check("hit swaps SEOJ/DEOJ", (out.seoj, out.deoj), ((0x02, 0x7D, 0x01), (0x05, 0xFF, 0x02)))
+check("hit body matches", second[10:], first[10:])
+
+# 状態が変化したらスナップショット世代が進み、キャッシュは使われない
+bat.soc = 80.0
+adapter.publish_snapshot()
+out = EchonetFrame(ctrl.handle_packet(get_req, ("127.0.0.1", 3610)))
+check("new generation -> fresh SOC", out.props[0], (0xE4, b'\x50'))
+
+# 変化がなければ世代は据え置き
+gen = adapter.snapshot_generation
+adapter.publish_snapshot()
+check("unchanged snapshot keeps generation", adapter.snapshot_generation, gen)
+
+# LRU 上限
+for epc in (0x80, 0x81, 0x82):
+    ctrl.handle_packet(build_frame((0x02, 0x7D, 0x01), ESV_GET, [(epc, b"")]), ("127.0.0.1", 3610))
+check("LRU bounded", ctrl.cache_stats()["entries"], 2)
+
+# 1 リクエスト = 1 スナップショット: 途中でティックが発行しても混ざらない
+class TickingAdapter(BatteryAdapter):
+    def get_property(self, epc, snapshot=None):
+        if epc == 0xE4:
+            self.device.soc = 20.0
+            self.publish_snapshot()
+        return super().get_property(epc, snapshot)
+
+bat2 = Battery(device_id="bat_tick")
+bat2.soc = 50.0
+ticking = TickingAdapter(bat2)
+ticking.publish_snapshot()
+ctrl = EchonetController()
+ctrl.register_instance(0x02, 0x7D, 0x01, ticking)
+gen = ticking.snapshot_generation
+out = EchonetFrame(ctrl.handle_packet(build_frame((0x02, 0x7D, 0x01), ESV_GET, [(0xE4, b""), (0xE4, b"")]),
+                                      ("127.0.0.1", 3610)))
+check("one snapshot per GET", [edt for _, edt in out.props], [b'\x32', b'\x32'])
+check("cached under the generation read", list(ctrl._response_cache)[0][1], gen)
+
+print("\n=== Discovery Jitter Tests ===")
+import asyncio
+import socket
+from src.config.settings import settings
+from src.services.echonet_service import EchonetProtocol, PktInfoEndpoint, IP_PKTINFO, _is_discovery
+
+np_get = build_frame((0x0E, 0xF0, 0x01), ESV_GET, [(0x80, b"")])
+check("unicast Node Profile GET is not discovery", _is_discovery(np_get, False), False)
+check("multicast request is discovery", _is_discovery(np_get, True), True)
+check("wildcard instance is discovery", _is_discovery(build_frame((0x02, 0x79, 0x00), ESV_GET, [(0x80, b"")]), False), True)
+
+class RecordingProtocol(EchonetProtocol):
+    def datagram_received(self, data, addr, dst=None):
+        self.dst = dst
+        super().datagram_received(data, addr, dst)
+
+async def unicast_round_trip():
+    ctrl = EchonetController()
+    ctrl.register_instance(0x0E, 0xF0, 0x01, DummyObject())
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    proto = RecordingProtocol(ctrl, quiet=True)
+    endpoint = PktInfoEndpoint(sock, proto)
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    client.settimeout(0)
+    client.sendto(np_get, sock.getsockname())
+    for _ in range(100):
+        await asyncio.sleep(0)
+        try:
+            # Unicast: answered in the same callback, no jitter delay
+            res = client.recv(1024)
+            break
+        except BlockingIOError:
+            pass
+    else:
+        res = None
+    endpoint.close()
+    client.close()
+    return proto.dst, res
+
+if IP_PKTINFO is not None:
+    settings.communication.multicast_response_jitter_sec = 5.0
+    dst, res = asyncio.run(unicast_round_trip())
+    check("destination from IP_PKTINFO", socket.inet_ntoa(dst), "127.0.0.1")
+    check("unicast answered without jitter", res is not None and EchonetFrame(res).esv == ESV_GET_RES, True)
+    settings.communication.multicast_response_jitter_sec = 0.2
+
+print("\n=== Write Dispatch Tests ===")
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+async def dispatch_round_trip():
+    executor = ThreadPoolExecutor(max_workers=1)
+    ctrl = EchonetController()
+    obj = DummyObject()
+    ctrl.register_instance(0x0E, 0xF0, 0x01, obj)
+    ctrl.write_executor = lambda: executor
+    tick = threading.Event()
+    executor.submit(tick.wait)  # a running tick
+    replies = []
+    ctrl.dispatch(build_frame((0x0E, 0xF0, 0x01), ESV_SET_C, [(0x80, b"\x31")]), None,
+                  lambda r: replies.append(("set", threading.current_thread(), r)))
+    ctrl.dispatch(np_get, None, lambda r: replies.append(("get", threading.current_thread(), r)))
+    early = [kind for kind, _, _ in replies]
+    tick.set()
+    for _ in range(200):
+        if len(replies) == 2:
+            break
+        await asyncio.sleep(0.01)
+    executor.shutdown()
+    return early, replies, obj.values[0x80]
+
+early, replies, value = asyncio.run(dispatch_round_trip())
+check("GET answered while the tick runs", early, ["get"])
+check("SET answered after the tick", [kind for kind, _, _ in replies], ["get", "set"])
+check("replies on the event loop", all(t is threading.main_thread() for _, t, _ in replies), True)
+check("SET applied", value, b"\x31")
+
+print(f"\n=== Result: {passed} passed, {failed} failed ===")
+sys.exit(0 if failed == 0 else 1)
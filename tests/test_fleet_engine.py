@@ -0,0 +1,142 @@
+"""FleetEngine (NumPy) が SimulationEngine (スカラー) と同じ結果になることのテスト"""
+import sys
+import os
+import random
+import logging
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+import numpy as np
+from src.core.engine import SimulationEngine
+from src.core.fleet_engine import FleetEngine
+
+passed = 0
+failed = 0
+
+def check(label, actual, expected):
+    global passed, failed
+    if actual == expected:
+        print(f"  [OK] {label}: {actual}")
+        passed += 1
+    else:
+        print(f"  [NG] {label}: got {actual}, expected {expected}")
+        failed += 1
+
+logging.disable(logging.INFO)
+print("=== FleetEngine vs SimulationEngine ===")
+
+K = 24
+rng = random.Random(1)
+template = SimulationEngine()
+fleet = FleetEngine(K, template)
+fleet.use_scenario = False
+homes = []
+for i in range(K):
+    eng = SimulationEngine(template.scenario)
+    eng.use_scenario = False
+    eng.current_load_w = rng.choice([200.0, 800.0, 3000.0])
+    eng.solar.instant_generation_power = rng.choice([-10.0, 0.0, 1500.0, 4000.0])
+    bat = eng.battery
+    bat.soc = rng.choice([0.0, 0.05, 50.0, 99.99, 100.0])
+    bat.is_charging = rng.random() < 0.4
+    bat.is_discharging = not bat.is_charging and rng.random() < 0.5
+    bat.instant_charge_power = 2000.0
+    bat.instant_discharge_power = 1500.0
+    wh = eng.water_heater
+    wh.auto_setting = rng.choice([0x41, 0x42, 0x43])
+    wh.remaining_hot_water = rng.choice([0.0, 100.0, wh.tank_capacity - 0.01])
+    wh.is_running = rng.random() < 0.9
+    v2h = eng.v2h
+    v2h.vehicle_connected = rng.random() < 0.8
+    v2h.operation_mode = rng.choice([0x42, 0x43, 0x44, 0x47])
+    v2h.remaining_capacity_wh = rng.choice([0.1, 25000.0, v2h.battery_capacity_wh - 0.1])
+    ac = eng.air_conditioner
+    ac.operation_mode = rng.choice([0x40, 0x41, 0x42, 0x45, 0x46])
+    ac.is_running = rng.random() < 0.7
+    homes.append(eng)
+
+    # Copy the same initial state into column i
+    fleet.current_load_w[i] = eng.current_load_w
+    fleet.solar_w[i] = eng.solar.instant_generation_power
+    fleet.bat_soc[i] = bat.soc
+    fleet.bat_is_charging[i] = bat.is_charging
+    fleet.bat_is_discharging[i] = bat.is_discharging
+    fleet.bat_charge_w[i] = bat.instant_charge_power
+    fleet.bat_discharge_w[i] = bat.instant_discharge_power
+    fleet.wh_auto_setting[i] = wh.auto_setting
+    fleet.wh_remaining[i] = wh.remaining_hot_water
+    fleet.wh_running[i] = wh.is_running
+    fleet.v2h_connected[i] = v2h.vehicle_connected
+    fleet.v2h_mode[i] = v2h.operation_mode
+    fleet.v2h_remaining_wh[i] = v2h.remaining_capacity_wh
+    fleet.ac_mode[i] = ac.operation_mode
+    fleet.ac_running[i] = ac.is_running
+
+for dt in [1.0] * 5 + [60.0, 600.0, 3600.0] + [1.0] * 3:
+    fleet.step(dt)
+    for eng in homes:
+        eng.step(dt)
+
+def column(getter):
+    return [getter(e) for e in homes]
+
+def compare(fleet, suffix="", rtol=1e-12):
+    cases = [
+        ("grid_w", fleet.grid_w, lambda e: e.smart_meter.instant_current_power),
+        ("buy_kwh", fleet.buy_kwh, lambda e: e.smart_meter.cumulative_power_buy_kwh),
+        ("sell_kwh", fleet.sell_kwh, lambda e: e.smart_meter.cumulative_power_sell_kwh),
+        ("solar kWh", fleet.solar_cumulative_kwh, lambda e: e.solar.cumulative_generation_kwh),
+        ("bat_soc", fleet.bat_soc, lambda e: e.battery.soc),
+        ("bat_is_charging", fleet.bat_is_charging, lambda e: e.battery.is_charging),
+        ("bat cumulative", fleet.bat_cumulative_discharge_wh, lambda e: e.battery.cumulative_discharge_wh),
+        ("wh_remaining", fleet.wh_remaining, lambda e: e.water_heater.remaining_hot_water),
+        ("wh_auto_setting", fleet.wh_auto_setting, lambda e: e.water_heater.auto_setting),
+        ("wh_is_heating", fleet.wh_is_heating, lambda e: e.water_heater.is_heating),
+        ("v2h_remaining_wh", fleet.v2h_remaining_wh, lambda e: e.v2h.remaining_capacity_wh),
+        ("v2h_mode", fleet.v2h_mode, lambda e: e.v2h.operation_mode),
+        ("v2h discharge", fleet.v2h_current_discharge_w, lambda e: e.v2h.current_discharge_w),
+        ("v2h cumulative", fleet.v2h_cumulative_charge_wh, lambda e: e.v2h.cumulative_charge_wh),
+        ("v2h discharge cumulative", fleet.v2h_cumulative_discharge_wh, lambda e: e.v2h.cumulative_discharge_wh),
+        ("ac_power_w", fleet.ac_power_w, lambda e: e.air_conditioner.instant_power_w),
+        ("ac_cumulative_wh", fleet.ac_cumulative_wh, lambda e: e.air_conditioner.cumulative_power_wh),
+    ]
+    for label, actual, getter in cases:
+        check(f"{label} matches scalar engine{suffix}", bool(np.allclose(actual, column(getter), rtol=rtol, atol=1e-9)), True)
+
+compare(fleet)
+
+print("=== シナリオ駆動 (区間積分) ===")
+from src.core.clock import SimulationClock
+from src.core.scenario import CompiledScenario
+
+clock = SimulationClock(start_time_of_day=0.0, real_time=lambda: 0.0)
+scenario = CompiledScenario([(h * 3600, 400.0 + 150.0 * (h % 5), max(0.0, 3500.0 - 450.0 * abs(h - 12))) for h in range(24)])
+template = SimulationEngine(scenario, clock)
+fleet = FleetEngine(K, template)
+homes = []
+for i in range(K):
+    eng = SimulationEngine(scenario, clock)
+    v2h = eng.v2h
+    v2h.vehicle_connected = True
+    v2h.operation_mode = rng.choice([0x43, 0x43, 0x44])
+    v2h.discharge_power_w = rng.choice([300.0, 3000.0])
+    v2h.remaining_capacity_wh = rng.choice([50.0, 25000.0])
+    homes.append(eng)
+    fleet.v2h_connected[i] = True
+    fleet.v2h_mode[i] = v2h.operation_mode
+    fleet.v2h_discharge_power_w[i] = v2h.discharge_power_w
+    fleet.v2h_remaining_wh[i] = v2h.remaining_capacity_wh
+
+for dt in [1800.0, 2700.0, 600.0] * 8:
+    clock.advance(dt)
+    fleet.step(dt)
+    for eng in homes:
+        eng.step(dt)
+
+compare(fleet, " (scenario)", rtol=1e-9)
+check("scenario run both buys and sells", bool((fleet.buy_kwh > 0).all() and (fleet.sell_kwh > 0).all()), True)
+check("scenario run discharges V2H", bool((fleet.v2h_cumulative_discharge_wh > 0).any()), True)
+
+print(f"\n=== Result: {passed} passed, {failed} failed ===")
+sys.exit(0 if failed == 0 else 1)
@@ -0,0 +1,82 @@
+"""フリートモードのノードがマルチキャストの探索に応答することのテスト"""
+import sys
+import os
+import socket
+import struct
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.config.settings import settings
+from src.core.echonet import EchonetController, EchonetFrame, ESV_GET, ESV_GET_RES, ESV_INF
+from src.services.echonet_service import (EchonetProtocol, register_wifi_objects, announce, multicast_peers,
+                                          ECHONET_MULTICAST)
+from src.services.fleet_service import build_nodes
+
+passed = 0
+failed = 0
+
+def check(label, actual, expected):
+    global passed, failed
+    if actual == expected:
+        print(f"  [OK] {label}: {actual}")
+        passed += 1
+    else:
+        print(f"  [NG] {label}: got {actual}, expected {expected}")
+        failed += 1
+
+class RecordingTransport:
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, addr):
+        self.sent.append((data, addr))
+
+def attach(protocol):
+    transport = RecordingTransport()
+    protocol.connection_made(transport)
+    return transport
+
+settings.communication.multicast_response_jitter_sec = 0.0
+devices = settings.echonet.wifi_devices
+
+main_ctrl = EchonetController()
+from src.core.engine import SimulationEngine
+register_wifi_objects(main_ctrl, SimulationEngine(), devices)
+main = EchonetProtocol(main_ctrl, quiet=True, relay=True)
+main_tx = attach(main)
+
+nodes = build_nodes(3)
+node_tx = [attach(node.protocol) for node in nodes]
+multicast_peers.extend(node.protocol for node in nodes)
+
+# 0x0EF001 への GET 0xD6 (自ノードインスタンスリストS)
+get_d6 = struct.pack(">BBHBBBBBBBB", 0x10, 0x81, 0x0042, 0x05, 0xFF, 0x01, 0x0E, 0xF0, 0x01, ESV_GET, 1) + b"\xD6\x00"
+controller = ("192.168.1.10", 3610)
+
+print("=== マルチキャスト GET 0xD6 ===")
+main.datagram_received(get_d6, controller, socket.inet_aton(ECHONET_MULTICAST))
+responses = main_tx.sent + [s for tx in node_tx for s in tx.sent]
+check("one response per node", (len(main_tx.sent), [len(tx.sent) for tx in node_tx]), (1, [1, 1, 1]))
+check("all GET_RES to the controller", all(EchonetFrame(r).esv == ESV_GET_RES and a == controller for r, a in responses), True)
+check("each node answers from its own socket", len({id(tx) for tx in node_tx}), 3)
+
+print("=== ユニキャストはメインのみ ===")
+for tx in [main_tx] + node_tx:
+    tx.sent.clear()
+main.datagram_received(get_d6, controller, socket.inet_aton("192.168.1.2"))
+check("unicast answered by main only", (len(main_tx.sent), [len(tx.sent) for tx in node_tx]), (1, [0, 0, 0]))
+
+print("=== 起動時の 0xD5 通知 ===")
+for node, tx in zip(nodes, node_tx):
+    tx.sent.clear()
+    announce(node.ctrl, tx.sendto, quiet=True)
+inf = [tx.sent for tx in node_tx]
+check("every node announces", [len(s) for s in inf], [1, 1, 1])
+frame, addr = inf[0][0]
+check("INF 0xD5 to the multicast group", (EchonetFrame(frame).esv, EchonetFrame(frame).props[0][0], addr),
+      (ESV_INF, 0xD5, (ECHONET_MULTICAST, 3610)))
+
+del multicast_peers[:]
+print(f"\n=== Result: {passed} passed, {failed} failed ===")
+sys.exit(0 if failed == 0 else 1)
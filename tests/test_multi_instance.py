@@ -0,0 +1,113 @@
+"""1ノード内の複数インスタンス (エンジン / アダプター / ノードプロファイル) のテスト"""
+import sys
+import os
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.config.settings import settings
+from src.core.engine import SimulationEngine, instance_count
+from src.core.adapters import AirConditionerAdapter, BatteryAdapter, NodeProfileAdapter
+
+passed = 0
+failed = 0
+
+def check(label, actual, expected):
+    global passed, failed
+    if actual == expected:
+        print(f"  [OK] {label}: {actual}")
+        passed += 1
+    else:
+        print(f"  [NG] {label}: got {actual}, expected {expected}")
+        failed += 1
+
+print("=== Multi-Instance Engine Tests ===")
+
+settings.echonet.instance_counts = {"air_conditioner": 3, "battery": 2, "solar": 2, "v2h": 500}
+eng = SimulationEngine()
+eng.use_scenario = False
+
+check("AC instances", [ac.device_id for ac in eng.air_conditioners], ["ac_01", "ac_02", "ac_03"])
+check("Battery instances", len(eng.batteries), 2)
+check("Default single instance", len(eng.water_heaters), 1)
+check("Count clamped to 0x7F", instance_count("v2h"), 0x7F)
+check("Alias is first instance", eng.battery is eng.batteries[0], True)
+check("Settings applied to every instance",
+      {b.rated_capacity_wh for b in eng.batteries}, {eng.battery.rated_capacity_wh})
+
+# 全インスタンスの電力がグリッド計算に合算される
+eng.current_load_w = 1000.0
+for sol in eng.solars:
+    sol.instant_generation_power = 0.0
+for ac in eng.air_conditioners:
+    ac.is_running = True
+    ac.operation_mode = 0x42
+eng.air_conditioners[2].is_running = False
+eng.batteries[1].is_discharging = True
+eng.batteries[1].instant_discharge_power = 400.0
+eng.update_simulation()
+ac_w = settings.echonet.ac_power_w
+check("Per-instance AC power", [ac.instant_power_w for ac in eng.air_conditioners], [ac_w, ac_w, 0.0])
+check("Grid sums all instances", round(eng.smart_meter.instant_current_power, 3), round(1000.0 + 2 * ac_w - 400.0, 3))
+
+print("\n=== Multi-Instance Adapter Tests ===")
+
+ac1 = AirConditionerAdapter(eng.air_conditioners[0], 1)
+ac2 = AirConditionerAdapter(eng.air_conditioners[1], 2)
+id1, id2 = ac1.get_property(0x83), ac2.get_property(0x83)
+check("Instance 1 ID as configured", id1, bytes.fromhex(settings.echonet.ac_id))
+check("Instance 2 ID derived", id2[:4] + id2[9:], id1[:4] + id1[9:])
+check("Instance field", id2[4:9], b'\x00\x00\x00\x00\x02')
+check("Derived ID keeps length", len(id2), 17)
+check("Adapters bound to own model", (ac1.get_property(0x80), AirConditionerAdapter(eng.air_conditioners[2], 3).get_property(0x80)),
+      (b'\x30', b'\x31'))
+
+eojs = [(0x01, 0x30, i) for i in (1, 2, 3)] + [(0x02, 0x7D, i) for i in (1, 2)]
+node = NodeProfileAdapter(eojs)
+check("0xD6 lists every instance", node.get_property(0xD6), bytes([5]) + b"".join(bytes(e) for e in eojs))
+check("0xD3 instance count", node.get_property(0xD3), b'\x00\x00\x05')
+
+many = [(0x02, 0x6B, i) for i in range(1, 101)]
+node.set_instances(many)
+check("0xD5 capped at 84", node.get_property(0xD5)[0], 84)
+check("0xD3 full count", node.get_property(0xD3), b'\x00\x00\x64')
+
+print("\n=== Enable / Disable Device Classes ===")
+from src.core.echonet import EchonetController
+from src.services.echonet_service import register_wifi_objects, apply_wifi_devices
+
+def get_frame(eoj):
+    return bytes([0x10, 0x81, 0, 1, 0x05, 0xFF, 0x01, *eoj, 0x62, 1, 0x80, 0])
+
+saved_devs = settings.echonet.wifi_devices
+ctrl = EchonetController()
+register_wifi_objects(ctrl, eng, ["solar", "battery", "air_conditioner"])
+check("Battery answers while enabled", ctrl.handle_packet(get_frame((0x02, 0x7D, 0x02)), None) is not None, True)
+settings.echonet.wifi_devices = ["solar", "air_conditioner"]
+apply_wifi_devices(ctrl, eng)
+check("Disabled class no longer answers", ctrl.handle_packet(get_frame((0x02, 0x7D, 0x02)), None), None)
+check("Disabled class not stepped", "battery" in eng.enabled_models, False)
+check("Node Profile lists enabled only", ctrl._objects[(0x0E, 0xF0, 0x01)].get_property(0xD3), b'\x00\x00\x05')
+settings.echonet.wifi_devices = ["solar", "battery", "air_conditioner"]
+apply_wifi_devices(ctrl, eng)
+check("Re-enabled class answers again", ctrl.handle_packet(get_frame((0x02, 0x7D, 0x02)), None) is not None, True)
+check("Node Profile lists it again", ctrl._objects[(0x0E, 0xF0, 0x01)].get_property(0xD3), b'\x00\x00\x07')
+settings.echonet.wifi_devices = saved_devs
+
+print("\n=== Fleet Identification Numbers ===")
+# 300 ノード x 全クラス 3 インスタンス: 0x83 がすべて一意
+from src.core.scenario import CompiledScenario
+all_devs = ["smart_meter", "solar", "battery", "water_heater", "v2h", "air_conditioner"]
+settings.echonet.instance_counts = {key: 3 for key in all_devs}
+ids = []
+for node_index in range(301):
+    node_ctrl = EchonetController()
+    register_wifi_objects(node_ctrl, SimulationEngine(CompiledScenario()), all_devs, node_index)
+    ids += [obj.get_property(0x83) for obj in node_ctrl._objects.values()]
+check("Objects in fleet", len(ids), 301 * (1 + 5 * 3 + 1))
+check("0x83 unique across classes / nodes", len(set(ids)), len(ids))
+
+settings.echonet.instance_counts = {}
+
+print(f"\n=== Result: {passed} passed, {failed} failed ===")
+sys.exit(0 if failed == 0 else 1)
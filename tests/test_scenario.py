@@ -0,0 +1,98 @@
+"""CompiledScenario (二分探索 + 区間キャッシュによる補間) のテスト"""
+import sys
+import os
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.core.scenario import CompiledScenario
+
+passed = 0
+failed = 0
+
+def check(label, actual, expected):
+    global passed, failed
+    if actual == expected:
+        print(f"  [OK] {label}: {actual}")
+        passed += 1
+    else:
+        print(f"  [NG] {label}: got {actual}, expected {expected}")
+        failed += 1
+
+def linear_scan(points, current_sec):
+    """旧実装 (全点走査) と同じ補間"""
+    prev_point, next_point = points[-1], points[0]
+    for point in points:
+        if point[0] > current_sec:
+            next_point = point
+            break
+        prev_point = point
+    t1, t2 = prev_point[0], next_point[0]
+    if t1 == t2: return prev_point[1], prev_point[2]
+    if t2 < t1:
+        t2 += 86400
+        if current_sec < t1: current_sec += 86400
+    ratio = max(0.0, min(1.0, (current_sec - t1) / (t2 - t1)))
+    return (prev_point[1] + (next_point[1] - prev_point[1]) * ratio,
+            prev_point[2] + (next_point[2] - prev_point[2]) * ratio)
+
+print("=== CompiledScenario Tests ===")
+
+points = [(6 * 3600, 400.0, 0.0), (12 * 3600, 800.0, 3000.0), (23 * 3600, 300.0, 0.0)]
+sc = CompiledScenario(points)
+check("point value", sc.values_at(12 * 3600), (800.0, 3000.0))
+check("midpoint", sc.values_at(9 * 3600), (600.0, 1500.0))
+# 23:00 -> 翌06:00 の区間 (日付跨ぎ)
+check("after last point wraps", sc.values_at(23 * 3600 + 3.5 * 3600), linear_scan(points, 23 * 3600 + 3.5 * 3600))
+check("before first point wraps", sc.values_at(2 * 3600), linear_scan(points, 2 * 3600))
+check("unsorted input sorted", list(CompiledScenario(list(reversed(points))).times), [p[0] for p in points])
+check("single point", CompiledScenario([(0, 100.0, 5.0)]).values_at(5000), (100.0, 5.0))
+check("empty scenario is falsy", bool(CompiledScenario()), False)
+
+# 同時刻の重複点は旧実装と同じく後ろの点を採用
+dup = [(0, 100.0, 0.0), (3600, 200.0, 0.0), (3600, 500.0, 0.0), (7200, 100.0, 0.0)]
+check("duplicate times", CompiledScenario(dup).values_at(3600), linear_scan(dup, 3600))
+
+# 区間キャッシュ: 同一区間内の連続ティックは再探索しない
+sc.values_at(7 * 3600)
+seg = (sc._lo, sc._hi, sc._idx)
+sc.values_at(7 * 3600 + 1)
+check("segment cached", (sc._lo, sc._hi, sc._idx), seg)
+
+# 毎分シナリオ (1,440点) を旧実装と比較
+dense = [(t, float(t % 977), float((t * 7) % 1231)) for t in range(0, 86400, 60)]
+dsc = CompiledScenario(dense)
+check("dense matches linear scan", all(dsc.values_at(t) == linear_scan(dense, t) for t in range(0, 86400, 37)), True)
+
+print("=== 共有キャッシュ (scenario_cache) ===")
+import tempfile
+from src.core import scenario_cache
+
+with tempfile.TemporaryDirectory() as tmp:
+    scenario_cache.CACHE_DIR = os.path.join(tmp, "cache")
+    path = os.path.join(tmp, "day.csv")
+    with open(path, "w") as f:
+        f.write("time,load_w,solar_w,notes\n12:00,800,3000,Noon\n00:00,300,0,Night\n")
+    table = scenario_cache.load_table(path)
+    check("rows in file order", [(r["time"], r["notes"]) for r in table.rows()], [("12:00", "Noon"), ("00:00", "Night")])
+    check("engine and UI share one parse", scenario_cache.load_compiled(path) is table.compiled(), True)
+    check("compiled matches from_csv", table.compiled().values_at(6 * 3600), CompiledScenario.from_csv(path).values_at(6 * 3600))
+    check("disk cache written", len(os.listdir(scenario_cache.CACHE_DIR)), 1)
+    scenario_cache.clear_memory()
+    reloaded = scenario_cache.load_table(path)
+    check("restored from disk cache", (list(reloaded.times), list(reloaded.loads), reloaded.notes),
+          (list(table.times), list(table.loads), table.notes))
+    with open(path, "a") as f:
+        f.write("18:00,1500,0,Evening\n")
+    check("file change invalidates", len(scenario_cache.load_table(path)), 3)
+    with open(path, "w") as f:
+        f.write("time,load_w,solar_w,notes\n00:00,300,0,\n06:00,oops,0,\n12:00,800,3000,\n")
+    table = scenario_cache.load_table(path)
+    check("malformed row skipped", [r["time"] for r in table.rows()], ["00:00", "12:00"])
+    check("compiled on the table's arrays", table.compiled().times is table.times, True)
+    with open(path, "w") as f:
+        f.write("time,load_w,solar_w,notes\n12:00,800,3000,\n00:00,300,0,\n")
+    check("unsorted table compiled sorted", list(scenario_cache.load_table(path).compiled().times), [0, 43200])
+
+print(f"\n=== Result: {passed} passed, {failed} failed ===")
+sys.exit(0 if failed == 0 else 1)
@@ -0,0 +1,106 @@
+"""TickScheduler (monotonic 期限・遅延時のポリシー・ヒストグラム) のテスト"""
+import asyncio
+import sys
+import os
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.core.scheduler import TickScheduler, Histogram
+
+passed = 0
+failed = 0
+
+def check(label, actual, expected):
+    global passed, failed
+    if actual == expected:
+        print(f"  [OK] {label}: {actual}")
+        passed += 1
+    else:
+        print(f"  [NG] {label}: got {actual}, expected {expected}")
+        failed += 1
+
+class FakeMonotonic:
+    """手動で進める monotonic 時計"""
+    def __init__(self):
+        self.t = 100.0
+    def __call__(self):
+        return self.t
+
+def run(sched, clock, work):
+    """期限まで待ち (時計を進め) 1ティック実行する"""
+    delay = sched.delay()
+    if delay > 0:
+        clock.t += delay
+    sched.begin()
+    clock.t += work
+    sched.end()
+
+print("=== 期限ベース (ドリフトなし) ===")
+mt = FakeMonotonic()
+sched = TickScheduler(0.1, clock=mt)
+for _ in range(50):
+    run(sched, mt, 0.03)
+check("50 ticks at 100 ms with 30 ms work", round(mt.t - 100.0, 6), round(49 * 0.1 + 0.03, 6))
+check("no skips", sched.skipped, 0)
+check("duration histogram (<= 50 ms bucket)", sched.duration.counts[Histogram.BOUNDS_MS.index(50)], 50)
+check("no lateness", sched.lateness.max, 0.0)
+
+print("=== skip ポリシー ===")
+mt = FakeMonotonic()
+sched = TickScheduler(1.0, "skip", clock=mt)
+run(sched, mt, 3.5)  # 3.5 s の重いティック: 期限 101, 102, 103 を逃す
+check("next tick due now", sched.delay() <= 0, True)
+check("skipped ticks", sched.skipped, 2)
+run(sched, mt, 0.0)
+check("late tick recorded", round(sched.lateness.max, 3), 500.0)
+check("back on the grid", round(sched.delay(), 6), 0.5)
+
+print("=== catch_up ポリシー ===")
+mt = FakeMonotonic()
+sched = TickScheduler(1.0, "catch_up", max_catch_up=5, clock=mt)
+run(sched, mt, 3.5)
+check("nothing dropped within max_catch_up", sched.skipped, 0)
+for _ in range(3):
+    run(sched, mt, 0.0)
+check("3 overdue ticks run back-to-back", mt.t, 103.5)
+check("then waits for 104", round(sched.delay(), 6), 0.5)
+mt = FakeMonotonic()
+sched = TickScheduler(1.0, "catch_up", max_catch_up=2, clock=mt)
+run(sched, mt, 10.0)
+check("backlog beyond max_catch_up dropped", sched.skipped, 8)
+
+print("=== 周期変更 ===")
+mt = FakeMonotonic()
+sched = TickScheduler(1.0, clock=mt)
+run(sched, mt, 0.0)
+sched.set_interval(0.25)
+check("new interval from the last tick", round(sched.delay(), 6), 0.25)
+stats = sched.stats()
+check("stats", (stats["interval_sec"], stats["ticks"], stats["duration"]["count"]), (0.25, 1, 1))
+
+print("=== サービスループ (run_periodic) ===")
+from src.config.settings import settings
+from src.services import simulation_service
+
+async def periodic(ticks: int, interval: float) -> TickScheduler:
+    settings.simulation.update_interval_sec = interval
+    sched = simulation_service.make_scheduler("test")
+    count = 0
+    def tick():
+        nonlocal count
+        count += 1
+        if count == ticks:
+            raise asyncio.CancelledError
+    try:
+        await simulation_service.run_periodic(sched, tick)
+    except asyncio.CancelledError:
+        pass
+    return sched
+
+loop_sched = asyncio.run(periodic(5, 0.05))
+check("sub-second interval runs", loop_sched.ticks, 5)
+check("registered for /api/ticks", simulation_service.schedulers["test"] is loop_sched, True)
+
+print(f"\n=== Result: {passed} passed, {failed} failed ===")
+sys.exit(0 if failed == 0 else 1)
@@ -0,0 +1,81 @@
+"""確率的シナリオ層 (シード固定のノイズ・家電イベント・雲) のテスト"""
+import sys
+import os
+import time
+import tracemalloc
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.config.settings import StochasticSettings
+from src.core.scenario import CompiledScenario
+from src.core.stochastic import StochasticScenario, node_seed, for_node
+
+passed = 0
+failed = 0
+
+def check(label, actual, expected):
+    global passed, failed
+    if actual == expected:
+        print(f"  [OK] {label}: {actual}")
+        passed += 1
+    else:
+        print(f"  [NG] {label}: got {actual}, expected {expected}")
+        failed += 1
+
+base = CompiledScenario([(0, 300.0, 0.0), (21600, 400.0, 0.0), (43200, 500.0, 4000.0), (64800, 800.0, 0.0)])
+day1 = time.mktime((2026, 7, 1, 0, 0, 0, 0, 0, -1))
+day2 = time.mktime((2026, 7, 2, 0, 0, 0, 0, 0, -1))
+hours = [day1 + h * 3600 + 17.5 for h in range(24)]
+
+print("=== 再現性 ===")
+a = StochasticScenario(base, 42)
+b = StochasticScenario(base, 42)
+b.values_at(day2 + 100)  # 別の日を先に生成しても同じ日は同じ値
+check("same seed, same day", [a.values_at(t) for t in hours] == [b.values_at(t) for t in hours], True)
+check("different seed differs", [StochasticScenario(base, 43).values_at(t) for t in hours] != [a.values_at(t) for t in hours], True)
+check("days differ", a.values_at(day1 + 43200) != a.values_at(day2 + 43200), True)
+
+print("=== 1秒プロファイル ===")
+check("point every second", (a.next_point(day1 + 10.25), a.time_to_next_point(day1 + 10.25)), (day1 + 11, 0.75))
+l0, s0 = a.values_at(day1 + 50000)
+l1, s1 = a.values_at(day1 + 50001)
+lm, sm = a.values_at(day1 + 50000.5)
+check("continuous between samples", abs(lm - (l0 + l1) / 2) < 0.01 and abs(sm - (s0 + s1) / 2) < 0.01, True)
+check("plain floats on the tick path", type(lm), float)
+
+print("=== 各成分 ===")
+quiet = StochasticSettings(load_noise=0.0, appliance_events_per_day=0.0, cloud_events_per_day=0.0)
+flat = StochasticScenario(base, 1, quiet)
+check("no randomness = base profile",
+      all(abs(f - g) < 1e-6 for t in hours for f, g in zip(flat.values_at(t), base.values_at(t - day1))), True)
+spikes = StochasticScenario(base, 1, StochasticSettings(load_noise=0.0, appliance_events_per_day=50.0,
+                                                        appliance_power_w=[1000.0, 1000.0], cloud_events_per_day=0.0))
+excess = [spikes.values_at(day1 + s)[0] - base.values_at(s)[0] for s in range(0, 86400, 30)]
+check("appliance pulses add whole kW steps", all(round(e) % 1000 == 0 for e in excess) and max(excess) >= 1000, True)
+cloudy = StochasticScenario(base, 1, StochasticSettings(load_noise=0.0, appliance_events_per_day=0.0,
+                                                        cloud_events_per_day=40.0))
+ratios = [cloudy.values_at(day1 + s)[1] / base.values_at(s)[1] for s in range(36000, 60000, 60)]
+check("clouds only reduce solar", all(0.0 <= r <= 1.0 + 1e-9 for r in ratios) and min(ratios) < 0.9, True)
+check("load never negative", min(StochasticScenario(base, 5, StochasticSettings(load_noise=2.0)).values_at(day1 + s)[0]
+                                 for s in range(0, 86400, 97)) >= 0.0, True)
+
+print("=== フリートノード ===")
+check("main node keeps the configured seed", node_seed(42, 0), 42)
+check("node seeds are reproducible", node_seed(42, 3), node_seed(42, 3))
+check("node seeds differ", len({node_seed(42, i) for i in range(1000)}), 1000)
+nodes = [for_node(a, i) for i in (1, 2)]
+check("nodes share the base scenario", all(n.base is base for n in nodes), True)
+check("nodes draw their own randomness", len({tuple(n.values_at(t) for t in hours) for n in [a] + nodes}), 3)
+check("node layer is reproducible", [for_node(b, 2).values_at(t) for t in hours], [nodes[1].values_at(t) for t in hours])
+check("plain scenario shared as is", for_node(base, 5) is base, True)
+tracemalloc.start()
+fleet = [for_node(a, i) for i in range(1, 101)]
+for n in fleet:
+    n.values_at(day1 + 100)
+per_day = tracemalloc.get_traced_memory()[0] / len(fleet)
+tracemalloc.stop()
+check("node-day keeps only its draws (< 100 KB)", per_day < 100 * 1024, True)
+
+print(f"\n=== Result: {passed} passed, {failed} failed ===")
+sys.exit(0 if failed == 0 else 1)
@@ -0,0 +1,129 @@
+"""複数日シナリオ (暦ルール → メモリマップしたバイナリ) のテスト"""
+import sys
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+# Include src in path
+sys.path.append(os.getcwd())
+
+from src.core.clock import SimulationClock
+from src.core.engine import SimulationEngine
+from src.core.scenario import CompiledScenario
+from src.core.timeline import ScenarioTimeline, compile_rules, load_scenario
+
+passed = 0
+failed = 0
+
+def check(label, actual, expected):
+    global passed, failed
+    if actual == expected:
+        print(f"  [OK] {label}: {actual}")
+        passed += 1
+    else:
+        print(f"  [NG] {label}: got {actual}, expected {expected}")
+        failed += 1
+
+def epoch(y, m, d, hh=0, mm=0):
+    return time.mktime((y, m, d, hh, mm, 0, 0, 0, -1))
+
+def write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+tmp = tempfile.mkdtemp()
+write(os.path.join(tmp, "work.csv"), "time,load_w,solar_w,notes\n00:00,200,0,\n12:00,800,3000,\n")
+write(os.path.join(tmp, "home.csv"), "time,load_w,solar_w,notes\n00:00,400,0,\n12:00,1000,2000,\n")
+write(os.path.join(tmp, "rain.csv"), "time,load_w,solar_w,notes\n00:00,300,0,\n")
+rules = os.path.join(tmp, "week.yaml")
+# 2026-03-02 は月曜日
+write(rules, """start: 2026-03-02
+end: 2026-03-08
+resolution_sec: 60
+profiles: {work: work.csv, home: home.csv, rain: rain.csv}
+rules: {weekday: work, weekend: home}
+holidays: [2026-03-04]
+dates: {2026-03-05: rain}
+""")
+
+print("=== コンパイル ===")
+out = os.path.join(tmp, "week.bin")
+count = compile_rules(rules, out)
+check("7 days at 60 s", count, 7 * 1440)
+check("fixed layout size", os.path.getsize(out), 32 + count * 8)
+
+tl = ScenarioTimeline(out)
+work = CompiledScenario.from_csv(os.path.join(tmp, "work.csv"))
+home = CompiledScenario.from_csv(os.path.join(tmp, "home.csv"))
+
+# 1 秒解像度でも書き込みは日単位 (30 日分 = 20.7 MB を一度に確保しない)
+month = os.path.join(tmp, "month.yaml")
+write(month, """start: 2026-03-01
+end: 2026-03-30
+resolution_sec: 1
+profiles: {work: work.csv}
+rules: {weekday: work}
+""")
+tracemalloc.start()
+month_count = compile_rules(month, os.path.join(tmp, "month.bin"))
+peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+check("30 days at 1 s", month_count, 30 * 86400)
+check("streams day by day (peak < 8 MB)", peak < 8 * 2**20, True)
+check("streamed samples", ScenarioTimeline(os.path.join(tmp, "month.bin")).values_at(epoch(2026, 3, 29, 6)),
+      work.values_at(6 * 3600))
+
+print("=== 暦ルール ===")
+check("Monday = weekday profile", tl.values_at(epoch(2026, 3, 2, 6)), work.values_at(6 * 3600))
+check("holiday falls back to weekend", tl.values_at(epoch(2026, 3, 4, 6)), home.values_at(6 * 3600))
+check("date override", tl.values_at(epoch(2026, 3, 5, 12)), (300.0, 0.0))
+check("Saturday = weekend profile", tl.values_at(epoch(2026, 3, 7, 18)), home.values_at(18 * 3600))
+
+print("=== O(1) 参照 ===")
+t = epoch(2026, 3, 2, 6, 0) + 30
+load, solar = tl.values_at(t)
+check("interpolates between samples", (round(load, 3), round(solar, 3)),
+      tuple(round(v, 3) for v in work.values_at(6 * 3600 + 30)))
+check("next point", tl.next_point(t) - t, 30.0)
+check("time to next point", tl.time_to_next_point(epoch(2026, 3, 2, 6, 0)), 60.0)
+check("repeats after the end", tl.values_at(epoch(2026, 3, 9, 6)), tl.values_at(epoch(2026, 3, 2, 6)))
+
+print("=== load_scenario ===")
+check("CSV stays a daily profile", type(load_scenario(os.path.join(tmp, "work.csv"))).__name__, "CompiledScenario")
+os.remove(out)
+loaded = load_scenario(rules)
+check("YAML compiled on demand", (type(loaded).__name__, os.path.exists(out)), ("ScenarioTimeline", True))
+write(os.path.join(tmp, "bad.bin"), "not a timeline")
+try:
+    ScenarioTimeline(os.path.join(tmp, "bad.bin"))
+    check("bad file rejected", False, True)
+except ValueError:
+    check("bad file rejected", True, True)
+
+print("=== エンジン連携 (日をまたぐ積算) ===")
+# 金曜 12:00 から 2日間: 日別プロファイルの積算と一致する
+clock = SimulationClock(real_time=lambda: 0.0)
+clock.seek(epoch(2026, 3, 6, 12))
+eng = SimulationEngine(tl, clock, enabled=["solar"])
+for _ in range(2 * 1440):
+    clock.advance(60)
+    eng.step(60.0)
+# 参照: 金曜後半は work、土曜と日曜前半は home の日別プロファイル
+ref_clock = SimulationClock(real_time=lambda: 0.0)
+ref = SimulationEngine(work, ref_clock, enabled=["solar"])
+ref_clock.seek(epoch(2026, 3, 6, 12))
+for _ in range(720):
+    ref_clock.advance(60)
+    ref.step(60.0)
+ref.scenario = home
+for _ in range(1440 + 720):
+    ref_clock.advance(60)
+    ref.step(60.0)
+check("solar kWh across days", round(eng.solar.cumulative_generation_kwh, 3), round(ref.solar.cumulative_generation_kwh, 3))
+
+shutil.rmtree(tmp)
+
+print(f"\n=== Result: {passed} passed, {failed} failed ===")
+sys.exit(0 if failed == 0 else 1)
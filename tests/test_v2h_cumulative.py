@@ -5,6 +5,7 @@ import time
 sys.path.insert(0, 'src')
 
 from src.core.engine import engine
+from src.core.device_models import DEVICE_MODELS
 from src.core.adapters import V2HAdapter
 
 adapter = V2HAdapter(engine.v2h)
@@ -40,8 +41,8 @@ print("[テスト1] 充電による積算 (3000W x 10秒)")
 v2h.operation_mode = 0x42 # 充電
 v2h.charge_power_w = 3000.0
 dt = 10.0 # 10秒
-# engine._update_v2h を直接呼んでシミュレート
-engine._update_v2h(dt)
+# V2H モデルの update を直接呼んでシミュレート
+DEVICE_MODELS["v2h"].update(engine, dt)
 
 # 期待される累積: 3000 * (10/3600) = 8.333... Wh
 expected_wh = 3000.0 * (10.0 / 3600.0)
@@ -62,7 +63,7 @@ v2h.discharge_power_w = 2000.0
 engine.current_load_w = 5000.0
 engine.solar.instant_generation_power = 0.0
 dt = 15.0 # 15秒
-engine._update_v2h(dt)
+DEVICE_MODELS["v2h"].update(engine, dt)
 
 # 期待される累積: 2000 * (15/3600) = 8.333... Wh
 expected_wh_d = 2000.0 * (15.0 / 3600.0)